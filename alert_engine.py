@@ -0,0 +1,218 @@
+import time
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+# condition -> (quote field, direction, message template)
+CONDITIONS = {
+    'price_above': ('price', 'above', '{symbol} rose above ${threshold:,.2f} (now ${value:,.2f})'),
+    'price_below': ('price', 'below', '{symbol} fell below ${threshold:,.2f} (now ${value:,.2f})'),
+    'change_above': ('change_pct', 'above', '{symbol} is up {value:.1f}% today'),
+    'change_below': ('change_pct', 'below', '{symbol} is down {magnitude:.1f}% today'),
+    'month_change_above': ('month_change_pct', 'above', '{symbol} is up {value:.1f}% in the past month!'),
+    'month_change_below': ('month_change_pct', 'below', '{symbol} is down {magnitude:.1f}% in the past month.')
+}
+
+# Default rules for every watchlist entry: (alert type, condition, threshold)
+WATCHLIST_RULES = (
+    ('high_gain', 'month_change_above', 25),
+    ('high_loss', 'month_change_below', -15)
+)
+
+class AlertEngine:
+    """Per-user threshold alerts evaluated incrementally on quote ticks
+
+    Rules are indexed by (symbol, quote field, direction) in sorted threshold
+    arrays. A tick only bisects for thresholds between the previous and the
+    new value, so its cost is proportional to the rules actually crossed
+    rather than to users x symbols. A rule fires when the value crosses its
+    threshold. The first tick for a symbol (after a restart, deploy or
+    leader change) is level-triggered instead: every rule already past its
+    threshold fires, subject to the cooldown, which seed_last_fired() can
+    restore from the alert history. A rule added (or changed) while its
+    symbol already has a baseline gets the same level check on the next
+    tick, so a rule that is already past its threshold fires. Replacing a
+    rule, or clearing and re-adding it under the same id, keeps its
+    cooldown, and re-adding it unchanged doesn't count as new.
+    """
+
+    def __init__(self, cooldown_seconds=3600):
+        self.cooldown_seconds = cooldown_seconds
+        self.lock = threading.Lock()
+        self.rules = {}
+        self.index = {}
+        self.last_values = {}
+        self.cleared_rules = {}
+        # Rules added since the last tick of their symbol, level-checked on that tick
+        self.pending = set()
+
+    def add_rule(self, rule_id, user_id, symbol, condition, threshold, alert_type=None):
+        """Register or replace a rule"""
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown alert condition: {condition}")
+        field, direction, _ = CONDITIONS[condition]
+        rule = {
+            'id': rule_id,
+            'user_id': user_id,
+            'symbol': symbol.upper(),
+            'condition': condition,
+            'threshold': float(threshold),
+            'type': alert_type or condition,
+            'last_fired': 0.0
+        }
+
+        with self.lock:
+            previous = self._unindex(rule_id) or self.cleared_rules.pop(rule_id, None)
+            if previous is not None:
+                rule['last_fired'] = previous['last_fired']
+            if previous is None or any(previous[key] != rule[key] for key in ('symbol', 'condition', 'threshold')):
+                self.pending.add(rule_id)
+            self.rules[rule_id] = rule
+            thresholds, ids = self.index.setdefault((rule['symbol'], field, direction), ([], []))
+            position = bisect_right(thresholds, rule['threshold'])
+            thresholds.insert(position, rule['threshold'])
+            ids.insert(position, rule_id)
+        return rule
+
+    def remove_rule(self, rule_id):
+        with self.lock:
+            return self._unindex(rule_id) is not None
+
+    def _unindex(self, rule_id):
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return None
+        self.pending.discard(rule_id)
+        field, direction, _ = CONDITIONS[rule['condition']]
+        key = (rule['symbol'], field, direction)
+        thresholds, ids = self.index[key]
+        position = bisect_left(thresholds, rule['threshold'])
+        while ids[position] != rule_id:
+            position += 1
+        del thresholds[position]
+        del ids[position]
+        if not ids:
+            del self.index[key]
+        return rule
+
+    def clear_rules(self):
+        """Drop every rule, keeping the last seen values and each rule's cooldown for re-adding"""
+        with self.lock:
+            self.cleared_rules = self.rules
+            self.rules = {}
+            self.index = {}
+            self.pending = set()
+
+    def add_watchlist_rules(self, user_id, symbol):
+        """Register the default gain/loss rules for a watchlist entry"""
+        for alert_type, condition, threshold in WATCHLIST_RULES:
+            self.add_rule(f"watchlist:{user_id}:{symbol.upper()}:{alert_type}",
+                          user_id, symbol, condition, threshold, alert_type=alert_type)
+
+    def remove_watchlist_rules(self, user_id, symbol):
+        for alert_type, _, _ in WATCHLIST_RULES:
+            self.remove_rule(f"watchlist:{user_id}:{symbol.upper()}:{alert_type}")
+
+    def seed_last_fired(self, times):
+        """Restore cooldowns from {(user_id, symbol, alert type): fired at}"""
+        with self.lock:
+            for rule in self.rules.values():
+                fired_at = times.get((rule['user_id'], rule['symbol'], rule['type']))
+                if fired_at:
+                    rule['last_fired'] = max(rule['last_fired'], fired_at)
+
+    def symbols(self):
+        """Symbols that have at least one rule"""
+        with self.lock:
+            return sorted({symbol for symbol, _, _ in self.index})
+
+    def watchers(self):
+        """Number of distinct users with rules on each symbol"""
+        with self.lock:
+            users = {(rule['symbol'], rule['user_id']) for rule in self.rules.values()}
+        return Counter(symbol for symbol, _ in users)
+
+    def evaluate(self, quotes):
+        """Feed {symbol: quote} ticks and return the alerts that fired"""
+        now = time.time()
+        fired = []
+
+        with self.lock:
+            for symbol, quote in quotes.items():
+                fired.extend(self._fire_pending(symbol, quote, now))
+                for field in ('price', 'change_pct', 'month_change_pct'):
+                    value = quote.get(field)
+                    if value is None:
+                        continue
+                    previous = self.last_values.get((symbol, field))
+                    self.last_values[(symbol, field)] = value
+                    if previous is None:
+                        # No baseline: fire rules the value is already past
+                        entry = self.index.get((symbol, field, 'above'))
+                        if entry:
+                            thresholds, ids = entry
+                            fired.extend(self._fire(ids[:bisect_right(thresholds, value)], value, now))
+                        entry = self.index.get((symbol, field, 'below'))
+                        if entry:
+                            thresholds, ids = entry
+                            fired.extend(self._fire(ids[bisect_left(thresholds, value):], value, now))
+                        continue
+                    if previous == value:
+                        continue
+
+                    if value > previous:
+                        # Rising: fire 'above' rules with previous < threshold <= value
+                        entry = self.index.get((symbol, field, 'above'))
+                        if entry:
+                            thresholds, ids = entry
+                            crossed = ids[bisect_right(thresholds, previous):bisect_right(thresholds, value)]
+                            fired.extend(self._fire(crossed, value, now))
+                    else:
+                        # Falling: fire 'below' rules with value <= threshold < previous
+                        entry = self.index.get((symbol, field, 'below'))
+                        if entry:
+                            thresholds, ids = entry
+                            crossed = ids[bisect_left(thresholds, value):bisect_left(thresholds, previous)]
+                            fired.extend(self._fire(crossed, value, now))
+
+        return fired
+
+    def _fire_pending(self, symbol, quote, now):
+        """Level-check rules added since the symbol's last tick (caller holds the lock)"""
+        alerts = []
+        for rule_id in [rule_id for rule_id in self.pending if self.rules[rule_id]['symbol'] == symbol]:
+            rule = self.rules[rule_id]
+            field, direction, _ = CONDITIONS[rule['condition']]
+            value = quote.get(field)
+            if value is None:
+                continue
+            self.pending.discard(rule_id)
+            # Without a baseline the first-tick path below checks every rule anyway
+            if (symbol, field) not in self.last_values:
+                continue
+            if value >= rule['threshold'] if direction == 'above' else value <= rule['threshold']:
+                alerts.extend(self._fire([rule_id], value, now))
+        return alerts
+
+    def _fire(self, rule_ids, value, now):
+        alerts = []
+        for rule_id in rule_ids:
+            rule = self.rules[rule_id]
+            # Suppress flapping around the threshold
+            if now - rule['last_fired'] < self.cooldown_seconds:
+                continue
+            rule['last_fired'] = now
+
+            _, direction, template = CONDITIONS[rule['condition']]
+            alerts.append({
+                'rule_id': rule_id,
+                'user_id': rule['user_id'],
+                'symbol': rule['symbol'],
+                'type': rule['type'],
+                'message': template.format(symbol=rule['symbol'], threshold=rule['threshold'],
+                                           value=value, magnitude=abs(value)),
+                'severity': 'success' if direction == 'above' else 'warning',
+                'value': value,
+                'timestamp': now
+            })
+        return alerts
@@ -0,0 +1,119 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class AnalysisJobQueue:
+    """Runs per-symbol AI analysis on a worker pool, deduplicating in-flight jobs
+
+    With a message bus, every job state change is also published there,
+    so a poll for the job can be answered by any node.
+    """
+
+    def __init__(self, analyze_fn, max_workers=2, result_ttl_minutes=15, on_complete=None, bus=None):
+        self.analyze_fn = analyze_fn
+        self.bus = bus
+        self.on_complete = on_complete
+        self.result_ttl = result_ttl_minutes * 60
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self.lock = threading.Lock()
+
+        # job_id -> job, symbol -> job_id of the in-flight job, symbol -> latest finished job
+        self.jobs = {}
+        self.in_flight = {}
+        self.results = {}
+
+    def _public(self, job):
+        """Job fields safe to return to clients"""
+        return {key: job[key] for key in ('id', 'symbol', 'status', 'result', 'error', 'submitted_at', 'finished_at')}
+
+    def cached_result(self, symbol):
+        """Get a finished analysis for a symbol if it is still fresh"""
+        with self.lock:
+            job = self.results.get(symbol)
+            if job and time.time() - job['finished_at'] < self.result_ttl:
+                return self._public(job)
+        return None
+
+    def submit(self, symbol):
+        """Return a fresh cached result, the in-flight job for the symbol, or a new job"""
+        symbol = symbol.upper()
+        cached = self.cached_result(symbol)
+        if cached:
+            return cached
+
+        with self.lock:
+            job_id = self.in_flight.get(symbol)
+            if job_id:
+                return self._public(self.jobs[job_id])
+
+            self._prune()
+            job = {
+                'id': uuid.uuid4().hex,
+                'symbol': symbol,
+                'status': 'pending',
+                'result': None,
+                'error': None,
+                'submitted_at': time.time(),
+                'finished_at': None
+            }
+            self.jobs[job['id']] = job
+            self.in_flight[symbol] = job['id']
+
+        self._publish(job)
+        self.executor.submit(self._run, job)
+        return self._public(job)
+
+    def get(self, job_id):
+        """Get a job by id, from this node or the bus"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                return self._public(job)
+        if self.bus is not None:
+            try:
+                return self.bus.get(f"analysis_job:{job_id}")
+            except Exception as e:
+                print(f"Error reading analysis job {job_id} from the bus: {e}")
+        return None
+
+    def _publish(self, job):
+        if self.bus is None:
+            return
+        try:
+            self.bus.set(f"analysis_job:{job['id']}", self._public(job), ttl=self.result_ttl)
+        except Exception as e:
+            print(f"Error publishing analysis job {job['id']} to the bus: {e}")
+
+    def _run(self, job):
+        job['status'] = 'running'
+        self._publish(job)
+        try:
+            job['result'] = self.analyze_fn(job['symbol'])
+            job['status'] = 'done'
+        except Exception as e:
+            print(f"Error running analysis job for {job['symbol']}: {e}")
+            job['error'] = str(e)
+            job['status'] = 'failed'
+
+        job['finished_at'] = time.time()
+        self._publish(job)
+        with self.lock:
+            self.in_flight.pop(job['symbol'], None)
+            if job['status'] == 'done':
+                self.results[job['symbol']] = job
+
+        if self.on_complete:
+            try:
+                self.on_complete(self._public(job))
+            except Exception as e:
+                print(f"Error publishing analysis job {job['id']}: {e}")
+
+    def _prune(self):
+        """Drop finished jobs older than the result TTL (caller holds the lock)"""
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job['finished_at'] and job['finished_at'] < cutoff]:
+            job = self.jobs.pop(job_id)
+            if self.results.get(job['symbol']) is job:
+                del self.results[job['symbol']]
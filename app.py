@@ -1,26 +1,135 @@
-from flask import Flask, render_template, jsonify, request, session, redirect, url_for
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, jsonify, request, session, redirect, url_for, g, Response, make_response
+from flask.json.provider import DefaultJSONProvider
+from flask_socketio import SocketIO, emit, join_room
 from datetime import datetime, timedelta
-import yfinance as yf
 from stock_analyzer import StockAnalyzer
 from news_scraper import NewsScraper
-from apscheduler.schedulers.background import BackgroundScheduler
 import os
 import json
 from functools import wraps
 from database import Database
+from symbol_index import SymbolIndex
+from price_archive import PriceArchive
+from chart_codec import encode_chart, encode_intraday
+from downsampling import downsample_history
+from analysis_jobs import AnalysisJobQueue
+from cpu_pool import CPUWorkerPool
+from metrics import metrics
+from upstream import ticker_info, is_listed, UpstreamError
+from profiling import Profiler, green_threads
+from quote_snapshot import QuoteSnapshot
+from alert_engine import AlertEngine, CONDITIONS
+from market_calendar import MarketCalendar
+from refresh_scheduler import RefreshScheduler
+from quarantine import SymbolQuarantine
+from universes import UniverseRegistry, UniverseScorer
+from score_history import ScoreHistory
+from message_bus import create_bus, Lease, RedisBus
+from compression import compress_response
+from profiles import Profile
+from response_cache import ResponseCache
+from news_dedup import dedupe_articles
+from intraday import IntradayStore, INTRADAY_INTERVALS
+from portfolio_analytics import PortfolioAnalytics, ANALYTICS_PERIODS
+from screener import Screener, ScreenerError
 import time
+import atexit
 import threading
 from collections import defaultdict
 
+# Opt-in request/job profiling (PROFILE_SAMPLE_RATE for sampling, X-Profile: PROFILE_TOKEN on demand)
+profiler = Profiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    token=os.environ.get('PROFILE_TOKEN'),
+    max_profiles=int(os.environ.get('PROFILE_MAX_FILES', 200))
+)
+metrics.timer_hooks.append(profiler.on_timer)
+
+class ProfiledJSONProvider(DefaultJSONProvider):
+    """JSON provider that attributes encode time to the active profile"""
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            profiler.record('serialization', time.perf_counter() - start)
+
 app = Flask(__name__)
+app.json_provider_class = ProfiledJSONProvider
+app.json = ProfiledJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here-change-in-production')
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Multi-node mode: MESSAGE_BUS_URL=redis://... fans Socket.IO emits out to every node and
+# shares snapshots; without it an in-process bus keeps single-node behavior
+MESSAGE_BUS_URL = os.environ.get('MESSAGE_BUS_URL')
+bus = create_bus(MESSAGE_BUS_URL)
+
+# gevent, eventlet or threading; gunicorn.conf.py sets it to match the worker class
+SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE') or None
+socketio = SocketIO(app, async_mode=SOCKETIO_ASYNC_MODE, cors_allowed_origins="*",
+                    message_queue=MESSAGE_BUS_URL if isinstance(bus, RedisBus) else None)
+
+# Exactly one node owns the upstream fetch loop and the scheduler jobs
+fetch_lease = Lease(bus, 'fetch-loop', ttl=30)
+
+# Deployment profile (STRO_PROFILE=lite|standard|full); disabled subsystems never import their modules
+profile = Profile()
+print(f"Profile: {profile}")
+
+# Process pool for FinBERT and indicator math (CPU_POOL_WORKERS=0 runs them in-thread)
+CPU_POOL_WORKERS = int(os.environ.get('CPU_POOL_WORKERS', 2)) if profile.enabled('finbert') else 0
+TORCH_NUM_THREADS = int(os.environ.get('TORCH_NUM_THREADS', 1))
+cpu_pool = CPUWorkerPool(max_workers=CPU_POOL_WORKERS, torch_threads=TORCH_NUM_THREADS) if CPU_POOL_WORKERS > 0 else None
 
 # Initialize components
-stock_analyzer = StockAnalyzer()
-news_scraper = NewsScraper()
+price_archive = PriceArchive()
+
+# Sentiment cascade: FinBERT only scores texts the lexicon is less confident about than these
+stock_analyzer = StockAnalyzer(price_archive=price_archive, cpu_pool=cpu_pool,
+                               sentiment_model=profile.enabled('finbert'),
+                               escalate_below=float(os.environ.get('SENTIMENT_ESCALATE_BELOW', 0.6)),
+                               bulk_escalate_below=float(os.environ.get('SENTIMENT_BULK_ESCALATE_BELOW', 0.3)),
+                               audit_rate=float(os.environ.get('SENTIMENT_AUDIT_RATE', 0.05)),
+                               pool_timeout=float(os.environ.get('CPU_POOL_TIMEOUT', 60)))
+news_scraper = NewsScraper(analyzer=stock_analyzer, enabled=profile.enabled('news'))
 db = Database()
+symbol_index = SymbolIndex()
+
+# Symbols that keep failing upstream are skipped for a while
+quarantine = SymbolQuarantine(db)
+quarantine.load()
+
+# Configurable symbol universes, scored incrementally in the background with every run kept
+universes = UniverseRegistry(symbol_index, db=db)
+score_history = ScoreHistory(db)
+universe_scorer = UniverseScorer(universes, price_archive, news_scraper, stock_analyzer, quarantine,
+                                 symbol_index, score_history=score_history)
+
+# Indicator/fundamental screening over a columnar snapshot of one universe, rebuilt in the background
+screener = Screener(universes, price_archive, symbol_index, quarantine=quarantine,
+                    universe=os.environ.get('SCREENER_UNIVERSE', 'listed'))
+
+# Exchange sessions and per-symbol quote refresh intervals
+market_calendar = MarketCalendar()
+refresh_scheduler = RefreshScheduler(market_calendar)
+
+# Serialized, pre-compressed route responses, invalidated by tag when their data changes
+# (on every node when the bus is shared)
+response_cache = ResponseCache(bus=bus if MESSAGE_BUS_URL else None)
+
+def invalidate_quotes(symbols):
+    """Drop cached responses that show a quote for any of the symbols"""
+    response_cache.invalidate(*(f"quote:{symbol}" for symbol in symbols))
+
+# Batched quotes shared by the watchlist and alert paths
+quote_snapshot = QuoteSnapshot(max_age_seconds=60, calendar=market_calendar, on_refresh=invalidate_quotes)
+
+# Watchlist correlation/risk analytics over the archived daily closes, cached per
+# (user, watchlist version, trading day, period)
+portfolio_analytics = PortfolioAnalytics(price_archive, benchmark=os.environ.get('ANALYTICS_BENCHMARK', 'SPY'))
+
+# Threshold alerts evaluated on every price tick
+alert_engine = AlertEngine()
 
 # Global variable to store trending stocks
 trending_stocks = []
@@ -28,69 +137,60 @@ trending_stocks = []
 # Storage for alerts (per user)
 stock_alerts = {}
 
-# Cache for stock prices to reduce API calls
+# Cache for stock prices to reduce API calls; freshness comes from refresh_scheduler
 price_cache = defaultdict(lambda: {'price': None, 'timestamp': None, 'change_pct': None})
-CACHE_DURATION = 30  # Cache duration in seconds
+
+# 1-minute bars per symbol in fixed-size rings, fed by the quote loop (about 48KB per symbol)
+intraday_store = IntradayStore(capacity=int(os.environ.get('INTRADAY_BARS', 1024)),
+                               max_symbols=int(os.environ.get('INTRADAY_MAX_SYMBOLS', 512)))
+
+# Downsampled chart series per (symbol, range, resolution)
+chart_cache = {}
+CHART_RANGES = ('1mo', '3mo', '6mo', '1y', '2y', '5y', 'max')
+
+# Minimum overall score for the trending list (see backtest.py)
+TRENDING_THRESHOLD = 0.5
+DEFAULT_CHART_POINTS = 300
+MAX_CHART_POINTS = 2000
+MAX_CHART_CACHE_ENTRIES = 2000
 
 def update_trending_stocks():
     """Update the list of trending stocks based on analysis"""
     global trending_stocks
     
-    # List of stocks to analyze (you can expand this)
-    stock_symbols = [
-        'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 
-        'META', 'NVDA', 'JPM', 'V', 'JNJ',
-        'WMT', 'PG', 'UNH', 'HD', 'DIS',
-        'PYPL', 'NFLX', 'ADBE', 'CRM', 'PFE'
-    ]
+    # Score the trending universe (only symbols whose prices or news changed are re-scored)
+    ranking = universe_scorer.score('trending')
+    for stock in ranking['stocks']:
+        print(f"Stock {stock['symbol']}: sentiment={stock['sentiment']:.2f}, trend={stock['trend']:.2f}, overall={stock['score']:.2f}")
     
-    analyzed_stocks = []
+    # Keep stocks above the threshold, and take top 10
+    trending_stocks = [stock for stock in ranking['stocks'] if stock['score'] > TRENDING_THRESHOLD][:10]
+    bus.set('trending_stocks', trending_stocks)
+    response_cache.invalidate('trending')
+    print(f"Updated trending stocks at {datetime.now()} - Found {len(trending_stocks)} trending stocks")
+
+def get_chart_history(symbol, chart_range, resolution):
+    """Get a range of history downsampled to at most `resolution` points, cached per request shape"""
+    key = (symbol, chart_range, resolution)
+    entry = chart_cache.get(key)
+    cache_hit = bool(entry and (time.time() - entry['timestamp']) < price_archive.max_age_minutes * 60)
+    metrics.cache_result('chart_cache', cache_hit)
+    if cache_hit:
+        return entry['hist']
     
-    # Batch process stocks to reduce API calls
-    batch_size = 5
-    for i in range(0, len(stock_symbols), batch_size):
-        batch = stock_symbols[i:i+batch_size]
-        
-        for symbol in batch:
-            try:
-                # Get stock data
-                stock = yf.Ticker(symbol)
-                
-                # Get news sentiment (now with caching)
-                news_sentiment = news_scraper.get_stock_sentiment(symbol)
-                
-                # Analyze trend
-                trend_score = stock_analyzer.analyze_trend(symbol)
-                
-                # Combine scores
-                overall_score = (news_sentiment * 0.4) + (trend_score * 0.6)
-                
-                # Debug logging
-                print(f"Stock {symbol}: sentiment={news_sentiment:.2f}, trend={trend_score:.2f}, overall={overall_score:.2f}")
-                
-                # Lower threshold to 0.5 instead of 0.6
-                if overall_score > 0.5:  # Lowered threshold for trending
-                    info = stock.info
-                    current_price = info.get('currentPrice', 0)
-                    
-                    analyzed_stocks.append({
-                        'symbol': symbol,
-                        'name': info.get('longName', symbol),
-                        'current_price': current_price,
-                        'score': overall_score,
-                        'sentiment': news_sentiment,
-                        'trend': trend_score
-                    })
-            except Exception as e:
-                print(f"Error analyzing {symbol}: {e}")
-        
-        # Add delay between batches to avoid overwhelming APIs
-        if i + batch_size < len(stock_symbols):
-            time.sleep(2)
+    hist = downsample_history(price_archive.get_history(symbol, chart_range), resolution)
+    chart_cache[key] = {'hist': hist, 'timestamp': time.time()}
     
-    # Sort by score and take top 10
-    trending_stocks = sorted(analyzed_stocks, key=lambda x: x['score'], reverse=True)[:10]
-    print(f"Updated trending stocks at {datetime.now()} - Found {len(trending_stocks)} trending stocks")
+    # Resolution comes from the client, so keep the cache bounded
+    if len(chart_cache) > MAX_CHART_CACHE_ENTRIES:
+        oldest = sorted(chart_cache, key=lambda k: chart_cache[k]['timestamp'])
+        for stale_key in oldest[:len(chart_cache) - MAX_CHART_CACHE_ENTRIES]:
+            chart_cache.pop(stale_key, None)
+    return hist
+
+def wants_compact_charts():
+    """Check whether the client asked for the compact chart wire format"""
+    return request.args.get('format') == 'compact'
 
 def login_required(f):
     @wraps(f)
@@ -100,6 +200,44 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@app.after_request
+def finish_request_profile(response):
+    """Close the request's profile (registered first so it runs after compression)"""
+    profile = g.pop('profile', None)
+    if profile is not None:
+        breakdown = profiler.format_breakdown(profiler.stop(profile))
+        # Random samples stay in profiles/; only token holders see internal timings
+        if profiler.authorized(request.headers.get('X-Profile')):
+            response.headers['X-Profile-Breakdown'] = breakdown
+    return response
+
+@app.after_request
+def compress_after_request(response):
+    """Gzip/brotli-compress responses for clients that accept it"""
+    start = time.perf_counter()
+    response = compress_response(response, request.headers.get('Accept-Encoding'))
+    profiler.record('serialization', time.perf_counter() - start)
+    return response
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if profiler.should_profile(request.headers.get('X-Profile')):
+        g.profile = profiler.start(f"{request.method} {request.path}")
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency per endpoint"""
+    if 'request_start' in g:
+        metrics.observe('http_request_seconds', time.perf_counter() - g.request_start,
+                        endpoint=request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -164,31 +302,32 @@ def auth_status():
         return jsonify({'authenticated': False})
 
 @app.route('/api/trending-stocks')
+@response_cache.cached(ttl=30, tags=lambda: ['trending'])
 def get_trending_stocks():
     """API endpoint to get trending stocks"""
     stocks_data = []
     
-    # Update trending stocks if empty
-    if not trending_stocks:
+    # Update trending stocks if empty (only the fetch leader computes them)
+    if not current_trending_stocks() and fetch_lease.hold():
         update_trending_stocks()
     
-    for stock in trending_stocks:
+    for stock in current_trending_stocks():
         try:
-            ticker = yf.Ticker(stock['symbol'])
-            
             # Use cache before fetching real-time
-            cache_timestamp = price_cache[stock['symbol']]['timestamp']
-            if cache_timestamp and (time.time() - cache_timestamp) < CACHE_DURATION:
-                current_price = price_cache[stock['symbol']]['price']
-                price_change_pct = price_cache[stock['symbol']]['change_pct']
+            cache_entry = read_price_cache(stock['symbol'])
+            cache_hit = refresh_scheduler.is_fresh(stock['symbol'], cache_entry['timestamp'])
+            metrics.cache_result('price_cache', cache_hit)
+            if cache_hit:
+                current_price = cache_entry['price']
+                price_change_pct = cache_entry['change_pct']
                 # Get historical data for chart
-                hist = ticker.history(period="1mo")
+                hist = price_archive.get_history(stock['symbol'], '1mo')
             else:
                 # Get real-time quote
-                info = ticker.info
+                info = ticker_info(stock['symbol'])
                 
                 # Get historical data for chart
-                hist = ticker.history(period="1mo")
+                hist = price_archive.get_history(stock['symbol'], '1mo')
                 
                 # Get real-time price
                 current_price = info.get('currentPrice') or info.get('regularMarketPrice')
@@ -203,13 +342,10 @@ def get_trending_stocks():
                     price_change_pct = 0
                 
                 # Cache results
-                price_cache[stock['symbol']].update({'price': current_price, 'timestamp': time.time(), 'change_pct': price_change_pct})
+                write_price_cache(stock['symbol'], current_price, price_change_pct)
             
             # Prepare chart data
-            chart_data = {
-                'dates': hist.index.strftime('%Y-%m-%d').tolist(),
-                'prices': hist['Close'].tolist()
-            }
+            chart_data = encode_chart(hist, compact=wants_compact_charts())
             
             stocks_data.append({
                 'symbol': stock['symbol'],
@@ -217,7 +353,10 @@ def get_trending_stocks():
                 'current_price': current_price,
                 'price_change_pct': price_change_pct,
                 'chart_data': chart_data,
-                'score': stock['score']
+                'score': stock['score'],
+                'smoothed_score': stock.get('smoothed_score'),
+                'rank_change': stock.get('rank_change'),
+                'score_delta': stock.get('score_delta')
             })
         except Exception as e:
             print(f"Error fetching data for {stock['symbol']}: {e}")
@@ -225,31 +364,23 @@ def get_trending_stocks():
     return jsonify(stocks_data)
 
 @app.route('/api/upcoming-stocks')
+@response_cache.cached(ttl=60, tags=lambda: ['universe:upcoming'])
 def get_upcoming_stocks():
     """API endpoint to get upcoming stocks with potential"""
-    # Stocks that people think will blow up (but aren't currently trending)
-    upcoming_stocks = [
-        {'symbol': 'PLTR', 'name': 'Palantir Technologies Inc.'},
-        {'symbol': 'RBLX', 'name': 'Roblox Corporation'},
-        {'symbol': 'AI', 'name': 'C3.ai, Inc.'},
-        {'symbol': 'SOFI', 'name': 'SoFi Technologies'},
-        {'symbol': 'LCID', 'name': 'Lucid Group Inc.'},
-        {'symbol': 'RIVN', 'name': 'Rivian Automotive'},
-        {'symbol': 'NIO', 'name': 'NIO Inc.'},
-        {'symbol': 'HOOD', 'name': 'Robinhood Markets'},
-        {'symbol': 'DKNG', 'name': 'DraftKings Inc.'},
-        {'symbol': 'BBBY', 'name': 'Bed Bath & Beyond'}
-    ]
+    # Stocks that people think will blow up (but aren't currently trending), minus dead ones
+    upcoming_stocks = []
+    for symbol in quarantine.filter(universes.symbols('upcoming')):
+        listing = symbol_index.get(symbol)
+        upcoming_stocks.append({'symbol': symbol, 'name': listing['name'] if listing else symbol})
     
     stocks_data = []
     
     for stock in upcoming_stocks:
         try:
-            ticker = yf.Ticker(stock['symbol'])
-            info = ticker.info
+            info = ticker_info(stock['symbol'])
             
             # Get historical data for chart
-            hist = ticker.history(period="1mo")
+            hist = price_archive.get_history(stock['symbol'], '1mo')
             
             if not hist.empty:
                 # Get real-time price
@@ -265,10 +396,7 @@ def get_upcoming_stocks():
                     price_change_pct = 0
                 
                 # Prepare chart data
-                chart_data = {
-                    'dates': hist.index.strftime('%Y-%m-%d').tolist(),
-                    'prices': hist['Close'].tolist()
-                }
+                chart_data = encode_chart(hist, compact=wants_compact_charts())
                 
                 stocks_data.append({
                     'symbol': stock['symbol'],
@@ -277,32 +405,62 @@ def get_upcoming_stocks():
                     'price_change_pct': price_change_pct,
                     'chart_data': chart_data
                 })
+                quarantine.record_success(stock['symbol'])
+            else:
+                quarantine.record_failure(stock['symbol'], 'no price history')
         except Exception as e:
             print(f"Error fetching upcoming stock {stock['symbol']}: {e}")
     
     return jsonify(stocks_data[:10])  # Return top 10
 
+def records_view(f):
+    """Count a view of the symbol for refresh_scheduler on every successful request, cache hits included"""
+    @wraps(f)
+    def wrapper(symbol, *args, **kwargs):
+        response = make_response(f(symbol, *args, **kwargs))
+        # Only symbols that resolved; unknown ones would grow the view counts without bound
+        if response.status_code in (200, 304):
+            refresh_scheduler.record_view(symbol.upper())
+        return response
+    return wrapper
+
 @app.route('/api/stock/<symbol>')
+@records_view
+@response_cache.cached(ttl=60, tags=lambda symbol: [f"quote:{symbol.upper()}", f"analysis:{symbol.upper()}"])
 def get_stock_details(symbol):
     """API endpoint to get detailed stock information"""
     from flask import request
     
+    chart_range = request.args.get('range', '3mo')
+    if chart_range not in CHART_RANGES:
+        return jsonify({'error': f"Invalid range, expected one of {', '.join(CHART_RANGES)}"}), 400
+    interval = request.args.get('interval')
+    if interval is not None and interval not in INTRADAY_INTERVALS:
+        return jsonify({'error': f"Invalid interval, expected one of {', '.join(INTRADAY_INTERVALS)}"}), 400
+    resolution = max(10, min(request.args.get('resolution', DEFAULT_CHART_POINTS, type=int), MAX_CHART_POINTS))
+    
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = ticker_info(symbol)
         
         # Check if stock exists
         if not info or 'longName' not in info:
             return jsonify({'error': 'Stock not found'}), 404
         
-        # Get historical data for detailed chart
-        hist = ticker.history(period="3mo")
+        # Get recent bars for the daily change, and the downsampled or intraday chart series
+        hist = price_archive.get_history(symbol, '5d')
+        if interval:
+            chart_range = interval
+            chart_data = encode_intraday(intraday_store.get(symbol, interval), INTRADAY_INTERVALS[interval],
+                                         include_volume=True, compact=wants_compact_charts())
+        else:
+            chart_hist = get_chart_history(symbol, chart_range, resolution)
+            chart_data = encode_chart(chart_hist, include_volume=True, compact=wants_compact_charts())
         
         # Get company summary
         summary = stock_analyzer.get_company_summary(symbol)
         
-        # Get recent news
-        recent_news = news_scraper.get_recent_news(symbol)
+        # Get recent news, one article per story
+        recent_news = dedupe_articles(news_scraper.get_recent_news(symbol))
         
         # Get real-time price
         current_price = info.get('currentPrice') or info.get('regularMarketPrice')
@@ -321,41 +479,66 @@ def get_stock_details(symbol):
             'current_price': current_price,
             'price_change_pct': price_change_pct,
             'summary': summary,
-            'chart_data': {
-                'dates': hist.index.strftime('%Y-%m-%d').tolist(),
-                'prices': hist['Close'].tolist(),
-                'volume': hist['Volume'].tolist()
-            },
+            'chart_range': chart_range,
+            'chart_data': chart_data,
             'news': recent_news,
             'market_cap': info.get('marketCap', 0),
             'pe_ratio': info.get('trailingPE', 0),
             'dividend_yield': info.get('dividendYield', 0)
         }
         
-        # If analyze parameter is true, add AI analysis
+        # If analyze parameter is true, add AI analysis (or the job computing it)
         if request.args.get('analyze') == 'true':
-            # Get news sentiment
-            news_sentiment = news_scraper.get_stock_sentiment(symbol)
-            
-            # Get trend analysis
-            trend_score = stock_analyzer.analyze_trend(symbol)
-            
-            # Calculate future prediction
-            future_prediction = (news_sentiment * 0.5) + (trend_score * 0.5)
-            
-            # Generate AI analysis text
-            ai_analysis = generate_ai_analysis(symbol, news_sentiment, trend_score, info)
-            
-            response_data['future_prediction'] = future_prediction
-            response_data['ai_analysis'] = ai_analysis
-            response_data['sentiment_score'] = news_sentiment
-            response_data['trend_score'] = trend_score
+            job = analysis_jobs.submit(symbol)
+            metrics.cache_result('analysis', job['status'] == 'done')
+            if job['status'] == 'done':
+                response_data.update(job['result'])
+            else:
+                response_data['analysis_job'] = {'id': job['id'], 'status': job['status']}
         
         return jsonify(response_data)
+    except UpstreamError as e:
+        return jsonify({'error': f"Market data temporarily unavailable: {e}"}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def generate_ai_analysis(symbol, sentiment_score, trend_score, info):
+def run_stock_analysis(symbol):
+    """Compute the AI analysis fields for a stock (runs on the analysis worker pool)"""
+    # Get news sentiment
+    news_sentiment = news_scraper.get_stock_sentiment(symbol)
+    
+    # Get trend analysis
+    trend_score = stock_analyzer.analyze_trend(symbol)
+    
+    # Calculate future prediction
+    future_prediction = (news_sentiment * 0.5) + (trend_score * 0.5)
+    
+    # Generate AI analysis text
+    ai_analysis = generate_ai_analysis(symbol, news_sentiment, trend_score)
+    
+    return {
+        'future_prediction': future_prediction,
+        'ai_analysis': ai_analysis,
+        'sentiment_score': news_sentiment,
+        'trend_score': trend_score
+    }
+
+def publish_analysis(job):
+    """Push a finished analysis job to clients waiting on that symbol"""
+    response_cache.invalidate(f"analysis:{job['symbol']}")
+    socketio.emit('analysis_complete', job, room=f"analysis_{job['symbol']}")
+
+analysis_jobs = AnalysisJobQueue(run_stock_analysis, max_workers=2, on_complete=publish_analysis, bus=bus)
+
+@app.route('/api/analysis/<job_id>')
+def get_analysis_job(job_id):
+    """Poll the status and result of an analysis job"""
+    job = analysis_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+def generate_ai_analysis(symbol, sentiment_score, trend_score):
     """Generate AI analysis text based on scores"""
     analysis_parts = []
     
@@ -394,8 +577,112 @@ def generate_ai_analysis(symbol, sentiment_score, trend_score, info):
     
     return " ".join(analysis_parts)
 
+@app.route('/api/universes', methods=['GET', 'POST'])
+def manage_universes():
+    """List universes, or define a new one"""
+    if request.method == 'GET':
+        return jsonify([{
+            'name': name,
+            'description': universes.get(name).get('description', ''),
+            'size': len(universes.symbols(name))
+        } for name in universes.names()])
+    
+    if 'user' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    data = request.get_json() or {}
+    name = (data.get('name') or '').strip().lower()
+    if not name or not name.replace('-', '').replace('_', '').isalnum():
+        return jsonify({'success': False, 'message': 'Universe name must be letters, digits, - or _'}), 400
+    
+    # Built-in universes (trending, upcoming, listed, ...) are read-only; others belong to their creator
+    error = universes.permission_error(name, session['user']['id'])
+    if error:
+        return jsonify({'success': False, 'message': error}), 403
+    
+    error = universes.validate(data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    
+    result = universes.define(name, data, session['user']['id'])
+    if not result['success']:
+        return jsonify({'success': False, 'message': result['error']}), 400
+    
+    # Other nodes reload their registries when the version moves
+    response_cache.invalidate(f"universe:{name}")
+    bus.incr('universes_version')
+    return jsonify({'success': True, 'name': name, 'size': len(universes.symbols(name))})
+
+@app.route('/api/universes/<name>')
+def get_universe_ranking(name):
+    """Scored ranking for a universe, scored on demand in the background"""
+    if universes.get(name) is None:
+        return jsonify({'error': 'Unknown universe'}), 404
+    
+    limit = max(1, min(request.args.get('limit', 20, type=int), 500))
+    ranking, pending = universe_scorer.ranking(name)
+    if ranking is None:
+        return jsonify({'name': name.lower(), 'status': 'pending'}), 202
+    
+    stocks = ranking['stocks']
+    if request.args.get('sort') == 'rising':
+        # Fastest-rising smoothed score over the lookback window
+        stocks = sorted((s for s in stocks if s.get('score_delta') is not None),
+                        key=lambda s: s['score_delta'], reverse=True)
+    
+    return jsonify({**ranking, 'stocks': stocks[:limit], 'status': 'refreshing' if pending else 'ready'})
+
+@app.route('/api/screener')
+def screen_stocks():
+    """Symbols matching a filter expression, e.g. ?q=rsi < 30 and price > ma50&sort=market_cap&order=desc"""
+    universe = request.args.get('universe')
+    if universe is not None and universes.get(universe) is None:
+        return jsonify({'error': 'Unknown universe'}), 404
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    
+    snapshot, pending = screener.current()
+    if snapshot is None:
+        return jsonify({'status': 'pending'}), 202
+    
+    try:
+        start = time.perf_counter()
+        matched, stocks = screener.query(snapshot, request.args.get('q', ''), sort=request.args.get('sort'),
+                                         descending=request.args.get('order') == 'desc', limit=limit,
+                                         symbols=universes.symbols(universe) if universe else None)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    except ScreenerError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'universe': screener.universe,
+        'size': len(snapshot),
+        'built_at': snapshot.built_at,
+        'matched': matched,
+        'query_ms': round(elapsed_ms, 3),
+        'stocks': stocks,
+        'status': 'refreshing' if pending else 'ready'
+    })
+
+@app.route('/api/scores/<symbol>')
+def get_score_history(symbol):
+    """Stored score series for a symbol within a universe"""
+    universe = request.args.get('universe', 'trending').lower()
+    days = max(1, min(request.args.get('days', 30, type=int), 365))
+    return jsonify({
+        'symbol': symbol.upper(),
+        'universe': universe,
+        'scores': score_history.series(universe, symbol, days)
+    })
+
+@app.route('/api/search/<query>')
+def search_stocks(query):
+    """Search the local symbol index by ticker or company name"""
+    limit = min(request.args.get('limit', 5, type=int), 20)
+    return jsonify(symbol_index.search(query, limit=limit))
+
 @app.route('/api/watchlist', methods=['GET', 'POST', 'DELETE'])
 @login_required
+@response_cache.cached(ttl=30, per_user=True)
 def manage_watchlist():
     """Manage user's watchlist"""
     user_id = session['user']['id']
@@ -404,31 +691,25 @@ def manage_watchlist():
         # Get user's watchlist with current data
         watchlist_symbols = db.get_user_watchlist(user_id)
         watchlist_data = []
+        response_cache.tag(f"watchlist:{user_id}", *(f"quote:{symbol}" for symbol in watchlist_symbols))
+        
+        # One batched quote fetch for the whole watchlist
+        quotes = quote_snapshot.get(watchlist_symbols)
         
         for symbol in watchlist_symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                hist = ticker.history(period="1mo")
-                
-                if not hist.empty:
-                    current_price = info.get('currentPrice', hist['Close'].iloc[-1])
-                    # Calculate daily change percentage (same as trending stocks)
-                    if len(hist) > 1:
-                        previous_close = hist['Close'].iloc[-2]
-                        price_change = ((current_price - previous_close) / previous_close) * 100
-                    else:
-                        price_change = 0
-                    
-                    watchlist_data.append({
-                        'symbol': symbol,
-                        'name': info.get('longName', symbol),
-                        'current_price': current_price,
-                        'price_change': price_change,
-                        'alert_triggered': check_alert_conditions(symbol, price_change)
-                    })
-            except Exception as e:
-                print(f"Error fetching watchlist data for {symbol}: {e}")
+            quote = quotes.get(symbol)
+            if not quote:
+                continue
+            
+            listing = symbol_index.get(symbol)
+            watchlist_data.append({
+                'symbol': symbol,
+                'name': listing['name'] if listing else symbol,
+                'current_price': quote['price'],
+                # Daily change percentage (same as trending stocks)
+                'price_change': quote['change_pct'],
+                'alert_triggered': check_alert_conditions(symbol, quote['month_change_pct'])
+            })
         
         return jsonify(watchlist_data)
     
@@ -438,20 +719,23 @@ def manage_watchlist():
         symbol = data.get('symbol', '').upper()
         
         if symbol:
-            # Verify the stock exists
+            # Verify the stock exists against the local symbol index, or upstream when it isn't indexed
             try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                if info and 'longName' in info:
-                    result = db.add_to_watchlist(user_id, symbol)
-                    if result['success']:
-                        return jsonify({'success': True, 'message': f'{symbol} added to watchlist'})
-                    else:
-                        return jsonify({'success': False, 'message': result['error']}), 400
+                known = is_known_symbol(symbol)
+            except UpstreamError as e:
+                return jsonify({'success': False, 'message': f"Market data temporarily unavailable: {e}"}), 503
+            if known:
+                result = db.add_to_watchlist(user_id, symbol)
+                if result['success']:
+                    alert_engine.add_watchlist_rules(user_id, symbol)
+                    bus.incr('alert_rules_version')
+                    bus.incr(f"watchlist_version:{user_id}")
+                    response_cache.invalidate(f"watchlist:{user_id}")
+                    return jsonify({'success': True, 'message': f'{symbol} added to watchlist'})
                 else:
-                    return jsonify({'success': False, 'message': 'Invalid stock symbol'}), 400
-            except:
-                return jsonify({'success': False, 'message': 'Error verifying stock'}), 400
+                    return jsonify({'success': False, 'message': result['error']}), 400
+            else:
+                return jsonify({'success': False, 'message': 'Invalid stock symbol'}), 400
         else:
             return jsonify({'success': False, 'message': 'Stock symbol required'}), 400
     
@@ -462,12 +746,37 @@ def manage_watchlist():
         if symbol:
             result = db.remove_from_watchlist(user_id, symbol)
             if result['success']:
+                alert_engine.remove_watchlist_rules(user_id, symbol)
+                bus.incr('alert_rules_version')
+                bus.incr(f"watchlist_version:{user_id}")
+                response_cache.invalidate(f"watchlist:{user_id}")
                 return jsonify({'success': True, 'message': f'{symbol} removed from watchlist'})
             else:
                 return jsonify({'success': False, 'message': result['error']}), 400
         else:
             return jsonify({'success': False, 'message': 'Stock symbol required'}), 400
 
+@app.route('/api/watchlist/analytics')
+@login_required
+def get_watchlist_analytics():
+    """Correlation, volatility, drawdown, beta and equal-weight performance of the user's watchlist"""
+    user_id = session['user']['id']
+    period = request.args.get('period', '1y')
+    if period not in ANALYTICS_PERIODS:
+        return jsonify({'error': f"Invalid period, expected one of {', '.join(ANALYTICS_PERIODS)}"}), 400
+    
+    # Daily closes only change once per trading day, and the symbols only with the watchlist version
+    key = (user_id, bus.get(f"watchlist_version:{user_id}"), market_calendar.trading_day(), period)
+    return jsonify(portfolio_analytics.get(key, db.get_user_watchlist(user_id), period))
+
+def is_known_symbol(symbol):
+    """Whether a symbol is in the local index or, for tickers newer than the bundled listing, upstream"""
+    if not symbol:
+        return False
+    if symbol_index.contains(symbol):
+        return True
+    return is_listed(ticker_info(symbol))
+
 def check_alert_conditions(symbol, price_change):
     """Check if alert conditions are met"""
     alerts = []
@@ -500,25 +809,19 @@ def get_alerts():
     watchlist_symbols = db.get_user_watchlist(user_id)
     current_alerts = []
     
+    quotes = quote_snapshot.get(watchlist_symbols)
+    
     for symbol in watchlist_symbols:
-        try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="1mo")
-            
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                first_price = hist['Close'].iloc[0]
-                price_change = ((current_price - first_price) / first_price) * 100
-                
-                alerts = check_alert_conditions(symbol, price_change)
-                if alerts:
-                    for alert in alerts:
-                        alert_data = {**alert, 'symbol': symbol, 'timestamp': datetime.now().isoformat()}
-                        current_alerts.append(alert_data)
-                        # Save new alerts to database
-                        db.add_alert(user_id, symbol, alert['type'], alert['message'])
-        except Exception as e:
-            print(f"Error checking alerts for {symbol}: {e}")
+        quote = quotes.get(symbol)
+        if not quote:
+            continue
+        
+        alerts = check_alert_conditions(symbol, quote['month_change_pct'])
+        for alert in alerts:
+            alert_data = {**alert, 'symbol': symbol, 'timestamp': datetime.now().isoformat()}
+            current_alerts.append(alert_data)
+            # Save new alerts to database
+            db.add_alert(user_id, symbol, alert['type'], alert['message'])
     
     # Combine database alerts with current alerts
     all_alerts = db_alerts + current_alerts
@@ -532,114 +835,244 @@ def get_alerts():
     
     return jsonify(list(unique_alerts.values()))
 
-def check_watchlist_alerts():
-    """Background job to check watchlist alerts"""
-    # Get all users with watchlists
-    users = db.get_all_users()
+@app.route('/api/alert-rules', methods=['GET', 'POST', 'DELETE'])
+@login_required
+def manage_alert_rules():
+    """Manage user's price alert rules"""
+    user_id = session['user']['id']
     
-    for user in users:
-        user_id = user['id']
-        watchlist_symbols = db.get_user_watchlist(user_id)
+    if request.method == 'GET':
+        return jsonify(db.get_alert_rules(user_id))
+    
+    elif request.method == 'POST':
+        data = request.get_json() or {}
+        symbol = data.get('symbol', '').upper()
+        condition = data.get('condition')
         
-        for symbol in watchlist_symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="1mo")
-                
-                if not hist.empty:
-                    current_price = hist['Close'].iloc[-1]
-                    first_price = hist['Close'].iloc[0]
-                    price_change = ((current_price - first_price) / first_price) * 100
-                    
-                    alerts = check_alert_conditions(symbol, price_change)
-                    if alerts:
-                        for alert in alerts:
-                            # Check if similar alert was already sent recently (within 24 hours)
-                            existing_alerts = db.get_user_alerts(user_id, hours=24)
-                            duplicate = any(
-                                a['symbol'] == symbol and a.get('type') == alert['type'] 
-                                for a in existing_alerts
-                            )
-                            
-                            if not duplicate:
-                                db.add_alert(user_id, symbol, alert['type'], alert['message'])
-            except Exception as e:
-                print(f"Error checking alerts for {symbol}: {e}")
-    
-    print(f"Checked watchlist alerts at {datetime.now()}")
+        try:
+            threshold = float(data.get('threshold'))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'Numeric threshold required'}), 400
+        
+        try:
+            known = is_known_symbol(symbol)
+        except UpstreamError as e:
+            return jsonify({'success': False, 'message': f"Market data temporarily unavailable: {e}"}), 503
+        if not known:
+            return jsonify({'success': False, 'message': 'Invalid stock symbol'}), 400
+        if condition not in CONDITIONS:
+            return jsonify({'success': False, 'message': f"Condition must be one of: {', '.join(CONDITIONS)}"}), 400
+        
+        result = db.add_alert_rule(user_id, symbol, condition, threshold)
+        if not result['success']:
+            return jsonify({'success': False, 'message': result['error']}), 400
+        
+        alert_engine.add_rule(result['rule_id'], user_id, symbol, condition, threshold)
+        bus.incr('alert_rules_version')
+        return jsonify({'success': True, 'rule_id': result['rule_id']})
+    
+    elif request.method == 'DELETE':
+        rule_id = request.args.get('id', type=int)
+        if rule_id is None:
+            return jsonify({'success': False, 'message': 'Rule id required'}), 400
+        
+        result = db.delete_alert_rule(user_id, rule_id)
+        if result['success']:
+            alert_engine.remove_rule(rule_id)
+            bus.incr('alert_rules_version')
+            return jsonify({'success': True})
+        return jsonify({'success': False, 'message': result.get('error', 'Rule not found')}), 404
+
+def load_alert_rules():
+    """Register stored rules and the default watchlist rules with the alert engine"""
+    for rule in db.get_alert_rules():
+        alert_engine.add_rule(rule['id'], rule['user_id'], rule['symbol'], rule['condition'], rule['threshold'])
+    for user_id, symbol in db.get_all_watchlists():
+        alert_engine.add_watchlist_rules(user_id, symbol)
+    
+    # Rules already past their threshold fire on the first tick unless they fired within the cooldown
+    alert_engine.seed_last_fired(db.get_recent_alert_times(alert_engine.cooldown_seconds))
+
+def evaluate_alert_rules():
+    """Feed the latest batched quotes to the alert engine and deliver what fired"""
+    symbols = alert_engine.symbols()
+    if not symbols:
+        return
+    
+    fired = alert_engine.evaluate(quote_snapshot.get(symbols))
+    if not fired:
+        return
+    metrics.inc('alerts_fired_total', len(fired))
+    
+    by_user = defaultdict(list)
+    for alert in fired:
+        by_user[alert['user_id']].append(alert)
+    for user_id, alerts in by_user.items():
+        socketio.emit('alerts_triggered', {'alerts': alerts}, room=f"user_{user_id}")
+    
+    # One transaction per tick instead of one per alert
+    result = db.add_alerts(fired)
+    if not result['success']:
+        print(f"Error saving {len(fired)} alerts: {result['error']}")
+
+def scheduled_job(name, func, leader_only=True):
+    """Wrap a scheduler job with duration metrics and sampled profiling"""
+    timed = profiler.profile_job(name)(metrics.timed('scheduler_job_seconds', job=name)(func))
+    if not leader_only:
+        return timed
+
+    @wraps(func)
+    def run_on_leader(*args, **kwargs):
+        # Jobs that hit upstream or write shared state run only on the fetch leader;
+        # renew rather than trust the cached flag, which may be a TTL old
+        if fetch_lease.hold():
+            return timed(*args, **kwargs)
+    return run_on_leader
+
+def current_trending_stocks():
+    """The trending list published by the fetch leader (this node when single-node)"""
+    return bus.get('trending_stocks') or []
+
+def read_price_cache(symbol):
+    """Local price_cache entry, replaced by a newer one another node published"""
+    cache_entry = price_cache[symbol]
+    if not refresh_scheduler.is_fresh(symbol, cache_entry['timestamp']):
+        shared = bus.hget('prices', symbol)
+        if shared and shared['timestamp'] > (cache_entry['timestamp'] or 0):
+            cache_entry.update(shared)
+    return cache_entry
+
+def write_price_cache(symbol, price, change_pct, day_volume=None):
+    """Cache a fetched price locally, add it to the intraday bars and publish it to the other nodes"""
+    entry = {'price': float(price), 'timestamp': time.time(), 'change_pct': float(change_pct)}
+    price_cache[symbol].update(entry)
+    intraday_store.record_quote(symbol, entry['price'], entry['timestamp'], day_volume)
+    invalidate_quotes([symbol])
+    bus.hset('prices', symbol, entry)
 
 def get_cached_price(symbol):
     """Get cached price or fetch new one if cache expired"""
-    cache_entry = price_cache[symbol]
+    cache_entry = read_price_cache(symbol)
     
     # Check if cache is valid
-    if cache_entry['timestamp'] and (time.time() - cache_entry['timestamp']) < CACHE_DURATION:
+    cache_hit = refresh_scheduler.is_fresh(symbol, cache_entry['timestamp'])
+    metrics.cache_result('price_cache', cache_hit)
+    if cache_hit:
         return cache_entry['price'], cache_entry['change_pct']
     
-    # Fetch new price
+    # Fetch new price; the quote carries the previous close, daily bars are only a fallback
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        hist = ticker.history(period="2d")
+        info = ticker_info(symbol)
+        current_price = info.get('currentPrice') or info.get('regularMarketPrice')
+        previous_close = info.get('regularMarketPreviousClose') or info.get('previousClose')
         
-        if not hist.empty:
-            current_price = info.get('currentPrice') or info.get('regularMarketPrice')
+        if not current_price or not previous_close:
+            hist = price_archive.get_history(symbol, '5d')
+            if hist.empty:
+                return None, None
             if not current_price:
                 current_price = hist['Close'].iloc[-1]
-            
-            # Calculate daily change
-            if len(hist) > 1:
+            if not previous_close and len(hist) > 1:
                 previous_close = hist['Close'].iloc[-2]
-                price_change_pct = ((current_price - previous_close) / previous_close) * 100
-            else:
-                price_change_pct = 0
-            
-            # Update cache
-            price_cache[symbol].update({
-                'price': current_price,
-                'timestamp': time.time(),
-                'change_pct': price_change_pct
-            })
-            
-            return current_price, price_change_pct
+        
+        # Calculate daily change
+        if previous_close:
+            price_change_pct = ((current_price - previous_close) / previous_close) * 100
+        else:
+            price_change_pct = 0
+        
+        # Update cache
+        write_price_cache(symbol, current_price, price_change_pct, info.get('regularMarketVolume'))
+        
+        return current_price, price_change_pct
     except Exception as e:
         print(f"Error fetching price for {symbol}: {e}")
         return None, None
 
 def broadcast_price_updates():
     """Broadcast real-time price updates via WebSocket"""
-    while True:
+    rules_version = None
+    universes_version = None
+    while not services_stopping.is_set():
         try:
+            # Pick up universes defined on other nodes
+            version = bus.get('universes_version')
+            if version != universes_version:
+                if universes_version is not None or version is not None:
+                    universes.load()
+                    response_cache.invalidate(*(f"universe:{name}" for name in universes.names()))
+                universes_version = version
+            
+            # Every node publishes its audience; only the lease holder fetches
+            node_key = f"interest:{fetch_lease.owner}"
+            bus.set(node_key, refresh_scheduler.snapshot(), ttl=fetch_lease.ttl)
+            if services_stopping.is_set() or not fetch_lease.hold():
+                rules_version = None
+                time.sleep(fetch_lease.ttl / 3)
+                continue
+            refresh_scheduler.set_remote([snapshot for key, snapshot in bus.get_prefix('interest:').items()
+                                          if key != node_key])
+            
+            # Pick up alert rules changed on other nodes
+            version = bus.get('alert_rules_version')
+            if version != rules_version:
+                if rules_version is not None or version is not None:
+                    alert_engine.clear_rules()
+                    load_alert_rules()
+                rules_version = version
+            
             # Get all active symbols (trending + upcoming)
             active_symbols = set()
             
             # Add trending stock symbols
-            for stock in trending_stocks:
+            for stock in current_trending_stocks():
                 active_symbols.add(stock['symbol'])
             
             # Add some upcoming stocks
-            upcoming_symbols = ['PLTR', 'RBLX', 'AI', 'SOFI', 'LCID']
+            upcoming_symbols = quarantine.filter(universes.symbols('upcoming'))[:5]
             active_symbols.update(upcoming_symbols)
             
-            # Prepare update data
+            # Refresh intervals depend on who is watching each symbol
+            refresh_scheduler.set_broadcast(active_symbols)
+            refresh_scheduler.set_watchers(alert_engine.watchers())
+            
+            # Prepare update data for symbols whose refresh interval has elapsed;
+            # subscribed symbols outside the broadcast set go to their subscribers only
             updates = []
+            renewed_at = time.time()
             
-            for symbol in active_symbols:
+            for symbol in active_symbols | refresh_scheduler.subscribed():
+                if refresh_scheduler.is_fresh(symbol, price_cache[symbol]['timestamp']):
+                    continue
+                # Sequential upstream calls can outlast the lease; renew it as we go and
+                # stop fetching if another node took over
+                if time.time() - renewed_at > fetch_lease.ttl / 3:
+                    if not fetch_lease.hold():
+                        break
+                    renewed_at = time.time()
                 price, change_pct = get_cached_price(symbol)
                 if price:
-                    updates.append({
+                    update = {
                         'symbol': symbol,
                         'price': price,
                         'change_pct': change_pct,
                         'timestamp': time.time()
-                    })
+                    }
+                    if symbol in active_symbols:
+                        updates.append(update)
+                    else:
+                        socketio.emit('price_update', {'updates': [update]}, to=f"quote_{symbol}")
             
             # Broadcast updates to all connected clients
             if updates:
                 socketio.emit('price_update', {'updates': updates})
             
-            # Wait before next update cycle
-            time.sleep(5)  # Update every 5 seconds
+            if fetch_lease.held:
+                evaluate_alert_rules()
+            
+            # Wait before next update cycle (5s in regular hours, longer off-hours),
+            # renewing the lease well before it expires
+            time.sleep(min(refresh_scheduler.poll_seconds(), fetch_lease.ttl / 3))
             
         except Exception as e:
             print(f"Error in broadcast_price_updates: {e}")
@@ -649,12 +1082,24 @@ def broadcast_price_updates():
 def handle_connect():
     """Handle client connection"""
     print('Client connected')
+    refresh_scheduler.connect(request.sid)
+    
+    # Deliver fired alerts for the logged-in user
+    if 'user' in session:
+        join_room(f"user_{session['user']['id']}")
     emit('connected', {'data': 'Connected to real-time updates'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     print('Client disconnected')
+    refresh_scheduler.disconnect(request.sid)
+
+@socketio.on('subscribe_analysis')
+def handle_subscribe_analysis(data=None):
+    """Join the room that receives analysis results for a symbol"""
+    if data and isinstance(data, dict) and data.get('symbol'):
+        join_room(f"analysis_{data['symbol'].upper()}")
 
 @socketio.on('subscribe_stock')
 def handle_subscribe(data=None):
@@ -662,6 +1107,9 @@ def handle_subscribe(data=None):
     if data and isinstance(data, dict):
         symbol = data.get('symbol')
         if symbol:
+            symbol = symbol.upper()
+            refresh_scheduler.subscribe(request.sid, symbol)
+            join_room(f"quote_{symbol}")
             price, change_pct = get_cached_price(symbol)
             if price:
                 emit('price_update', {
@@ -673,20 +1121,81 @@ def handle_subscribe(data=None):
                     }]
                 })
 
+# Background services, started once per process by create_app()
+scheduler = None
+services_lock = threading.Lock()
+services_stopping = threading.Event()
+
+def warm_up():
+    """Startup data loads, kept off the boot path so workers serve requests immediately"""
+    # Followers read the leader's trending list
+    if fetch_lease.hold():
+        update_trending_stocks()
+
+def start_background_services():
+    """Start the CPU pool, scheduled jobs and price broadcast loop"""
+    global scheduler
+    with services_lock:
+        if scheduler is not None:
+            return
+        services_stopping.clear()
+        
+        # Fork CPU workers before any background threads start
+        if cpu_pool is not None:
+            if green_threads():
+                print("Warning: the CPU pool under gevent/eventlet can hang; run gunicorn with "
+                      "GUNICORN_WORKER_CLASS=gthread or set CPU_POOL_WORKERS=0")
+            cpu_pool.start()
+        
+        load_alert_rules()
+        
+        # Schedule updates every hour
+        from apscheduler.schedulers.background import BackgroundScheduler
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(func=scheduled_job('update_trending_stocks', update_trending_stocks), trigger="interval", hours=1)
+        scheduler.add_job(func=scheduled_job('refresh_symbol_index', symbol_index.refresh, leader_only=False), trigger="interval", hours=24)
+        scheduler.add_job(func=scheduled_job('score_universes', universe_scorer.rescore_requested), trigger="interval", hours=1)
+        scheduler.add_job(func=scheduled_job('prune_score_history', score_history.prune), trigger="interval", hours=24)
+        scheduler.start()
+        
+        # Green threads under gevent/eventlet, OS threads otherwise
+        socketio.start_background_task(warm_up)
+        socketio.start_background_task(broadcast_price_updates)
+    print(f"Background services started (async mode: {socketio.async_mode})")
+
+def stop_background_services():
+    """Stop scheduled jobs and the broadcast loop, and hand the fetch lease to another node"""
+    global scheduler
+    with services_lock:
+        if scheduler is None:
+            return
+        services_stopping.set()
+        scheduler.shutdown(wait=False)
+        scheduler = None
+        fetch_lease.release()
+        if cpu_pool is not None:
+            cpu_pool.shutdown()
+    print("Background services stopped")
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe for load balancers and the deploy platform"""
+    return jsonify({
+        'status': 'ok',
+        'services': scheduler is not None,
+        'fetch_leader': fetch_lease.held,
+        'profile': profile.name,
+        'async_mode': socketio.async_mode
+    })
+
+def create_app():
+    """Application factory for WSGI servers (see gunicorn.conf.py)"""
+    start_background_services()
+    return app
+
 if __name__ == '__main__':
-    # Initialize trending stocks on startup
-    update_trending_stocks()
-    
-    # Schedule updates every hour
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(func=update_trending_stocks, trigger="interval", hours=1)
-    scheduler.add_job(func=check_watchlist_alerts, trigger="interval", minutes=30)
-    scheduler.start()
-    
-    # Start real-time price updates thread
-    real_time_thread = threading.Thread(target=broadcast_price_updates)
-    real_time_thread.daemon = True
-    real_time_thread.start()
-    
-    # Run the app with SocketIO
-    socketio.run(app, debug=True)
+    create_app()
+    atexit.register(stop_background_services)
+    
+    # Run the app with SocketIO (the reloader would start a second set of services)
+    socketio.run(app, debug=True, use_reloader=False)
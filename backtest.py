@@ -0,0 +1,347 @@
+"""Offline backtest of the trend/sentiment scoring model over the price archive
+
+    python backtest.py --horizon 21 --workers 4
+    python backtest.py --universe technology --grid "volume_ratio=1.2,1.5;rsi_high=70,80" --thresholds 0.4,0.5,0.6
+
+Trend scores are recomputed for every trading day and symbol with the same
+trailing 3-month window as StockAnalyzer.analyze_trend, vectorized per
+symbol, and compared with forward returns. Parameter grids are evaluated in
+parallel on a forked process pool; indicator series are computed once per
+(ma_short, ma_long, rsi_period) and reused across weights and thresholds.
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from price_archive import PriceArchive, PERIOD_DAYS
+from stock_analyzer import TREND_PARAMS, score_trend
+from universes import SENTIMENT_WEIGHT
+
+# analyze_trend scores the trailing 3 months of bars
+WINDOW_DAYS = PERIOD_DAYS['3mo']
+INDICATOR_KEYS = ('ma_short', 'ma_long', 'rsi_period')
+
+DEFAULT_GRID = {
+    'above_short_weight': [0.2, 0.3, 0.4],
+    'crossover_weight': [0.1, 0.2, 0.3],
+    'rsi_high': [70, 80],
+    'volume_ratio': [1.2, 1.5],
+    'ma_long': [50, 60]
+}
+
+def _rolling_mean(values, window):
+    """Trailing mean over `window` rows, NaN until enough rows"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+def symbol_features(dates, close, volume, params):
+    """Indicator series for every day of one symbol, as analyze_trend would see them"""
+    n = len(close)
+    # First row of each day's trailing window, and the window's row count
+    start = np.searchsorted(dates, dates - WINDOW_DAYS + 1)
+    rows = np.arange(n) - start + 1
+
+    ma_short = _rolling_mean(close, params['ma_short'])
+    ma_long = _rolling_mean(close, params['ma_long'])
+
+    delta = np.diff(close, prepend=np.nan)
+    avg_gain = _rolling_mean(np.where(delta > 0, delta, 0.0), params['rsi_period'])
+    avg_loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), params['rsi_period'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    volume = volume.astype(np.float64)
+    sums = np.cumsum(np.insert(volume, 0, 0.0))
+    index = np.arange(n)
+    recent = np.minimum(5, rows)
+
+    return {
+        'above_short': close > ma_short,
+        'above_long': close > ma_long,
+        'crossover': ma_short > ma_long,
+        'rsi': rsi,
+        'recent_volume': (sums[index + 1] - sums[index + 1 - recent]) / recent,
+        'avg_volume': (sums[index + 1] - sums[start]) / rows,
+        # Days whose window holds enough bars for every indicator
+        'valid': rows >= max(params['ma_long'], params['ma_short'], params['rsi_period'] + 1)
+    }
+
+def trend_scores(features, params):
+    """Vectorized score_trend over precomputed indicator series"""
+    p = {**TREND_PARAMS, **params}
+    score = p['above_short_weight'] * features['above_short']
+    score = score + p['above_long_weight'] * features['above_long']
+    score = score + p['crossover_weight'] * features['crossover']
+
+    rsi = features['rsi']
+    band = (rsi > p['rsi_low']) & (rsi < p['rsi_high'])
+    score = score + np.where(band, p['rsi_band_weight'], np.where(rsi < p['rsi_oversold'], p['oversold_weight'], 0.0))
+
+    score = score + p['volume_weight'] * (features['recent_volume'] > features['avg_volume'] * p['volume_ratio'])
+    return np.minimum(score, 1.0)
+
+class Panel:
+    """Daily bars for many symbols flattened into one array per field"""
+
+    def __init__(self, series, horizons, sentiment=None):
+        self.series = series
+        self.symbols = sorted(series)
+        self.horizons = horizons
+        self.features = {}
+
+        forward = {h: [] for h in horizons}
+        sentiments = []
+        for symbol in self.symbols:
+            dates, close, _ = series[symbol]
+            for h in horizons:
+                ret = np.full(len(close), np.nan)
+                if len(close) > h:
+                    ret[:-h] = close[h:] / close[:-h] - 1
+                forward[h].append(ret)
+
+            # As-of join of stored daily sentiment, neutral where none was recorded
+            values = np.full(len(close), 0.5)
+            if sentiment and symbol in sentiment:
+                days, scores = sentiment[symbol]
+                position = np.searchsorted(days, dates, side='right') - 1
+                found = (position >= 0) & (dates - days[np.maximum(position, 0)] <= 3)
+                values[found] = scores[position[found]]
+            sentiments.append(values)
+
+        self.forward = {h: np.concatenate(forward[h]) if self.symbols else np.array([]) for h in horizons}
+        self.sentiment = np.concatenate(sentiments) if self.symbols else np.array([])
+
+    def features_for(self, params):
+        """Flattened indicator series, computed once per indicator configuration"""
+        p = {**TREND_PARAMS, **params}
+        key = tuple(p[k] for k in INDICATOR_KEYS)
+        if key not in self.features:
+            parts = [symbol_features(*self.series[symbol], p) for symbol in self.symbols]
+            self.features[key] = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        return self.features[key]
+
+def bucket_stats(scores, forward, valid):
+    """Forward-return statistics per 0.1 score bucket"""
+    ok = valid & ~np.isnan(forward)
+    buckets = np.round(scores[ok], 1)
+    returns = forward[ok]
+    stats = []
+    for bucket in np.unique(buckets):
+        r = returns[buckets == bucket]
+        stats.append({
+            'bucket': float(bucket),
+            'count': int(len(r)),
+            'mean_return': float(r.mean()),
+            'median_return': float(np.median(r)),
+            'hit_rate': float((r > 0).mean())
+        })
+    return stats
+
+def evaluate(panel, params, sentiment_weight, thresholds, horizon):
+    """Selection statistics for one parameter set at every threshold"""
+    features = panel.features_for(params)
+    trend = trend_scores(features, params)
+    overall = sentiment_weight * panel.sentiment + (1 - sentiment_weight) * trend
+
+    forward = panel.forward[horizon]
+    ok = features['valid'] & ~np.isnan(forward)
+    returns = forward[ok]
+    overall = overall[ok]
+    baseline = float(returns.mean()) if len(returns) else 0.0
+    ic = float(np.corrcoef(overall, returns)[0, 1]) if len(returns) > 1 and overall.std() > 0 else 0.0
+
+    results = []
+    for threshold in thresholds:
+        selected = returns[overall > threshold]
+        results.append({
+            'params': params,
+            'sentiment_weight': sentiment_weight,
+            'threshold': threshold,
+            'selected': int(len(selected)),
+            'selected_share': len(selected) / len(returns) if len(returns) else 0.0,
+            'mean_return': float(selected.mean()) if len(selected) else 0.0,
+            'excess_return': float(selected.mean()) - baseline if len(selected) else 0.0,
+            'hit_rate': float((selected > 0).mean()) if len(selected) else 0.0,
+            'ic': ic
+        })
+    return results
+
+# Set before the pool forks so workers inherit the panel without pickling it
+_panel = None
+
+def _evaluate_task(task):
+    params, sentiment_weight, thresholds, horizon = task
+    return evaluate(_panel, params, sentiment_weight, thresholds, horizon)
+
+def sweep(panel, grid, sentiment_weights, thresholds, horizon, workers):
+    """Evaluate every grid combination, in parallel when workers > 1"""
+    global _panel
+    _panel = panel
+    keys = sorted(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    # Group by indicator configuration so each worker reuses its cached series
+    combos.sort(key=lambda c: tuple(c.get(k, TREND_PARAMS[k]) for k in INDICATOR_KEYS))
+    tasks = [(combo, w, thresholds, horizon) for combo in combos for w in sentiment_weights]
+
+    if workers <= 1:
+        chunks = map(_evaluate_task, tasks)
+        return [row for chunk in chunks for row in chunk]
+
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+        return [row for chunk in executor.map(_evaluate_task, tasks, chunksize=chunksize) for row in chunk]
+
+def verify(panel, samples, seed=7):
+    """Compare vectorized scores with score_trend on sampled symbol-days"""
+    rng = random.Random(seed)
+    features = panel.features_for({})
+    scores = trend_scores(features, {})
+    offsets = np.cumsum([0] + [len(panel.series[s][0]) for s in panel.symbols])
+
+    matches = checked = 0
+    for _ in range(samples):
+        i = rng.randrange(len(panel.symbols))
+        dates, close, volume = panel.series[panel.symbols[i]]
+        valid = np.nonzero(features['valid'][offsets[i]:offsets[i + 1]])[0]
+        if not len(valid):
+            continue
+        t = int(rng.choice(valid))
+        start = int(np.searchsorted(dates, dates[t] - WINDOW_DAYS + 1))
+        expected = score_trend(close[start:t + 1], volume[start:t + 1])
+        checked += 1
+        matches += abs(expected - scores[offsets[i] + t]) < 1e-9
+    return matches, checked
+
+def load_series(archive, symbols, years):
+    """Archived (dates, closes, volumes) per symbol, trimmed to years plus one window"""
+    series = {}
+    for symbol in symbols:
+        columns = archive.get_columns(symbol, 'max', refresh=False)
+        if columns is None or not len(columns['date']):
+            continue
+        dates = np.asarray(columns['date'])
+        first = np.searchsorted(dates, dates[-1] - int(years * 365.25) - WINDOW_DAYS)
+        series[symbol] = (dates[first:].copy(), np.asarray(columns['Close'][first:], dtype=np.float64),
+                          np.asarray(columns['Volume'][first:], dtype=np.float64))
+    return series
+
+def load_sentiment(db_path, universe):
+    """Daily last stored sentiment per symbol from the score_history table"""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT symbol, scored_at / 86400 AS day, sentiment, MAX(scored_at)
+            FROM score_history WHERE universe = ?
+            GROUP BY symbol, day ORDER BY symbol, day
+        ''', (universe,)).fetchall()
+    except sqlite3.Error as e:
+        print(f"Error reading score history from {db_path}: {e}")
+        return {}
+    finally:
+        conn.close()
+
+    sentiment = {}
+    for symbol, day, score, _ in rows:
+        days, scores = sentiment.setdefault(symbol, ([], []))
+        days.append(day)
+        scores.append(score)
+    return {symbol: (np.array(days, dtype=np.int64), np.array(scores)) for symbol, (days, scores) in sentiment.items()}
+
+def parse_grid(text):
+    """'key=v1,v2;key2=v3' -> {key: [v1, v2], key2: [v3]}"""
+    grid = {}
+    for part in filter(None, (p.strip() for p in text.split(';'))):
+        key, values = part.split('=', 1)
+        if key not in TREND_PARAMS:
+            raise SystemExit(f"Unknown trend parameter {key}; expected one of {', '.join(TREND_PARAMS)}")
+        cast = int if key in INDICATOR_KEYS else float
+        grid[key] = [cast(v) for v in values.split(',')]
+    return grid
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--archive-dir', default='price_archive')
+    parser.add_argument('--symbols', help='comma-separated symbols (default: every archived symbol)')
+    parser.add_argument('--universe', help='score a universe from data/universes.json instead')
+    parser.add_argument('--refresh', action='store_true', help='update the archive from yfinance first')
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--horizon', type=int, default=21, help='forward return horizon in trading days')
+    parser.add_argument('--grid', help="parameter grid, e.g. 'volume_ratio=1.2,1.5;ma_long=50,60'")
+    parser.add_argument('--sentiment-weights', default=str(SENTIMENT_WEIGHT))
+    parser.add_argument('--thresholds', default='0.4,0.5,0.6')
+    parser.add_argument('--sentiment-db', default='stro.db', help='database with score_history for sentiment')
+    parser.add_argument('--sentiment-universe', default='trending')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--verify', type=int, default=200, help='symbol-days checked against score_trend')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    archive = PriceArchive(archive_dir=args.archive_dir)
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    elif args.universe:
+        from symbol_index import SymbolIndex
+        from universes import UniverseRegistry
+        symbols = UniverseRegistry(SymbolIndex()).symbols(args.universe)
+    else:
+        symbols = sorted(name for name in os.listdir(args.archive_dir)
+                         if os.path.isdir(os.path.join(args.archive_dir, name)))
+    if args.refresh:
+        archive.update_many(symbols)
+
+    start = time.perf_counter()
+    series = load_series(archive, symbols, args.years)
+    if not series:
+        raise SystemExit(f"No archived history for {len(symbols)} symbols in {args.archive_dir}")
+    panel = Panel(series, [args.horizon], load_sentiment(args.sentiment_db, args.sentiment_universe))
+    observations = int(sum(len(s[0]) for s in series.values()))
+    print(f"Loaded {len(series)} symbols, {observations} symbol-days in {time.perf_counter() - start:.1f}s")
+
+    if args.verify:
+        matches, checked = verify(panel, args.verify)
+        print(f"Vectorized scores match score_trend on {matches}/{checked} sampled symbol-days")
+
+    features = panel.features_for({})
+    buckets = bucket_stats(trend_scores(features, {}), panel.forward[args.horizon], features['valid'])
+    print(f"\nCurrent trend model, {args.horizon}-day forward returns by score bucket")
+    print(f"{'bucket':>6} {'count':>9} {'mean':>8} {'median':>8} {'hit':>6}")
+    for row in buckets:
+        print(f"{row['bucket']:>6.1f} {row['count']:>9} {row['mean_return']:>8.2%} "
+              f"{row['median_return']:>8.2%} {row['hit_rate']:>6.1%}")
+
+    grid = parse_grid(args.grid) if args.grid else DEFAULT_GRID
+    sentiment_weights = [float(w) for w in args.sentiment_weights.split(',')]
+    thresholds = [float(t) for t in args.thresholds.split(',')]
+
+    start = time.perf_counter()
+    results = sweep(panel, grid, sentiment_weights, thresholds, args.horizon, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"\nSwept {len(results)} parameter sets in {elapsed:.1f}s on {args.workers} workers")
+
+    # Rank by excess forward return, ignoring selections too small to mean anything
+    ranked = sorted((r for r in results if r['selected_share'] >= 0.01),
+                    key=lambda r: r['excess_return'], reverse=True)
+    print(f"{'excess':>8} {'mean':>8} {'hit':>6} {'share':>6} {'ic':>6} {'sw':>4} {'thr':>4}  params")
+    for r in ranked[:args.top]:
+        print(f"{r['excess_return']:>8.2%} {r['mean_return']:>8.2%} {r['hit_rate']:>6.1%} {r['selected_share']:>6.1%} "
+              f"{r['ic']:>6.3f} {r['sentiment_weight']:>4.2f} {r['threshold']:>4.2f}  {json.dumps(r['params'])}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'buckets': buckets, 'sweep': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Cold-import time and baseline RSS of the app per deployment profile
+
+    python benchmarks/import_budget.py --profiles lite,standard
+
+Each run imports app.py in a fresh interpreter (in a scratch directory, so
+no database or caches carry over), then calls create_app() and lets the
+background services run for a few seconds. The median import time, the
+peak RSS after the import and the peak RSS with the services running are
+checked against the profile's budget, as is that modules belonging to
+disabled subsystems were never imported. Exits non-zero on any violation.
+tests/test_import_budget.py runs the same checks for lite and standard.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# profile -> (max import seconds, max RSS MB after import, max RSS MB with services running);
+# None means unbudgeted. lite has to fit a 150 MB free-tier instance.
+BUDGETS = {
+    'lite': (1.0, 120, 150),
+    'standard': (1.5, 160, 200),
+    'full': (None, None, None)
+}
+
+# Seconds the services run after create_app() before RSS is read
+SETTLE_SECONDS = 5
+
+# Modules that must stay unimported after `import app`
+FORBIDDEN = {
+    'lite': ('transformers', 'torch', 'newsapi', 'yfinance', 'apscheduler'),
+    'standard': ('transformers', 'torch', 'yfinance', 'apscheduler'),
+    'full': ('yfinance', 'apscheduler')
+}
+
+CHILD = """
+import os, sys, json, time, resource
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+modules = [name for name in {forbidden!r} if name in sys.modules]
+
+app.create_app()
+time.sleep({settle!r})
+print(json.dumps({{
+    'seconds': seconds,
+    'rss_mb': rss_mb,
+    'running_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': modules
+}}), flush=True)
+app.stop_background_services()
+os._exit(0)
+"""
+
+def measure(profile, runs, settle=SETTLE_SECONDS):
+    """Median import seconds, max RSS MB after import and with services running, and forbidden modules
+    over `runs` fresh interpreters"""
+    env = dict(os.environ, STRO_PROFILE=profile, NEWS_API_KEY=os.environ.get('NEWS_API_KEY', 'budget'))
+    code = CHILD.format(root=ROOT, forbidden=FORBIDDEN[profile], settle=settle)
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix='stro-import-') as workdir:
+            proc = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env,
+                                  capture_output=True, text=True, timeout=300)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed')
+        results.append(json.loads(next(line for line in reversed(proc.stdout.splitlines())
+                                       if line.startswith('{'))))
+    return (statistics.median(r['seconds'] for r in results),
+            max(r['rss_mb'] for r in results),
+            max(r['running_rss_mb'] for r in results),
+            sorted({name for r in results for name in r['modules']}))
+
+def violations(profile, seconds, rss, running_rss, modules):
+    """Budget problems for one profile's measurements, as short descriptions"""
+    max_seconds, max_rss, max_running_rss = BUDGETS[profile]
+    problems = []
+    if max_seconds is not None and seconds > max_seconds:
+        problems.append('slow import')
+    if max_rss is not None and rss > max_rss:
+        problems.append('import RSS over budget')
+    if max_running_rss is not None and running_rss > max_running_rss:
+        problems.append('running RSS over budget')
+    if modules:
+        problems.append(f"imported {', '.join(modules)}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default=','.join(BUDGETS), help='comma-separated profiles to check')
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters per profile')
+    parser.add_argument('--settle', type=float, default=SETTLE_SECONDS,
+                        help='seconds the background services run before RSS is read')
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'profile':10} {'import s':>9} {'budget':>7} {'RSS MB':>7} {'budget':>7} "
+          f"{'running':>8} {'budget':>7}  result")
+    for profile in args.profiles.split(','):
+        max_seconds, max_rss, max_running_rss = BUDGETS[profile]
+        try:
+            seconds, rss, running_rss, modules = measure(profile, args.runs, args.settle)
+        except Exception as e:
+            print(f"{profile:10} error: {e}")
+            failures += 1
+            continue
+
+        problems = violations(profile, seconds, rss, running_rss, modules)
+        failures += bool(problems)
+        print(f"{profile:10} {seconds:9.2f} {max_seconds or '-':>7} {rss:7.0f} {max_rss or '-':>7} "
+              f"{running_rss:8.0f} {max_running_rss or '-':>7}  {'; '.join(problems) or 'ok'}")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Record live yfinance and NewsAPI responses into benchmark fixtures
+
+    python benchmarks/record.py AAPL MSFT NVDA
+    python benchmarks/record.py --synthetic AAPL MSFT NVDA
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.replay import FIXTURE_DIR, write_synthetic_fixtures
+
+# Fields the app reads from .info; the full payload is mostly noise
+INFO_FIELDS = [
+    'longName', 'currentPrice', 'regularMarketPrice', 'marketCap', 'trailingPE',
+    'dividendYield', 'sector', 'fullTimeEmployees', 'totalRevenue', 'longBusinessSummary'
+]
+
+def record(symbol, newsapi):
+    import yfinance as yf
+
+    ticker = yf.Ticker(symbol)
+    info = ticker.info
+    hist = ticker.history(period='5y')
+
+    articles = []
+    if newsapi is not None:
+        from_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+        response = newsapi.get_everything(
+            q=f"{info.get('longName', symbol)} OR {symbol} stock",
+            from_param=from_date,
+            language='en',
+            sort_by='relevancy',
+            page_size=20
+        )
+        articles = response.get('articles', [])
+
+    fixture = {
+        'symbol': symbol,
+        'recorded_at': datetime.now().isoformat(),
+        'info': {field: info[field] for field in INFO_FIELDS if field in info},
+        'history': {
+            'dates': hist.index.strftime('%Y-%m-%d').tolist(),
+            'open': hist['Open'].round(4).tolist(),
+            'high': hist['High'].round(4).tolist(),
+            'low': hist['Low'].round(4).tolist(),
+            'close': hist['Close'].round(4).tolist(),
+            'volume': hist['Volume'].astype(int).tolist()
+        },
+        'news': articles
+    }
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with open(os.path.join(FIXTURE_DIR, f"{symbol}.json"), 'w') as f:
+        json.dump(fixture, f)
+    print(f"Recorded {symbol}: {len(hist)} bars, {len(articles)} articles")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--synthetic', action='store_true', help='generate random-walk fixtures instead of recording')
+    args = parser.parse_args()
+
+    symbols = [symbol.upper() for symbol in args.symbols]
+    if args.synthetic:
+        write_synthetic_fixtures(symbols)
+        print(f"Wrote synthetic fixtures for {len(symbols)} symbols to {FIXTURE_DIR}")
+        return
+
+    newsapi = None
+    if os.getenv('NEWS_API_KEY'):
+        from newsapi import NewsApiClient
+        newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'))
+
+    for symbol in symbols:
+        try:
+            record(symbol, newsapi)
+        except Exception as e:
+            print(f"Error recording {symbol}: {e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Local stand-ins for yfinance, NewsAPI and FinBERT that replay recorded fixtures
+
+install() must run before the app is imported so the app binds to these
+modules instead of the real clients.
+"""
+import os
+import sys
+import json
+import time
+import types
+import zlib
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Calendar days per yfinance period string
+PERIOD_DAYS = {'1d': 1, '2d': 2, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827}
+
+class ReplayUpstream:
+    """Serves fixture data with a configurable per-call latency and counts every call"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, latency_ms=50, sentiment_ms=20):
+        self.fixture_dir = fixture_dir
+        self.latency = latency_ms / 1000
+        self.sentiment_latency = sentiment_ms / 1000
+        self.fixtures = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+        for filename in os.listdir(fixture_dir):
+            if filename.endswith('.json'):
+                with open(os.path.join(fixture_dir, filename), 'r') as f:
+                    fixture = json.load(f)
+                self.fixtures[fixture['symbol']] = fixture
+
+    def _call(self, name):
+        with self.lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def snapshot(self):
+        with self.lock:
+            return Counter(self.calls)
+
+    def info(self, symbol):
+        self._call('yfinance.info')
+        fixture = self.fixtures.get(symbol.upper())
+        return dict(fixture['info']) if fixture else {}
+
+    def _frame(self, symbol, period=None, start=None):
+        fixture = self.fixtures.get(symbol.upper())
+        if not fixture:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+
+        hist = fixture.get('_frame')
+        if hist is None:
+            data = fixture['history']
+            index = pd.DatetimeIndex(data['dates']).tz_localize('America/New_York')
+            hist = pd.DataFrame({
+                'Open': data['open'], 'High': data['high'], 'Low': data['low'],
+                'Close': data['close'], 'Volume': data['volume']
+            }, index=index)
+            fixture['_frame'] = hist
+
+        if start is not None:
+            return hist[hist.index >= pd.Timestamp(start, tz='America/New_York')].copy()
+        days = PERIOD_DAYS.get(period or '1mo')
+        if days is None:
+            return hist.copy()
+        return hist[hist.index > hist.index[-1] - pd.Timedelta(days=days)].copy()
+
+    def history(self, symbol, period=None, start=None, **kwargs):
+        self._call('yfinance.history')
+        return self._frame(symbol, period, start)
+
+    def download(self, tickers, period='1mo', **kwargs):
+        """Batched history in yfinance.download's group_by='ticker' layout"""
+        self._call('yfinance.download')
+        frames = {symbol: self._frame(symbol, period) for symbol in tickers if symbol.upper() in self.fixtures}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    def news(self, query):
+        self._call('newsapi.everything')
+        for symbol, fixture in self.fixtures.items():
+            if f" {symbol} stock" in f" {query}":
+                return {'status': 'ok', 'articles': fixture.get('news', [])}
+        return {'status': 'ok', 'articles': []}
+
+    def headlines(self):
+        self._call('newsapi.top_headlines')
+        articles = [article for fixture in self.fixtures.values() for article in fixture.get('news', [])[:2]]
+        return {'status': 'ok', 'articles': articles}
+
+    def sentiment(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        self._call('finbert.texts')
+        time.sleep(self.sentiment_latency * len(texts))
+
+        # Deterministic label per text so runs are comparable
+        results = []
+        for text in texts:
+            h = zlib.crc32(text.encode())
+            label = ('positive', 'negative', 'neutral')[h % 3]
+            results.append({'label': label, 'score': 0.5 + (h % 500) / 1000})
+        return results
+
+    def install(self, fake_sentiment=True):
+        """Register the stand-in modules in sys.modules"""
+        upstream = self
+
+        yfinance = types.ModuleType('yfinance')
+
+        class Ticker:
+            def __init__(self, symbol):
+                self.symbol = symbol
+
+            @property
+            def info(self):
+                return upstream.info(self.symbol)
+
+            def history(self, **kwargs):
+                return upstream.history(self.symbol, **kwargs)
+
+        yfinance.Ticker = Ticker
+        yfinance.download = lambda tickers, **kwargs: upstream.download(tickers, **kwargs)
+        sys.modules['yfinance'] = yfinance
+
+        newsapi = types.ModuleType('newsapi')
+
+        class NewsApiClient:
+            def __init__(self, api_key=None):
+                pass
+
+            def get_everything(self, q='', **kwargs):
+                return upstream.news(q)
+
+            def get_top_headlines(self, **kwargs):
+                return upstream.headlines()
+
+        newsapi.NewsApiClient = NewsApiClient
+        sys.modules['newsapi'] = newsapi
+
+        if fake_sentiment:
+            transformers = types.ModuleType('transformers')
+            transformers.pipeline = lambda *args, **kwargs: upstream.sentiment
+            sys.modules['transformers'] = transformers
+
+            torch = types.ModuleType('torch')
+            torch.set_num_threads = lambda n: None
+            torch.set_num_interop_threads = lambda n: None
+            sys.modules['torch'] = torch
+
+def write_synthetic_fixtures(symbols, fixture_dir=FIXTURE_DIR, days=1300, seed=7):
+    """Generate deterministic random-walk fixtures for symbols that have no recording"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+
+    for symbol in symbols:
+        path = os.path.join(fixture_dir, f"{symbol}.json")
+        if os.path.exists(path):
+            continue
+
+        close = 50 + rng.uniform(0, 300) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+        spread = close * rng.uniform(0.002, 0.02, days)
+        fixture = {
+            'symbol': symbol,
+            'synthetic': True,
+            'info': {
+                'longName': f"{symbol} Synthetic Corp.",
+                'currentPrice': round(float(close[-1]), 2),
+                'marketCap': int(rng.uniform(1e9, 2e12)),
+                'trailingPE': round(float(rng.uniform(5, 80)), 2),
+                'dividendYield': round(float(rng.uniform(0, 0.04)), 4),
+                'sector': 'Technology',
+                'longBusinessSummary': f"{symbol} is a synthetic company used for offline benchmarks."
+            },
+            'history': {
+                'dates': [d.strftime('%Y-%m-%d') for d in dates],
+                'open': np.round(close - spread / 2, 4).tolist(),
+                'high': np.round(close + spread, 4).tolist(),
+                'low': np.round(close - spread, 4).tolist(),
+                'close': np.round(close, 4).tolist(),
+                'volume': rng.integers(1_000_000, 50_000_000, days).tolist()
+            },
+            'news': [{
+                'title': f"{symbol} {word} after quarterly results",
+                'description': f"Analysts discuss {symbol} {word} in a busy trading session.",
+                'url': f"https://example.com/{symbol.lower()}/{i}",
+                'publishedAt': dates[-1 - i].strftime('%Y-%m-%dT12:00:00Z'),
+                'source': {'name': 'Synthetic Wire'}
+            } for i, word in enumerate(['rallies', 'slips', 'holds steady', 'beats estimates', 'misses estimates'])]
+        }
+        with open(path, 'w') as f:
+            json.dump(fixture, f)
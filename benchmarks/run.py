@@ -0,0 +1,195 @@
+"""Offline load benchmark for the Stro app against replayed upstream fixtures
+
+    python benchmarks/run.py --latency-ms 50 --concurrency 8 --requests 100
+
+Every upstream call (yfinance, NewsAPI, FinBERT) is served by
+benchmarks/replay.py, so runs are reproducible and need no network or API
+keys. The fixtures in benchmarks/fixtures are committed; a symbol without one
+gets a synthetic random walk (dated up to today, so not comparable across
+days), and benchmarks/record.py re-records them from the live APIs.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.replay import FIXTURE_DIR, ReplayUpstream, write_synthetic_fixtures
+
+BENCH_SYMBOLS = [
+    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA', 'JPM', 'V', 'JNJ',
+    'WMT', 'PG', 'UNH', 'HD', 'DIS', 'PYPL', 'NFLX', 'ADBE', 'CRM', 'PFE',
+    'PLTR', 'RBLX', 'AI', 'SOFI', 'LCID', 'RIVN', 'NIO', 'HOOD', 'DKNG', 'SPY'
+]
+WATCHLIST = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'PLTR', 'SOFI', 'AMZN', 'META', 'NFLX', 'DIS']
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class Bench:
+    def __init__(self, app_module, upstream, concurrency, requests):
+        self.app = app_module
+        self.upstream = upstream
+        self.concurrency = concurrency
+        self.requests = requests
+        self.results = []
+        self.local = threading.local()
+
+    def client(self):
+        """One logged-in test client per worker thread"""
+        if not hasattr(self.local, 'client'):
+            client = self.app.app.test_client()
+            client.post('/api/auth/login', json={'username': 'bench', 'password': 'benchmark'})
+            self.local.client = client
+        return self.local.client
+
+    def record(self, name, latencies, errors, elapsed, calls_before):
+        calls = self.upstream.snapshot() - calls_before
+        self.results.append({
+            'scenario': name,
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'upstream_calls': dict(calls)
+        })
+
+    def job(self, name, fn):
+        """Time a background job run once on this thread"""
+        calls_before = self.upstream.snapshot()
+        start = time.perf_counter()
+        errors = 0
+        try:
+            fn()
+        except Exception as e:
+            print(f"Error running {name}: {e}")
+            errors = 1
+        elapsed = time.perf_counter() - start
+        self.record(name, [elapsed], errors, elapsed, calls_before)
+
+    def http(self, name, method, paths, json_body=None):
+        """Issue self.requests requests across self.concurrency threads"""
+        calls_before = self.upstream.snapshot()
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def one(i):
+            path = paths[i % len(paths)]
+            body = json_body(path) if callable(json_body) else json_body
+            start = time.perf_counter()
+            response = getattr(self.client(), method)(path, json=body)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 500:
+                    errors[0] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(one, range(self.requests)))
+        self.record(name, latencies, errors[0], time.perf_counter() - start, calls_before)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=50, help='added latency per upstream call')
+    parser.add_argument('--sentiment-ms', type=float, default=20, help='simulated FinBERT cost per text')
+    parser.add_argument('--real-sentiment', action='store_true', help='run the real FinBERT model instead')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help='requests per HTTP scenario')
+    parser.add_argument('--cpu-workers', type=int, default=0, help='CPU_POOL_WORKERS for the app')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    missing = [s for s in BENCH_SYMBOLS if not os.path.exists(os.path.join(FIXTURE_DIR, f"{s}.json"))]
+    if missing:
+        print(f"Generating synthetic fixtures for {len(missing)} symbols without recordings")
+        write_synthetic_fixtures(missing)
+
+    upstream = ReplayUpstream(latency_ms=args.latency_ms, sentiment_ms=args.sentiment_ms)
+    upstream.install(fake_sentiment=not args.real_sentiment)
+
+    # Run against a scratch directory so the database and caches start cold
+    workdir = tempfile.mkdtemp(prefix='stro-bench-')
+    os.chdir(workdir)
+    os.environ['CPU_POOL_WORKERS'] = str(args.cpu_workers)
+    os.environ.setdefault('NEWS_API_KEY', 'benchmark')
+
+    try:
+        import_start = time.perf_counter()
+        import app as app_module
+        import_seconds = time.perf_counter() - import_start
+        if app_module.cpu_pool is not None:
+            app_module.cpu_pool.start()
+
+        app_module.app.test_client().post('/api/auth/register', json={
+            'username': 'bench', 'email': 'bench@example.com', 'password': 'benchmark'
+        })
+
+        bench = Bench(app_module, upstream, args.concurrency, args.requests)
+        bench.job('update_trending_stocks', app_module.update_trending_stocks)
+        bench.job('update_trending_stocks (warm)', app_module.update_trending_stocks)
+        bench.http('GET /api/trending-stocks', 'get', ['/api/trending-stocks'])
+        bench.http('GET /api/upcoming-stocks', 'get', ['/api/upcoming-stocks'])
+        bench.http('GET /api/stock/<symbol>?analyze=true', 'get',
+                   [f"/api/stock/{s}?analyze=true" for s in BENCH_SYMBOLS[:10]])
+        bench.http('POST /api/watchlist', 'post', ['/api/watchlist'] * len(WATCHLIST),
+                   json_body=iter_symbols(WATCHLIST))
+        bench.http('GET /api/watchlist', 'get', ['/api/watchlist'])
+        bench.http('GET /api/alerts', 'get', ['/api/alerts'])
+        app_module.load_alert_rules()
+        bench.job('evaluate_alert_rules (baseline tick)', app_module.evaluate_alert_rules)
+        bench.job('evaluate_alert_rules', app_module.evaluate_alert_rules)
+
+        report(bench.results, import_seconds, args)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def iter_symbols(symbols):
+    """Body factory handing out each symbol in turn"""
+    lock = threading.Lock()
+    state = {'i': 0}
+
+    def body(path):
+        with lock:
+            symbol = symbols[state['i'] % len(symbols)]
+            state['i'] += 1
+        return {'symbol': symbol}
+    return body
+
+def report(results, import_seconds, args):
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print()
+    print(f"{'scenario':42} {'reqs':>5} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9}  upstream calls")
+    for result in results:
+        calls = ', '.join(f"{name}={count}" for name, count in sorted(result['upstream_calls'].items()))
+        print(f"{result['scenario']:42} {result['requests']:>5} {result['errors']:>4} "
+              f"{result['throughput_rps']:>8.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}  {calls}")
+    print()
+    print(f"app import: {import_seconds:.2f}s   peak RSS: {peak_rss_mb:.0f} MB")
+
+    if args.json:
+        with open(os.path.join(ROOT, args.json) if not os.path.isabs(args.json) else args.json, 'w') as f:
+            json.dump({
+                'settings': vars(args),
+                'import_seconds': import_seconds,
+                'peak_rss_mb': peak_rss_mb,
+                'scenarios': results
+            }, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Agreement and throughput of the lexicon -> FinBERT sentiment cascade
+
+    python benchmarks/sentiment_cascade.py --cache-dir cache --thresholds 0.2,0.3,0.45,0.6,0.8
+
+Scores every cached news text (cache/news_*.json, plus fixture news) with
+FinBERT alone and with the cascade at each escalation threshold, and
+reports the share of texts escalated, label agreement and mean absolute
+error against FinBERT-only scores, and the resulting FinBERT speedup.
+--fake-sentiment uses the replay stand-in for FinBERT, which only
+exercises the plumbing; agreement numbers need the real model.
+
+    python benchmarks/sentiment_cascade.py --fit data/sentiment_weights.json
+
+--fit also learns per-token lexicon weights from the FinBERT scores
+(sentiment_lexicon.fit_weights, with the hand-picked word lists as the
+prior), reports lexicon-only label agreement on a held-out fifth of the
+texts for the hand-picked and the fitted weights, then fits on every text
+and writes the weights where LexiconSentiment loads them from.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.replay import FIXTURE_DIR, ReplayUpstream
+from sentiment_lexicon import LexiconSentiment, fit_weights
+
+def load_texts(cache_dir, fixture_dir):
+    """Unique 'title description' texts from the news cache and fixtures"""
+    articles = []
+    for path in glob.glob(os.path.join(cache_dir, 'news_*.json')):
+        with open(path) as f:
+            articles.extend(json.load(f).get('data') or [])
+    for path in glob.glob(os.path.join(fixture_dir, '*.json')):
+        with open(path) as f:
+            articles.extend(json.load(f).get('news') or [])
+    texts = (f"{a.get('title') or ''} {a.get('description') or ''}".strip() for a in articles)
+    return list(dict.fromkeys(text for text in texts if text))
+
+def fit_lexicon(texts, finbert, labels, path):
+    """Fit lexicon weights to FinBERT scores, report held-out agreement and save them"""
+    from stock_analyzer import sentiment_label
+
+    prior = LexiconSentiment.hand_weights()
+    train = [i for i in range(len(texts)) if i % 5]
+    held_out = [i for i in range(len(texts)) if not i % 5]
+    fitted = LexiconSentiment(weights=fit_weights([texts[i] for i in train], [finbert[i] for i in train], prior=prior))
+    for name, lexicon in (('hand-picked', LexiconSentiment(weights=prior)), ('fitted', fitted)):
+        agree = sum(sentiment_label(lexicon.score(texts[i])[0]) == labels[i] for i in held_out)
+        print(f"{name} lexicon alone, held-out agreement: {agree / max(len(held_out), 1):.1%} ({len(held_out)} texts)")
+
+    weights = fit_weights(texts, finbert, prior=prior)
+    with open(path, 'w') as f:
+        json.dump({'texts': len(texts), 'weights': weights}, f, indent=0, sort_keys=True)
+    print(f"Wrote {len(weights)} fitted weights to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cache-dir', default=os.path.join(ROOT, 'cache'))
+    parser.add_argument('--fixture-dir', default=FIXTURE_DIR)
+    parser.add_argument('--thresholds', default='0.2,0.3,0.45,0.6,0.8')
+    parser.add_argument('--fake-sentiment', action='store_true', help='use the replay FinBERT stand-in')
+    parser.add_argument('--fit', metavar='PATH', help='fit lexicon weights to the FinBERT scores and write them here')
+    args = parser.parse_args()
+
+    if args.fake_sentiment:
+        ReplayUpstream(latency_ms=0, sentiment_ms=0).install(fake_sentiment=True)
+    from stock_analyzer import StockAnalyzer, sentiment_label
+
+    texts = load_texts(args.cache_dir, args.fixture_dir)
+    if not texts:
+        sys.exit('No news texts found')
+    analyzer = StockAnalyzer(audit_rate=0)
+
+    start = time.perf_counter()
+    finbert = analyzer._finbert_scores(texts)
+    finbert_seconds = time.perf_counter() - start
+    labels = [sentiment_label(score) for score in finbert]
+    print(f"{len(texts)} texts, FinBERT alone: {finbert_seconds:.2f}s")
+
+    if args.fit:
+        fit_lexicon(texts, finbert, labels, args.fit)
+        analyzer.lexicon = LexiconSentiment(weights_path=args.fit)
+
+    print(f"{'threshold':>9} {'escalated':>9} {'agree':>7} {'MAE':>6} {'seconds':>8} {'speedup':>8}")
+    for threshold in (float(t) for t in args.thresholds.split(',')):
+        start = time.perf_counter()
+        scores = analyzer.score_texts(texts, escalate_below=threshold)
+        seconds = time.perf_counter() - start
+        escalated = sum(confidence < threshold for _, confidence in map(analyzer.lexicon.score, texts))
+        agree = sum(sentiment_label(score) == label for score, label in zip(scores, labels))
+        error = sum(abs(score - reference) for score, reference in zip(scores, finbert))
+        print(f"{threshold:9.2f} {escalated / len(texts):9.1%} {agree / len(texts):7.1%} "
+              f"{error / len(texts):6.3f} {seconds:8.2f} {finbert_seconds / max(seconds, 1e-9):7.1f}x")
+
+if __name__ == '__main__':
+    main()
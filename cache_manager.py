@@ -2,6 +2,7 @@ import json
 import os
 from datetime import datetime, timedelta
 import threading
+from metrics import metrics
 
 class CacheManager:
     def __init__(self, cache_dir='cache'):
@@ -18,6 +19,11 @@ class CacheManager:
     
     def get(self, key, max_age_minutes=60):
         """Get cached data if it exists and is not expired"""
+        data = self._get(key, max_age_minutes)
+        metrics.cache_result('file_cache', data is not None, prefix=key.rsplit('_', 1)[0])
+        return data
+    
+    def _get(self, key, max_age_minutes):
         with self.lock:
             cache_path = self._get_cache_path(key)
             
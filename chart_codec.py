@@ -0,0 +1,78 @@
+import numpy as np
+
+def encode_chart(hist, include_volume=False, compact=False):
+    """Build the chart_data payload for a price history frame
+
+    The compact format sends a start date plus day gaps between bars, and
+    prices/volume as delta-encoded scaled integers, which is a fraction of
+    the size of a date string and a full-precision float per bar.
+    """
+    if not compact:
+        chart_data = {
+            'dates': hist.index.strftime('%Y-%m-%d').tolist(),
+            'prices': hist['Close'].tolist()
+        }
+        if include_volume:
+            chart_data['volume'] = hist['Volume'].tolist()
+        return chart_data
+
+    if hist.empty:
+        chart_data = {'format': 'compact', 'start': None, 'scale': 100, 'gaps': [], 'prices': []}
+        if include_volume:
+            chart_data['volume'] = []
+        return chart_data
+
+    days = np.array(hist.index.strftime('%Y-%m-%d'), dtype='datetime64[D]').astype(np.int64)
+    closes = hist['Close'].to_numpy(dtype=np.float64)
+
+    # Keep four decimals for penny stocks, cents for everything else
+    scale = 10000 if np.nanmax(closes) < 10 else 100
+    scaled = np.round(np.nan_to_num(closes) * scale).astype(np.int64)
+
+    chart_data = {
+        'format': 'compact',
+        'start': str(np.datetime64(int(days[0]), 'D')),
+        'scale': scale,
+        'gaps': np.diff(days, prepend=days[0]).tolist(),
+        'prices': np.diff(scaled, prepend=0).tolist()
+    }
+    if include_volume:
+        volume = hist['Volume'].to_numpy(dtype=np.int64, na_value=0)
+        chart_data['volume'] = np.diff(volume, prepend=0).tolist()
+    return chart_data
+
+def encode_intraday(bars, seconds, include_volume=False, compact=False):
+    """Build the chart_data payload for intraday bars from IntradayStore.get()
+
+    Dates are UTC ISO timestamps; the compact format's gaps count bar
+    intervals of `unit` seconds instead of days.
+    """
+    ts = bars['ts']
+    if not compact:
+        chart_data = {
+            'dates': [stamp + 'Z' for stamp in np.datetime_as_string(ts.astype('datetime64[s]'), unit='ms')],
+            'prices': bars['close'].tolist()
+        }
+        if include_volume:
+            chart_data['volume'] = bars['volume'].tolist()
+        return chart_data
+
+    chart_data = {'format': 'compact', 'start': None, 'unit': seconds, 'scale': 100, 'gaps': [], 'prices': []}
+    if include_volume:
+        chart_data['volume'] = []
+    if not len(ts):
+        return chart_data
+
+    closes = bars['close']
+    scale = 10000 if np.nanmax(closes) < 10 else 100
+    scaled = np.round(np.nan_to_num(closes) * scale).astype(np.int64)
+    chart_data.update({
+        'start': str(np.datetime64(int(ts[0]), 's')) + 'Z',
+        'scale': scale,
+        'gaps': (np.diff(ts, prepend=ts[0]) // seconds).tolist(),
+        'prices': np.diff(scaled, prepend=0).tolist()
+    })
+    if include_volume:
+        volume = np.nan_to_num(bars['volume']).astype(np.int64)
+        chart_data['volume'] = np.diff(volume, prepend=0).tolist()
+    return chart_data
@@ -0,0 +1,48 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this aren't worth the CPU to compress
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+def choose_encoding(accept_encoding):
+    """Pick the best encoding the client accepts"""
+    accepted = [part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')]
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def compress(body, encoding):
+    """Compress a body with the given content encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+def compress_response(response, accept_encoding):
+    """Compress a Flask response in place when the client supports it"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = len(response.get_data())
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,113 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from metrics import metrics
+
+# FinBERT pipeline owned by each worker process (loaded once by _init_worker)
+_sentiment_pipeline = None
+
+def _init_worker(torch_threads):
+    """Load the sentiment model once per worker with a fixed torch thread budget"""
+    global _sentiment_pipeline
+    import torch
+    from transformers import pipeline
+
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+    _sentiment_pipeline = pipeline(
+        "sentiment-analysis",
+        model="ProsusAI/finbert",
+        device=-1
+    )
+
+def _noop():
+    return os.getpid()
+
+def score_sentiment(texts):
+    """Score texts with FinBERT inside a worker, returning 0..1 bullishness per text"""
+    results = _sentiment_pipeline([text[:512] for text in texts], batch_size=len(texts))
+    scores = []
+    for result in results:
+        if result['label'] == 'positive':
+            scores.append(result['score'])
+        elif result['label'] == 'negative':
+            scores.append(1 - result['score'])
+        else:  # neutral
+            scores.append(0.5)
+    return scores
+
+class CPUWorkerPool:
+    """Process pool for CPU-bound scoring, kept off the Flask and scheduler threads
+
+    Workers are forked, so the parent never imports torch; call start() before
+    any background threads are running so every worker forks from a quiet
+    process. Pools rebuilt later, after a worker died or a task timed out, use
+    the forkserver context instead because by then the parent is threaded.
+    """
+
+    def __init__(self, max_workers=2, torch_threads=1):
+        self.max_workers = max_workers
+        self.torch_threads = torch_threads
+        self.lock = threading.Lock()
+        self.executor = self._create()
+
+    def _create(self, context='fork'):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(context),
+            initializer=_init_worker,
+            initargs=(self.torch_threads,)
+        )
+
+    def _rebuild(self, broken, reason="worker died"):
+        """Replace an executor whose worker died (OOM, segfault) or is stuck on a timed-out task
+
+        A cancelled future does not stop a task that is already running, so the
+        old workers are terminated rather than left to finish in the background.
+        """
+        with self.lock:
+            if self.executor is broken:
+                print(f"CPU pool {reason}, restarting the pool")
+                metrics.inc('cpu_pool_restarts_total')
+                for process in list((broken._processes or {}).values()):
+                    process.terminate()
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._create('forkserver')
+            return self.executor
+
+    def start(self):
+        """Fork every worker up front and wait for the model to load in each"""
+        futures = [self.executor.submit(_noop) for _ in range(self.max_workers)]
+        return [future.result() for future in futures]
+
+    def submit(self, fn, *args):
+        """Submit a picklable function to the pool and return its future"""
+        return self.executor.submit(fn, *args)
+
+    def run(self, fn, *args, timeout=None):
+        """Run a function on the pool and wait for its result, retrying once on a rebuilt pool
+
+        Raises concurrent.futures.TimeoutError when the result takes longer
+        than timeout seconds.
+        """
+        executor = self.executor
+        try:
+            return self._result(executor, executor.submit(fn, *args), timeout)
+        except BrokenProcessPool:
+            executor = self._rebuild(executor)
+            return self._result(executor, executor.submit(fn, *args), timeout)
+
+    def _result(self, executor, future, timeout):
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            metrics.inc('cpu_pool_timeouts_total')
+            if not future.cancel():
+                self._rebuild(executor, "task timed out")
+            raise
+
+    def shutdown(self):
+        """Stop the workers without waiting for queued work"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,12 @@
 import sqlite3
 import hashlib
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+from metrics import metrics
+
+def timed_query(f):
+    """Record the latency of a Database method under its name"""
+    return metrics.timed('db_query_seconds', query=f.__name__)(f)
 
 class Database:
     def __init__(self, db_path='stro.db'):
@@ -49,6 +54,57 @@ class Database:
             )
         ''')
         
+        # Create alert_rules table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alert_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                condition TEXT NOT NULL,
+                threshold REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Create universes table (definitions override data/universes.json)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS universes (
+                name TEXT PRIMARY KEY,
+                definition TEXT NOT NULL,
+                created_by INTEGER,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create symbol_quarantine table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS symbol_quarantine (
+                symbol TEXT PRIMARY KEY,
+                reason TEXT NOT NULL,
+                failures INTEGER NOT NULL,
+                quarantined_until REAL NOT NULL
+            )
+        ''')
+        
+        # Create score_history table, clustered by (universe, symbol, time) for range scans
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS score_history (
+                universe TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                scored_at INTEGER NOT NULL,
+                sentiment REAL NOT NULL,
+                trend REAL NOT NULL,
+                score REAL NOT NULL,
+                smoothed REAL NOT NULL,
+                rank INTEGER NOT NULL,
+                PRIMARY KEY (universe, symbol, scored_at)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS score_history_runs ON score_history (universe, scored_at)
+        ''')
+        
         conn.commit()
         conn.close()
     
@@ -56,6 +112,7 @@ class Database:
         """Hash password using SHA-256"""
         return hashlib.sha256(password.encode()).hexdigest()
     
+    @timed_query
     def create_user(self, username, email, password):
         """Create a new user"""
         try:
@@ -74,6 +131,7 @@ class Database:
             
             return {'success': True, 'user_id': user_id}
         except sqlite3.IntegrityError as e:
+            conn.close()
             if 'username' in str(e):
                 return {'success': False, 'error': 'Username already exists'}
             elif 'email' in str(e):
@@ -83,6 +141,7 @@ class Database:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @timed_query
     def verify_user(self, username, password):
         """Verify user credentials"""
         conn = sqlite3.connect(self.db_path)
@@ -109,6 +168,7 @@ class Database:
         else:
             return {'success': False, 'error': 'Invalid username or password'}
     
+    @timed_query
     def get_user_watchlist(self, user_id):
         """Get user's watchlist"""
         conn = sqlite3.connect(self.db_path)
@@ -125,6 +185,7 @@ class Database:
         
         return [item[0] for item in watchlist]
     
+    @timed_query
     def add_to_watchlist(self, user_id, symbol):
         """Add stock to user's watchlist"""
         try:
@@ -141,10 +202,13 @@ class Database:
             
             return {'success': True}
         except sqlite3.IntegrityError:
+            # Close the failed insert's connection so it stops holding the write lock
+            conn.close()
             return {'success': False, 'error': 'Stock already in watchlist'}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @timed_query
     def remove_from_watchlist(self, user_id, symbol):
         """Remove stock from user's watchlist"""
         try:
@@ -161,6 +225,7 @@ class Database:
         except sqlite3.Error as e:
             return {'success': False, 'error': str(e)}
     
+    @timed_query
     def save_alert(self, user_id, symbol, alert_type, message):
         """Save alert to history"""
         conn = sqlite3.connect(self.db_path)
@@ -174,6 +239,7 @@ class Database:
         conn.commit()
         conn.close()
     
+    @timed_query
     def get_user_alerts_history(self, user_id, limit=50):
         """Get user's alert history"""
         conn = sqlite3.connect(self.db_path)
@@ -201,6 +267,7 @@ class Database:
         """Get database connection"""
         return sqlite3.connect(self.db_path)
     
+    @timed_query
     def add_alert(self, user_id, symbol, alert_type, message):
         """Add an alert to the database"""
         try:
@@ -219,6 +286,7 @@ class Database:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @timed_query
     def get_user_alerts(self, user_id, hours=None):
         """Get alerts for a user, optionally filtered by time"""
         try:
@@ -258,6 +326,7 @@ class Database:
             print(f"Error getting user alerts: {e}")
             return []
     
+    @timed_query
     def get_all_users(self):
         """Get all users in the system"""
         try:
@@ -279,3 +348,263 @@ class Database:
         except Exception as e:
             print(f"Error getting all users: {e}")
             return []
+    
+    @timed_query
+    def get_all_watchlists(self):
+        """Get every (user_id, symbol) watchlist entry"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT user_id, symbol FROM watchlist')
+        
+        entries = cursor.fetchall()
+        conn.close()
+        return entries
+    
+    @timed_query
+    def get_recent_alert_times(self, seconds):
+        """{(user_id, symbol, alert_type): Unix time of the latest alert} within the last seconds"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # created_at is SQLite's CURRENT_TIMESTAMP, i.e. UTC
+        cursor.execute('''
+            SELECT user_id, symbol, alert_type, CAST(strftime('%s', MAX(created_at)) AS INTEGER)
+            FROM alerts_history
+            WHERE created_at > datetime('now', ?)
+            GROUP BY user_id, symbol, alert_type
+        ''', (f"-{int(seconds)} seconds",))
+        
+        times = {(row[0], row[1], row[2]): row[3] for row in cursor.fetchall()}
+        conn.close()
+        return times
+    
+    @timed_query
+    def add_alerts(self, alerts):
+        """Save many alerts in one transaction"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.executemany('''
+                INSERT INTO alerts_history (user_id, symbol, alert_type, message)
+                VALUES (?, ?, ?, ?)
+            ''', [(a['user_id'], a['symbol'], a['type'], a['message']) for a in alerts])
+            
+            conn.commit()
+            conn.close()
+            
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    @timed_query
+    def add_alert_rule(self, user_id, symbol, condition, threshold):
+        """Create an alert rule for a user"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO alert_rules (user_id, symbol, condition, threshold)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, symbol, condition, threshold))
+            
+            conn.commit()
+            rule_id = cursor.lastrowid
+            conn.close()
+            
+            return {'success': True, 'rule_id': rule_id}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    @timed_query
+    def get_alert_rules(self, user_id=None):
+        """Get alert rules for one user, or for everyone"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        if user_id is None:
+            cursor.execute('SELECT id, user_id, symbol, condition, threshold, created_at FROM alert_rules')
+        else:
+            cursor.execute('''
+                SELECT id, user_id, symbol, condition, threshold, created_at
+                FROM alert_rules
+                WHERE user_id = ?
+                ORDER BY created_at DESC
+            ''', (user_id,))
+        
+        rules = [{
+            'id': row[0],
+            'user_id': row[1],
+            'symbol': row[2],
+            'condition': row[3],
+            'threshold': row[4],
+            'created_at': row[5]
+        } for row in cursor.fetchall()]
+        conn.close()
+        return rules
+    
+    @timed_query
+    def delete_alert_rule(self, user_id, rule_id):
+        """Delete one of a user's alert rules"""
+        try:
+            with sqlite3.connect(self.db_path, timeout=30, check_same_thread=False) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    DELETE FROM alert_rules
+                    WHERE id = ? AND user_id = ?
+                ''', (rule_id, user_id))
+                rows_affected = cursor.rowcount
+                conn.commit()
+            
+            return {'success': rows_affected > 0}
+        except sqlite3.Error as e:
+            return {'success': False, 'error': str(e)}
+    
+    @timed_query
+    def get_universes(self):
+        """Get every stored universe definition as {name: (definition JSON, creator user id)}"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT name, definition, created_by FROM universes')
+        
+        universes = {name: (definition, created_by) for name, definition, created_by in cursor.fetchall()}
+        conn.close()
+        return universes
+    
+    @timed_query
+    def save_universe(self, name, definition, user_id=None):
+        """Create or replace a universe definition"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            # Only the creator may replace an existing definition
+            cursor.execute('''
+                INSERT INTO universes (name, definition, created_by, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(name) DO UPDATE SET definition = excluded.definition, updated_at = CURRENT_TIMESTAMP
+                WHERE universes.created_by IS excluded.created_by
+            ''', (name, definition, user_id))
+            saved = cursor.rowcount > 0
+            
+            conn.commit()
+            conn.close()
+            
+            if not saved:
+                return {'success': False, 'error': f"'{name}' belongs to another user"}
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    @timed_query
+    def get_quarantined_symbols(self):
+        """Get every quarantined symbol"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT symbol, reason, failures, quarantined_until FROM symbol_quarantine')
+        
+        rows = [{
+            'symbol': row[0],
+            'reason': row[1],
+            'failures': row[2],
+            'quarantined_until': row[3]
+        } for row in cursor.fetchall()]
+        conn.close()
+        return rows
+    
+    @timed_query
+    def save_quarantine(self, symbol, reason, failures, quarantined_until):
+        """Quarantine a symbol until a Unix timestamp"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO symbol_quarantine (symbol, reason, failures, quarantined_until)
+            VALUES (?, ?, ?, ?)
+        ''', (symbol, reason, failures, quarantined_until))
+        
+        conn.commit()
+        conn.close()
+    
+    @timed_query
+    def clear_quarantine(self, symbol):
+        """Release a symbol from quarantine"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('DELETE FROM symbol_quarantine WHERE symbol = ?', (symbol,))
+        
+        conn.commit()
+        conn.close()
+    
+    @timed_query
+    def add_score_history(self, rows):
+        """Append one scoring run as (universe, symbol, scored_at, sentiment, trend, score, smoothed, rank) rows"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+            INSERT OR REPLACE INTO score_history
+                (universe, symbol, scored_at, sentiment, trend, score, smoothed, rank)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        
+        conn.commit()
+        conn.close()
+    
+    @timed_query
+    def get_score_history(self, universe, symbol, start, end):
+        """Get a symbol's scores within [start, end] (Unix seconds)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT scored_at, sentiment, trend, score, smoothed, rank
+            FROM score_history
+            WHERE universe = ? AND symbol = ? AND scored_at BETWEEN ? AND ?
+            ORDER BY scored_at
+        ''', (universe, symbol, start, end))
+        
+        rows = [{
+            'scored_at': row[0],
+            'sentiment': row[1],
+            'trend': row[2],
+            'score': row[3],
+            'smoothed': row[4],
+            'rank': row[5]
+        } for row in cursor.fetchall()]
+        conn.close()
+        return rows
+    
+    @timed_query
+    def get_scores_as_of(self, universe, as_of, since):
+        """Get each symbol's latest (scored_at, smoothed, rank) in (since, as_of]"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # SQLite returns the other columns from the row holding MAX(scored_at)
+        cursor.execute('''
+            SELECT symbol, MAX(scored_at), smoothed, rank
+            FROM score_history
+            WHERE universe = ? AND scored_at > ? AND scored_at <= ?
+            GROUP BY symbol
+        ''', (universe, since, as_of))
+        
+        scores = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+        conn.close()
+        return scores
+    
+    @timed_query
+    def prune_score_history(self, before):
+        """Delete scores older than a Unix timestamp"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('DELETE FROM score_history WHERE scored_at < ?', (before,))
+        
+        conn.commit()
+        conn.close()
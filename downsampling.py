@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+def lttb_indices(x, y, threshold):
+    """Pick indices with Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points, splits the rest into threshold - 2
+    buckets and from each keeps the point forming the largest triangle with
+    the previously kept point and the average of the next bucket.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket boundaries over the interior points [1, n - 1)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+
+    # The "next bucket" of the last interior bucket is the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bucket_x = x[lo:hi]
+        bucket_y = y[lo:hi]
+        area = np.abs((x[a] - next_x[i]) * (bucket_y - y[a]) - (x[a] - bucket_x) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+def downsample_history(hist, points):
+    """Downsample a daily history to at most `points` bars for charting
+
+    Close is reduced with LTTB; Volume is summed over the same buckets so
+    the total traded volume in the range is preserved.
+    """
+    n = len(hist)
+    if points >= n or points < 3:
+        return hist
+
+    days = hist.index.values.astype('datetime64[D]').astype(np.int64)
+    closes = hist['Close'].to_numpy(dtype=np.float64)
+    selected = lttb_indices(days, closes, points)
+
+    data = {'Close': closes[selected]}
+    if 'Volume' in hist:
+        # Same bucket layout as lttb_indices: first point, interior buckets, last point
+        bounds = np.concatenate(([0], np.linspace(1, n - 1, points - 1).astype(np.int64)))
+        data['Volume'] = np.add.reduceat(hist['Volume'].to_numpy(dtype=np.int64), bounds)
+
+    return pd.DataFrame(data, index=hist.index[selected])
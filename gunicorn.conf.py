@@ -0,0 +1,59 @@
+"""Production gunicorn settings: gunicorn -c gunicorn.conf.py "app:create_app()"
+
+Socket.IO clients stay connected for as long as the page is open, so
+profiles without the CPU pool run one async worker whose connections are
+cheap greenlets rather than OS threads. With the CPU pool (the full
+profile) the default is gthread: a ProcessPoolExecutor created after
+gevent/eventlet monkey-patching runs its management thread as a greenlet,
+which can hang. Scale out by running more processes (or hosts) with
+MESSAGE_BUS_URL set, behind a load balancer with sticky sessions.
+"""
+import os
+import sys
+
+# gunicorn may load this file before putting the app directory on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from profiles import Profile
+
+# Worker class -> Socket.IO async mode
+ASYNC_MODES = {'gevent': 'gevent', 'eventlet': 'eventlet', 'gthread': 'threading'}
+
+# Mirrors app.py: the pool exists when FinBERT is enabled and CPU_POOL_WORKERS > 0
+cpu_pool_enabled = Profile().enabled('finbert') and int(os.environ.get('CPU_POOL_WORKERS', 2)) > 0
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread' if cpu_pool_enabled else 'gevent')
+if worker_class not in ASYNC_MODES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of: {', '.join(ASYNC_MODES)}")
+os.environ['SOCKETIO_ASYNC_MODE'] = ASYNC_MODES[worker_class]
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Socket.IO's long-polling transport needs every request of a session on the
+# same process, which gunicorn can't guarantee across workers
+workers = 1
+
+# Concurrent connections per worker (gevent/eventlet), or threads for gthread
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 5000))
+threads = int(os.environ.get('GUNICORN_THREADS', 200)) if worker_class == 'gthread' else 1
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the app in the worker so background services start after the fork
+preload_app = False
+
+accesslog = '-' if os.environ.get('GUNICORN_ACCESS_LOG') else None
+
+def on_starting(server):
+    capacity = f"{threads} threads" if worker_class == 'gthread' else f"{worker_connections} connections"
+    server.log.info(f"Starting {worker_class} worker with {capacity} "
+                    f"(Socket.IO async mode: {ASYNC_MODES[worker_class]})")
+    if cpu_pool_enabled and worker_class != 'gthread':
+        server.log.warning(f"The CPU pool under the {worker_class} worker can hang; "
+                           "use gthread or set CPU_POOL_WORKERS=0")
+
+def worker_exit(server, worker):
+    """Stop the scheduler and broadcast loop and release the fetch lease"""
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.stop_background_services()
@@ -0,0 +1,208 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from upstream import ticker_history
+
+# Bar intervals served from the 1-minute rings, in seconds
+INTRADAY_INTERVALS = {'1m': 60, '5m': 300, '15m': 900}
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+class BarRing:
+    """Fixed-capacity ring of 1-minute bars in preallocated arrays
+
+    Appending past capacity overwrites the oldest bar, so memory per
+    symbol is constant: capacity * 6 * 8 bytes.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.columns = {field: np.zeros(capacity, dtype=np.float64) for field in FIELDS}
+        self.start = 0
+        self.size = 0
+        self.backfilled_at = None
+        self.backfilling = None
+        self.day_volume = None
+        # Widest gap between live bars since the last load(), in seconds
+        self.max_gap = 0
+
+    def _last(self):
+        return (self.start + self.size - 1) % self.capacity
+
+    def _append(self, ts, open_, high, low, close, volume):
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.size += 1
+        i = self._last()
+        self.ts[i] = ts
+        for field, value in zip(FIELDS, (open_, high, low, close, volume)):
+            self.columns[field][i] = value
+
+    def update(self, ts, price, volume=0.0):
+        """Fold a quote into the bar for its minute; quotes older than the last bar are ignored"""
+        minute = int(ts) // 60 * 60
+        if self.size:
+            i = self._last()
+            if self.ts[i] == minute:
+                self.columns['high'][i] = max(self.columns['high'][i], price)
+                self.columns['low'][i] = min(self.columns['low'][i], price)
+                self.columns['close'][i] = price
+                self.columns['volume'][i] += volume
+                return
+            if self.ts[i] > minute:
+                return
+            self.max_gap = max(self.max_gap, minute - int(self.ts[i]))
+        self._append(minute, price, price, price, price, volume)
+
+    def arrays(self):
+        """Copies of the bars in time order: {'ts': ..., 'open': ..., ...}"""
+        order = (self.start + np.arange(self.size)) % self.capacity
+        bars = {'ts': self.ts[order]}
+        bars.update({field: column[order] for field, column in self.columns.items()})
+        return bars
+
+    def newest(self):
+        """Start of the newest bar, or None when empty"""
+        return int(self.ts[self._last()]) if self.size else None
+
+    def load(self, bars):
+        """Merge downloaded bars into minutes the ring has no bar for, keeping the newest capacity bars
+
+        Live bars win where both have a minute, since the download may
+        predate the latest quotes.
+        """
+        live = self.arrays()
+        if self.size:
+            keep = ~np.isin(bars['ts'], live['ts'])
+            bars = {key: values[keep] for key, values in bars.items()}
+        order = np.argsort(np.concatenate([bars['ts'], live['ts']]), kind='stable')
+        merged = {key: np.concatenate([bars[key], live[key]])[order][-self.capacity:] for key in live}
+
+        self.size = len(merged['ts'])
+        self.start = 0
+        self.max_gap = 0
+        self.ts[:self.size] = merged['ts']
+        for field in FIELDS:
+            self.columns[field][:self.size] = merged[field]
+
+def aggregate(bars, seconds):
+    """Roll 1-minute bars up to `seconds`-wide bars with reduceat"""
+    if seconds <= 60 or not len(bars['ts']):
+        return bars
+    buckets = bars['ts'] // seconds * seconds
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.concatenate([starts[1:], [len(buckets)]]) - 1
+    return {
+        'ts': buckets[starts],
+        'open': bars['open'][starts],
+        'high': np.maximum.reduceat(bars['high'], starts),
+        'low': np.minimum.reduceat(bars['low'], starts),
+        'close': bars['close'][ends],
+        'volume': np.add.reduceat(bars['volume'], starts)
+    }
+
+class IntradayStore:
+    """Per-symbol 1-minute bar rings, fed by the quote loop and backfilled on read
+
+    A ring is backfilled on first read, and again (at most every
+    retry_minutes) when its newest bar is more than stale_minutes old or
+    the quote loop left a gap wider than that since the last backfill, so
+    a chart viewed hours apart has its hole filled. Concurrent reads share
+    one download.
+    At most max_symbols rings are kept (least recently used go first), so
+    memory is bounded at about max_symbols * capacity * 48 bytes.
+    """
+
+    def __init__(self, capacity=1024, max_symbols=512, backfill_period='2d', retry_minutes=5,
+                 stale_minutes=3, backfill_wait_seconds=30):
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.backfill_period = backfill_period
+        self.retry_seconds = retry_minutes * 60
+        self.stale_seconds = stale_minutes * 60
+        self.backfill_wait = backfill_wait_seconds
+        self.lock = threading.Lock()
+        self.rings = OrderedDict()
+
+    def _ring(self, symbol):
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = BarRing(self.capacity)
+            while len(self.rings) > self.max_symbols:
+                self.rings.popitem(last=False)
+        self.rings.move_to_end(symbol)
+        return ring
+
+    def record_quote(self, symbol, price, ts=None, day_volume=None):
+        """Fold a live quote into the symbol's current minute bar
+
+        day_volume is the cumulative session volume from the quote; the
+        change since the previous quote becomes the bar's volume.
+        """
+        if not price:
+            return
+        ts = time.time() if ts is None else ts
+        with self.lock:
+            ring = self._ring(symbol.upper())
+            volume = 0.0
+            if day_volume is not None:
+                if ring.day_volume is not None and day_volume >= ring.day_volume:
+                    volume = float(day_volume - ring.day_volume)
+                ring.day_volume = day_volume
+            ring.update(ts, float(price), volume)
+
+    def _backfill(self, symbol):
+        hist = ticker_history(symbol, period=self.backfill_period, interval='1m', prepost=True)
+        if hist is None or hist.empty:
+            return None
+        hist = hist.dropna(subset=['Close'])
+        return {
+            'ts': hist.index.values.astype('datetime64[s]').astype(np.int64),
+            'open': hist['Open'].to_numpy(dtype=np.float64),
+            'high': hist['High'].to_numpy(dtype=np.float64),
+            'low': hist['Low'].to_numpy(dtype=np.float64),
+            'close': hist['Close'].to_numpy(dtype=np.float64),
+            'volume': hist['Volume'].to_numpy(dtype=np.float64, na_value=0)
+        }
+
+    def _needs_backfill(self, ring, now):
+        if ring.backfilled_at is None:
+            return True
+        # A negative timestamp marks a failed backfill, retried after retry_minutes
+        if now - abs(ring.backfilled_at) <= self.retry_seconds:
+            return False
+        if ring.backfilled_at < 0 or ring.newest() is None:
+            return True
+        return now - ring.newest() > self.stale_seconds or ring.max_gap > self.stale_seconds
+
+    def get(self, symbol, interval='1m'):
+        """Bars for a symbol at one of INTRADAY_INTERVALS, backfilling the ring when needed"""
+        symbol = symbol.upper()
+        with self.lock:
+            ring = self._ring(symbol)
+            in_flight = ring.backfilling
+            backfill = in_flight is None and self._needs_backfill(ring, time.time())
+            if backfill:
+                in_flight = ring.backfilling = threading.Event()
+
+        if backfill:
+            try:
+                bars = self._backfill(symbol)
+            except Exception as e:
+                print(f"Error backfilling intraday bars for {symbol}: {e}")
+                bars = None
+            with self.lock:
+                ring.backfilled_at = time.time() if bars is not None else -time.time()
+                if bars is not None:
+                    ring.load(bars)
+                ring.backfilling = None
+            in_flight.set()
+        elif in_flight is not None:
+            # Another read is downloading this symbol; use its result
+            in_flight.wait(self.backfill_wait)
+
+        with self.lock:
+            bars = ring.arrays()
+        return aggregate(bars, INTRADAY_INTERVALS[interval])
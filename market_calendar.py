@@ -0,0 +1,158 @@
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+EASTERN = ZoneInfo('America/New_York')
+
+# US equity session boundaries in Eastern time
+PRE_MARKET_OPEN = dtime(4, 0)
+REGULAR_OPEN = dtime(9, 30)
+REGULAR_CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+AFTER_HOURS_CLOSE = dtime(20, 0)
+EARLY_AFTER_HOURS_CLOSE = dtime(17, 0)
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+def _nth_weekday(year, month, weekday, n):
+    """The nth weekday (Mon=0) of a month; n=-1 is the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(day):
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+class MarketCalendar:
+    """NYSE/Nasdaq trading calendar with pre-market and after-hours sessions
+
+    Holidays and early closes follow the exchanges' standing rules, so no
+    yearly table needs maintaining; one-off closures (e.g. national days of
+    mourning) can be passed as extra_holidays.
+    """
+
+    def __init__(self, extra_holidays=()):
+        self.extra_holidays = set(extra_holidays)
+        self._years = {}
+
+    def _year(self, year):
+        """(holidays, early closes) for a year, computed once"""
+        if year not in self._years:
+            holidays = {
+                _nth_weekday(year, 1, 0, 3),            # Martin Luther King Jr. Day
+                _nth_weekday(year, 2, 0, 3),            # Washington's Birthday
+                _easter(year) - timedelta(days=2),      # Good Friday
+                _nth_weekday(year, 5, 0, -1),           # Memorial Day
+                _observed(date(year, 7, 4)),            # Independence Day
+                _nth_weekday(year, 9, 0, 1),            # Labor Day
+                _nth_weekday(year, 11, 3, 4),           # Thanksgiving
+                _observed(date(year, 12, 25))           # Christmas
+            }
+            # New Year's Day falling on a Saturday is not observed on Dec 31
+            if date(year, 1, 1).weekday() != 5:
+                holidays.add(_observed(date(year, 1, 1)))
+            if year >= 2022:
+                holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+            holidays |= {d for d in self.extra_holidays if d.year == year}
+
+            early_closes = {
+                date(year, 7, 3),                                   # Day before Independence Day
+                _nth_weekday(year, 11, 3, 4) + timedelta(days=1),   # Day after Thanksgiving
+                date(year, 12, 24)                                  # Christmas Eve
+            }
+            early_closes = {d for d in early_closes if d.weekday() < 5 and d not in holidays}
+            self._years[year] = (holidays, early_closes)
+        return self._years[year]
+
+    def is_trading_day(self, day):
+        holidays, _ = self._year(day.year)
+        return day.weekday() < 5 and day not in holidays
+
+    def session_bounds(self, day):
+        """(pre-market open, regular open, regular close, after-hours close) for a trading day"""
+        if not self.is_trading_day(day):
+            return None
+        _, early_closes = self._year(day.year)
+        early = day in early_closes
+        return tuple(datetime.combine(day, t, tzinfo=EASTERN) for t in (
+            PRE_MARKET_OPEN, REGULAR_OPEN,
+            EARLY_CLOSE if early else REGULAR_CLOSE,
+            EARLY_AFTER_HOURS_CLOSE if early else AFTER_HOURS_CLOSE
+        ))
+
+    @staticmethod
+    def _eastern(ts=None):
+        return datetime.fromtimestamp(time.time() if ts is None else ts, EASTERN)
+
+    def session_at(self, ts=None):
+        """'pre', 'regular', 'post' or 'closed' at a Unix timestamp (default now)"""
+        now = self._eastern(ts)
+        bounds = self.session_bounds(now.date())
+        if bounds is None:
+            return 'closed'
+        pre_open, regular_open, regular_close, post_close = bounds
+        if pre_open <= now < regular_open:
+            return 'pre'
+        if regular_open <= now < regular_close:
+            return 'regular'
+        if regular_close <= now < post_close:
+            return 'post'
+        return 'closed'
+
+    def last_active(self, ts=None):
+        """Timestamp of the latest moment any session was open, at or before ts"""
+        now = self._eastern(ts)
+        day = now.date()
+        for _ in range(15):
+            bounds = self.session_bounds(day)
+            if bounds is not None and bounds[0] <= now:
+                return min(now, bounds[3]).timestamp()
+            day -= timedelta(days=1)
+        return now.timestamp()
+
+    def trading_day(self, ts=None):
+        """Date of the latest session at or before ts, which daily bars are current as of"""
+        return datetime.fromtimestamp(self.last_active(ts), EASTERN).date()
+
+    def next_open(self, ts=None):
+        """Timestamp of the next pre-market open after ts"""
+        now = self._eastern(ts)
+        day = now.date()
+        for _ in range(15):
+            bounds = self.session_bounds(day)
+            if bounds is not None and bounds[0] > now:
+                return bounds[0].timestamp()
+            day += timedelta(days=1)
+        return now.timestamp() + 86400
+
+    def is_fresh(self, fetched_at, max_age_seconds, ts=None):
+        """Whether a quote fetched at fetched_at is still current
+
+        While every session is closed prices can't move, so any quote fetched
+        after the last session ended stays fresh until the next open.
+        """
+        if not fetched_at:
+            return False
+        now = time.time() if ts is None else ts
+        if self.session_at(now) == 'closed':
+            return fetched_at >= self.last_active(now)
+        return now - fetched_at < max_age_seconds
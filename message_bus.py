@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import socket
+import threading
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+def node_id():
+    """Identity of this process in leader elections"""
+    return os.environ.get('NODE_ID') or f"{socket.gethostname()}-{os.getpid()}"
+
+class LocalBus:
+    """In-process bus for single-node runs and tests, with RedisBus's semantics"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.hashes = {}
+
+    def _live(self, key, now):
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.values[key] = (value, time.time() + ttl if ttl else None)
+
+    def get(self, key):
+        with self.lock:
+            return self._live(key, time.time())
+
+    def get_prefix(self, prefix):
+        """{key: value} for every live key starting with prefix"""
+        now = time.time()
+        with self.lock:
+            keys = [key for key in self.values if key.startswith(prefix)]
+            return {key: value for key in keys if (value := self._live(key, now)) is not None}
+
+    def incr(self, key):
+        with self.lock:
+            value = (self._live(key, time.time()) or 0) + 1
+            self.values[key] = (value, None)
+            return value
+
+    def hset(self, name, field, value):
+        with self.lock:
+            self.hashes.setdefault(name, {})[field] = value
+
+    def hget(self, name, field):
+        with self.lock:
+            return self.hashes.get(name, {}).get(field)
+
+    def hmget(self, name, fields):
+        with self.lock:
+            values = self.hashes.get(name, {})
+            return [values.get(field) for field in fields]
+
+    def hincr(self, name, *fields):
+        """Increment integer fields of a hash, returning their new values"""
+        with self.lock:
+            values = self.hashes.setdefault(name, {})
+            for field in fields:
+                values[field] = (values.get(field) or 0) + 1
+            return [values[field] for field in fields]
+
+    def acquire(self, name, owner, ttl):
+        """Take or renew a lease; True while owner holds it"""
+        now = time.time()
+        with self.lock:
+            holder = self._live(name, now)
+            if holder is not None and holder != owner:
+                return False
+            self.values[name] = (owner, now + ttl)
+            return True
+
+    def release(self, name, owner):
+        with self.lock:
+            if self._live(name, time.time()) == owner:
+                del self.values[name]
+
+class RedisBus:
+    """Bus backed by Redis (or any server speaking its protocol); values are JSON"""
+
+    # Renew the lease if we hold it, otherwise take it only if it's free
+    ACQUIRE_SCRIPT = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('pexpire', KEYS[1], ARGV[2])
+        end
+        if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+            return 1
+        end
+        return 0
+    """
+    RELEASE_SCRIPT = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('del', KEYS[1])
+        end
+        return 0
+    """
+
+    def __init__(self, url, prefix='stro:'):
+        if redis is None:
+            raise RuntimeError('MESSAGE_BUS_URL points at Redis but the redis package is not installed')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._acquire = self.client.register_script(self.ACQUIRE_SCRIPT)
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    @staticmethod
+    def _load(raw):
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    def get(self, key):
+        return self._load(self.client.get(self.prefix + key))
+
+    def get_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.prefix + prefix + '*', count=500))
+        if not keys:
+            return {}
+        values = self.client.mget(keys)
+        strip = len(self.prefix)
+        return {key.decode()[strip:]: json.loads(raw) for key, raw in zip(keys, values) if raw is not None}
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def hset(self, name, field, value):
+        self.client.hset(self.prefix + name, field, json.dumps(value))
+
+    def hget(self, name, field):
+        return self._load(self.client.hget(self.prefix + name, field))
+
+    def hmget(self, name, fields):
+        return [self._load(raw) for raw in self.client.hmget(self.prefix + name, fields)] if fields else []
+
+    def hincr(self, name, *fields):
+        pipe = self.client.pipeline(transaction=False)
+        for field in fields:
+            pipe.hincrby(self.prefix + name, field, 1)
+        return pipe.execute()
+
+    def acquire(self, name, owner, ttl):
+        return bool(self._acquire(keys=[self.prefix + name], args=[owner, int(ttl * 1000)]))
+
+    def release(self, name, owner):
+        self._release(keys=[self.prefix + name], args=[owner])
+
+def create_bus(url=None):
+    """LocalBus when url is empty or memory://, RedisBus for redis:// and rediss:// URLs"""
+    if not url or url.startswith('memory://'):
+        return LocalBus()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBus(url)
+    raise ValueError(f"Unsupported message bus URL: {url}")
+
+class Lease:
+    """Leadership lease renewed by whichever node calls hold() in time
+
+    The holder must call hold() more often than every ttl seconds; if it
+    stops (crash, network partition), another node takes over once the
+    lease expires.
+    """
+
+    def __init__(self, bus, name, owner=None, ttl=15):
+        self.bus = bus
+        self.name = name
+        self.owner = owner or node_id()
+        self.ttl = ttl
+        self.held = False
+
+    def hold(self):
+        """Acquire or renew the lease; True if this node is the leader"""
+        try:
+            held = self.bus.acquire(f"lease:{self.name}", self.owner, self.ttl)
+        except Exception as e:
+            print(f"Error renewing lease {self.name}: {e}")
+            held = False
+        if held != self.held:
+            print(f"Node {self.owner} {'acquired' if held else 'lost'} lease {self.name}")
+            self.held = held
+        return held
+
+    def release(self):
+        if self.held:
+            self.bus.release(f"lease:{self.name}", self.owner)
+            self.held = False
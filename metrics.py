@@ -0,0 +1,135 @@
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+# Latency histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Metrics:
+    """Thread-safe counters and latency histograms rendered in Prometheus text format"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+
+        # Callables notified with (name, seconds) after every timer(), e.g. the profiler
+        self.timer_hooks = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def describe(self, name, text):
+        """Set the HELP text shown for a metric"""
+        self.help[name] = text
+
+    def inc(self, name, amount=1, **labels):
+        """Increment a counter"""
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration in a histogram"""
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block, counting failures in <name>_errors_total"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name.rsplit('_seconds', 1)[0]}_errors_total", **labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            for hook in self.timer_hooks:
+                hook(name, elapsed)
+
+    def timed(self, name, **labels):
+        """Decorator form of timer()"""
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def cache_result(self, cache, hit, **labels):
+        """Count a cache hit or miss for a named cache"""
+        self.inc('cache_requests_total', cache=cache, result='hit' if hit else 'miss', **labels)
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                          for key, h in self.histograms.items()}
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram['buckets']):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {histogram['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry
+metrics = Metrics()
+metrics.describe('upstream_request_seconds', 'Latency of calls to yfinance and NewsAPI')
+metrics.describe('cache_requests_total', 'Cache lookups by cache and result')
+metrics.describe('finbert_batch_seconds', 'Latency of one FinBERT scoring batch')
+metrics.describe('db_query_seconds', 'Latency of SQLite queries')
+metrics.describe('scheduler_job_seconds', 'Duration of background scheduler jobs')
+metrics.describe('http_request_seconds', 'Latency of HTTP requests by endpoint')
+metrics.describe('alerts_fired_total', 'Alerts fired by the alert engine')
+metrics.describe('sentiment_texts_total', 'News texts scored, by cascade stage (lexicon or finbert)')
+metrics.describe('sentiment_audit_total', 'Sampled lexicon scores checked against FinBERT, by agreement')
+metrics.describe('upstream_timeouts_total', 'Upstream calls abandoned at their deadline')
+metrics.describe('upstream_rejected_total', 'Upstream calls refused by an open circuit')
+metrics.describe('upstream_circuit_opened_total', 'Times an upstream circuit breaker opened')
+metrics.describe('cpu_pool_restarts_total', 'CPU pool rebuilds after a worker died or hung on a timed-out task')
+metrics.describe('cpu_pool_timeouts_total', 'CPU pool calls abandoned at their timeout')
+metrics.describe('upstream_stale_served_total', 'Failed upstream calls answered from stale data')
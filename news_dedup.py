@@ -0,0 +1,75 @@
+import re
+import zlib
+import numpy as np
+
+# MinHash over word bigrams; 64 permutations estimate Jaccard similarity to about +/-0.06
+NUM_PERM = 64
+SIMILARITY_THRESHOLD = 0.5
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240101)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.int64)
+
+# Trailing " - Reuters" / " | Yahoo Finance" style source suffixes on syndicated titles
+_SOURCE_SUFFIX = re.compile(r'\s+[-|]\s+[^-|]{1,40}$')
+_WORD = re.compile(r'[a-z0-9]+')
+
+def shingles(article):
+    """Word bigrams of an article's normalized title and description"""
+    title = _SOURCE_SUFFIX.sub('', article.get('title') or '')
+    words = _WORD.findall(f"{title} {article.get('description') or ''}".lower())
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def minhash(tokens):
+    """MinHash signature of a token set, or None for an empty set"""
+    if not tokens:
+        return None
+    hashes = np.fromiter((zlib.crc32(token.encode()) % _PRIME for token in tokens), dtype=np.int64)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+def cluster_articles(articles, threshold=SIMILARITY_THRESHOLD):
+    """Group near-duplicate articles, as lists of indices in first-seen order
+
+    Each article joins the first cluster whose representative (its first
+    article) has an estimated Jaccard similarity of at least threshold.
+    """
+    clusters = []
+    representatives = []
+    for i, article in enumerate(articles):
+        signature = minhash(shingles(article))
+        for cluster, representative in zip(clusters, representatives):
+            if signature is not None and representative is not None \
+                    and np.mean(signature == representative) >= threshold:
+                cluster.append(i)
+                break
+        else:
+            clusters.append([i])
+            representatives.append(signature)
+    return clusters
+
+def label_clusters(articles, threshold=SIMILARITY_THRESHOLD):
+    """Set 'cluster' on each article (in place) and return the articles"""
+    for cluster_id, cluster in enumerate(cluster_articles(articles, threshold)):
+        for i in cluster:
+            articles[i]['cluster'] = cluster_id
+    return articles
+
+def group_articles(articles):
+    """Clusters of articles, using labels from label_clusters() when every article has one"""
+    if not all('cluster' in article for article in articles):
+        return [[articles[i] for i in cluster] for cluster in cluster_articles(articles)]
+    groups = {}
+    for article in articles:
+        groups.setdefault(article['cluster'], []).append(article)
+    return list(groups.values())
+
+def dedupe_articles(articles):
+    """One article per cluster, annotated with how many near-duplicates it stands for"""
+    deduped = []
+    for group in group_articles(articles):
+        article = dict(group[0])
+        article['duplicates'] = len(group) - 1
+        deduped.append(article)
+    return deduped
@@ -1,21 +1,24 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-from newsapi import NewsApiClient
 import os
 from dotenv import load_dotenv
 from cache_manager import CacheManager
+from upstream import ticker_info, upstream, UpstreamError
+from news_dedup import label_clusters, group_articles
 import time
 
 load_dotenv()
 
 class NewsScraper:
-    def __init__(self):
-        # Initialize NewsAPI client (you'll need to get an API key)
-        self.newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY', 'your_news_api_key_here'))
+    def __init__(self, analyzer=None, enabled=True):
+        # Initialize NewsAPI client (you'll need to get an API key); disabled scrapers return no news
+        self.enabled = enabled
+        self.newsapi = None
+        if enabled:
+            from newsapi import NewsApiClient
+            self.newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY', 'your_news_api_key_here'))
         
-        # Will initialize analyzer when needed to avoid circular import
-        self.analyzer = None
+        # Shared analyzer, or initialized when needed to avoid circular import
+        self.analyzer = analyzer
         
         # Initialize cache manager
         self.cache = CacheManager()
@@ -28,33 +31,36 @@ class NewsScraper:
     def get_stock_sentiment(self, symbol):
         """Get overall sentiment score for a stock based on recent news"""
         try:
-            # Initialize analyzer if not already done
-            if self.analyzer is None:
-                from stock_analyzer import StockAnalyzer
-                self.analyzer = StockAnalyzer()
-            
             # Get recent news
-            news_articles = self.get_recent_news(symbol)
-            
-            if not news_articles:
-                return 0.5  # Neutral if no news
-            
-            # Extract article texts
-            texts = []
-            for article in news_articles[:10]:  # Analyze top 10 articles
-                text = f"{article.get('title', '')} {article.get('description', '')}"
-                if text.strip():
-                    texts.append(text)
-            
-            # Analyze sentiment
-            sentiment_score = self.analyzer.analyze_news_sentiment(texts)
-            
-            return sentiment_score
+            return self.score_articles(self.get_recent_news(symbol))
             
         except Exception as e:
             print(f"Error getting sentiment for {symbol}: {e}")
             return 0.5
     
+    def score_articles(self, news_articles, bulk=False):
+        """Sentiment score for already fetched articles (bulk=True for background refreshes)"""
+        if not news_articles:
+            return 0.5  # Neutral if no news
+        
+        # Initialize analyzer if not already done
+        if self.analyzer is None:
+            from stock_analyzer import StockAnalyzer
+            self.analyzer = StockAnalyzer()
+        
+        # One text per cluster of near-duplicate (syndicated) articles, weighted by its size
+        texts = []
+        weights = []
+        for group in group_articles(news_articles[:10]):  # Analyze top 10 articles
+            article = group[0]
+            text = f"{article.get('title', '')} {article.get('description', '')}"
+            if text.strip():
+                texts.append(text)
+                weights.append(len(group))
+        
+        # Analyze sentiment
+        return self.analyzer.analyze_news_sentiment(texts, weights, bulk=bulk)
+    
     def _check_rate_limit(self):
         """Check if we're within rate limits"""
         # Reset counter if window has passed (12 hours)
@@ -70,6 +76,9 @@ class NewsScraper:
     
     def get_recent_news(self, symbol):
         """Get recent news articles for a stock"""
+        if not self.enabled:
+            return []
+        
         cache_key = f"news_{symbol}"
         
         # Check cache first (cache for 2 hours for news)
@@ -92,16 +101,15 @@ class NewsScraper:
             from_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
             
             # Get company name for better search results
-            import yfinance as yf
-            ticker = yf.Ticker(symbol)
-            company_name = ticker.info.get('longName', symbol)
+            company_name = ticker_info(symbol).get('longName', symbol)
             
             # Search query
             query = f"{company_name} OR {symbol} stock"
             
             # Get news from NewsAPI
             self.api_call_count += 1
-            news_response = self.newsapi.get_everything(
+            news_response = upstream.call(
+                'newsapi', 'everything', self.newsapi.get_everything,
                 q=query,
                 from_param=from_date,
                 language='en',
@@ -122,6 +130,9 @@ class NewsScraper:
                     'source': article.get('source', {}).get('name', '')
                 })
             
+            # Label near-duplicates so scoring and display share the same clusters
+            label_clusters(formatted_articles)
+            
             # Cache the results
             self.cache.set(cache_key, formatted_articles)
             
@@ -129,8 +140,8 @@ class NewsScraper:
             
         except Exception as e:
             error_str = str(e)
-            if 'rateLimited' in error_str:
-                print(f"Rate limit hit for {symbol}, using cached data")
+            if 'rateLimited' in error_str or isinstance(e, UpstreamError):
+                print(f"News API unavailable for {symbol} ({e}), using cached data")
                 # Try to get older cached data
                 old_cached = self.cache.get(cache_key, max_age_minutes=720)  # 12 hours old cache
                 return old_cached if old_cached else []
@@ -140,6 +151,9 @@ class NewsScraper:
     
     def scrape_financial_news(self):
         """Scrape general financial news for market trends"""
+        if not self.enabled:
+            return []
+        
         cache_key = "financial_news_general"
         
         # Check cache first
@@ -159,7 +173,8 @@ class NewsScraper:
             
             # Get top business headlines
             self.api_call_count += 1
-            top_headlines = self.newsapi.get_top_headlines(
+            top_headlines = upstream.call(
+                'newsapi', 'top_headlines', self.newsapi.get_top_headlines,
                 category='business',
                 language='en',
                 country='us'
@@ -174,8 +189,8 @@ class NewsScraper:
             
         except Exception as e:
             error_str = str(e)
-            if 'rateLimited' in error_str:
-                print("Rate limit hit for financial news, using cached data")
+            if 'rateLimited' in error_str or isinstance(e, UpstreamError):
+                print(f"News API unavailable for financial news ({e}), using cached data")
                 old_cached = self.cache.get(cache_key, max_age_minutes=720)
                 return old_cached if old_cached else []
             else:
@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from metrics import metrics
+
+TRADING_DAYS = 252
+ANALYTICS_PERIODS = ('3mo', '6mo', '1y', '2y')
+
+def aligned_closes(price_archive, symbols, period='1y'):
+    """(days, closes) with one column per symbol on the union of their trading days
+
+    Closes are forward-filled across days a symbol did not trade; days
+    before a symbol's first bar stay NaN. Symbols without history get an
+    all-NaN column.
+    """
+    columns = [price_archive.get_columns(symbol, period, refresh=False) for symbol in symbols]
+    dates = [c['date'] for c in columns if c is not None and len(c['date'])]
+    days = np.unique(np.concatenate(dates)) if dates else np.array([], dtype=np.int64)
+
+    closes = np.full((len(days), len(symbols)), np.nan)
+    for j, c in enumerate(columns):
+        if c is not None and len(c['date']):
+            closes[np.searchsorted(days, c['date']), j] = c['Close']
+
+    # Forward fill: index of the last valid row at or above each row, per column
+    valid = ~np.isnan(closes)
+    last = np.where(valid, np.arange(len(days))[:, None], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    filled = closes[last, np.arange(len(symbols))]
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return days, filled
+
+def max_drawdown(closes):
+    """Largest peak-to-trough decline per column (as a negative fraction)"""
+    peaks = np.fmax.accumulate(closes, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nanmin(closes / peaks - 1, axis=0, initial=0.0)
+
+def pairwise_correlation(returns):
+    """Correlation matrix over the rows where both columns have a return
+
+    Masked sums as matrix products, so the whole matrix is a handful of
+    BLAS calls instead of a loop over symbol pairs.
+    """
+    mask = (~np.isnan(returns)).astype(np.float64)
+    x = np.nan_to_num(returns)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = mask.T @ mask
+        sx = (x.T @ mask) / n
+        sxx = ((x * x).T @ mask) / n
+        cov = (x.T @ x) / n - sx * sx.T
+        corr = cov / np.sqrt((sxx - sx ** 2) * (sxx - sx ** 2).T)
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1, 1)
+
+def beta(returns, benchmark):
+    """Beta of each column against the benchmark returns over their common rows"""
+    mask = ~np.isnan(returns) & ~np.isnan(benchmark)[:, None]
+    x = np.where(mask, returns, 0)
+    b = np.where(mask, benchmark[:, None], 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = mask.sum(axis=0)
+        mean_x = x.sum(axis=0) / n
+        mean_b = b.sum(axis=0) / n
+        cov = (x * b).sum(axis=0) / n - mean_x * mean_b
+        var = (b * b).sum(axis=0) / n - mean_b ** 2
+        return np.where(n > 1, cov / var, np.nan)
+
+def _values(array, digits=4):
+    """Rounded floats with NaN/inf as None, for JSON"""
+    array = np.round(np.asarray(array, dtype=np.float64), digits)
+    out = array.astype(object)
+    out[~np.isfinite(array)] = None
+    return out.tolist()
+
+class PortfolioAnalytics:
+    """Correlation, volatility, drawdown, beta and equal-weight performance for a watchlist
+
+    Everything comes from one aligned close matrix (symbols plus the
+    benchmark) read from the price archive, then array operations over
+    its returns. Results are cached by the caller's key, e.g.
+    (user, watchlist version, trading day, period).
+    """
+
+    def __init__(self, price_archive, benchmark='SPY', max_entries=1024):
+        self.price_archive = price_archive
+        self.benchmark = benchmark.upper()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.results = OrderedDict()
+
+    def get(self, key, symbols, period='1y'):
+        """Cached analyze() result for key"""
+        with self.lock:
+            cache_hit = key in self.results
+            metrics.cache_result('watchlist_analytics', cache_hit)
+            if cache_hit:
+                self.results.move_to_end(key)
+                return self.results[key]
+        result = self.analyze(symbols, period)
+        with self.lock:
+            self.results[key] = result
+            while len(self.results) > self.max_entries:
+                self.results.popitem(last=False)
+        return result
+
+    def analyze(self, symbols, period='1y'):
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        result = {'symbols': symbols, 'benchmark': self.benchmark, 'period': period}
+        if not symbols:
+            return {**result, 'as_of': None, 'missing': [], 'correlation': [], 'stocks': [], 'portfolio': None}
+
+        # One batched download brings every stale archive up to date
+        self.price_archive.update_many(symbols + [self.benchmark])
+        days, closes = aligned_closes(self.price_archive, symbols + [self.benchmark], period)
+        closes, benchmark_closes = closes[:, :-1], closes[:, -1]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = closes[1:] / closes[:-1] - 1
+            benchmark_returns = benchmark_closes[1:] / benchmark_closes[:-1] - 1
+            total_returns = closes[-1] / closes[np.argmax(~np.isnan(closes), axis=0), np.arange(len(symbols))] - 1 \
+                if len(days) else np.full(len(symbols), np.nan)
+
+            counts = (~np.isnan(returns)).sum(axis=0)
+            deviations = returns - np.nansum(returns, axis=0) / counts
+            volatility = np.sqrt(np.nansum(deviations ** 2, axis=0) / (counts - 1) * TRADING_DAYS)
+            volatility[counts < 2] = np.nan
+        betas = beta(returns, benchmark_returns)
+
+        # Equal weight, rebalanced daily, over the symbols trading on each day
+        traded = ~np.isnan(returns)
+        portfolio_returns = np.where(traded.any(axis=1),
+                                     np.nansum(returns, axis=1) / np.maximum(traded.sum(axis=1), 1), 0.0)
+        growth = np.cumprod(1 + portfolio_returns)
+        portfolio_value = np.concatenate([[1.0], growth]) if len(days) else np.array([])
+
+        result.update({
+            'as_of': str(np.datetime64(int(days[-1]), 'D')) if len(days) else None,
+            'missing': [s for s, ok in zip(symbols, (~np.isnan(closes)).any(axis=0)) if not ok],
+            'correlation': _values(pairwise_correlation(returns)),
+            'stocks': [
+                {'symbol': s, 'total_return': r, 'volatility': v, 'max_drawdown': d, 'beta': b}
+                for s, r, v, d, b in zip(symbols, _values(total_returns), _values(volatility),
+                                         _values(max_drawdown(closes)), _values(betas))
+            ],
+            'portfolio': {
+                'total_return': _values([portfolio_value[-1] - 1 if len(days) else np.nan])[0],
+                'volatility': _values([np.std(portfolio_returns, ddof=1) * np.sqrt(TRADING_DAYS)
+                                       if len(portfolio_returns) > 1 else np.nan])[0],
+                'max_drawdown': _values(max_drawdown(portfolio_value[:, None]))[0] if len(days) else None,
+                'beta': _values(beta(portfolio_returns[:, None], benchmark_returns))[0],
+                'dates': [str(day) for day in days.astype('datetime64[D]')],
+                'values': _values(portfolio_value)
+            }
+        })
+        return result
@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from upstream import ticker_history, download_history
+
+# Fixed-width column files stored per symbol; dates are int64 days since the epoch
+COLUMNS = [
+    ('Open', 'open.f8', np.float64),
+    ('High', 'high.f8', np.float64),
+    ('Low', 'low.f8', np.float64),
+    ('Close', 'close.f8', np.float64),
+    ('Volume', 'volume.i8', np.int64)
+]
+DATE_FILE = 'date.i8'
+
+# Calendar days covered by each yfinance-style period string
+PERIOD_DAYS = {
+    '1d': 1, '2d': 2, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183,
+    '1y': 366, '2y': 731, '5y': 1827, '10y': 3653, 'max': None
+}
+
+class PriceArchive:
+    """Persistent on-disk columnar store of daily OHLCV, read through numpy.memmap"""
+
+    def __init__(self, archive_dir='price_archive', max_age_minutes=15, initial_period='max', max_open_symbols=256):
+        self.archive_dir = archive_dir
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+        self.max_age_minutes = max_age_minutes
+        self.initial_period = initial_period
+        self.max_open_symbols = max_open_symbols
+
+        self.lock = threading.Lock()
+        self.symbol_locks = {}
+
+        # Bounded set of open memmaps so address space stays flat as the universe grows
+        self.maps = OrderedDict()
+
+    def _symbol_dir(self, symbol):
+        """Get the directory holding a symbol's column files"""
+        safe_symbol = symbol.upper().replace('/', '_').replace('\\', '_').replace(':', '_')
+        return os.path.join(self.archive_dir, safe_symbol)
+
+    def _symbol_lock(self, symbol):
+        with self.lock:
+            return self.symbol_locks.setdefault(symbol.upper(), threading.Lock())
+
+    def _read_meta(self, symbol):
+        try:
+            with open(os.path.join(self._symbol_dir(symbol), 'meta.json'), 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _write_meta(self, symbol, meta):
+        symbol_dir = self._symbol_dir(symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        path = os.path.join(symbol_dir, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def _open(self, symbol):
+        """Open (or reuse) read-only memmaps for every column of a symbol"""
+        symbol = symbol.upper()
+        with self.lock:
+            if symbol in self.maps:
+                self.maps.move_to_end(symbol)
+                return self.maps[symbol]
+
+        symbol_dir = self._symbol_dir(symbol)
+        date_path = os.path.join(symbol_dir, DATE_FILE)
+        if not os.path.exists(date_path) or os.path.getsize(date_path) == 0:
+            return None
+
+        # The date column is written last, so its length is the committed row count
+        rows = os.path.getsize(date_path) // 8
+        columns = {'date': np.memmap(date_path, dtype=np.int64, mode='r', shape=(rows,))}
+        for name, filename, dtype in COLUMNS:
+            columns[name] = np.memmap(os.path.join(symbol_dir, filename), dtype=dtype, mode='r', shape=(rows,))
+
+        with self.lock:
+            self.maps[symbol] = columns
+            while len(self.maps) > self.max_open_symbols:
+                self.maps.popitem(last=False)
+        return columns
+
+    def _close(self, symbol):
+        with self.lock:
+            self.maps.pop(symbol.upper(), None)
+
+    def _write(self, symbol, hist):
+        """Merge downloaded rows into the archive, rewriting the last row if it was partial"""
+        if hist is None or hist.empty:
+            return 0
+
+        days = np.array(hist.index.strftime('%Y-%m-%d'), dtype='datetime64[D]').astype(np.int64)
+        values = {name: hist[name].to_numpy(dtype=dtype, na_value=0) for name, _, dtype in COLUMNS}
+
+        symbol_dir = self._symbol_dir(symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        existing = self._open(symbol)
+        self._close(symbol)
+        self._truncate(symbol, len(existing['date']) if existing is not None else 0)
+
+        written = 0
+        if existing is not None and len(existing['date']):
+            last_day = int(existing['date'][-1])
+
+            # Auto-adjusted history changes after a split or dividend: completed bars that are
+            # in both the archive and the download must agree, or the whole history is reloaded
+            _, stored, fresh = np.intersect1d(existing['date'][:-1], days, assume_unique=True, return_indices=True)
+            if len(stored) and not np.allclose(existing['Close'][stored], values['Close'][fresh], rtol=1e-4):
+                print(f"Price history for {symbol} was re-adjusted upstream, reloading")
+                return self._rewrite(symbol, ticker_history(symbol, period=self.initial_period))
+
+            # Today's bar changes until the close, so refresh it in place
+            same = np.nonzero(days == last_day)[0]
+            if len(same):
+                row = len(existing['date']) - 1
+                for name, filename, dtype in COLUMNS:
+                    column = np.memmap(os.path.join(symbol_dir, filename), dtype=dtype, mode='r+', shape=(row + 1,))
+                    column[row] = values[name][same[-1]]
+                    column.flush()
+                    del column
+                written += 1
+
+            keep = days > last_day
+            days = days[keep]
+            values = {name: column[keep] for name, column in values.items()}
+
+        if len(days):
+            # Append value columns before the date column so readers never see a torn row
+            for name, filename, dtype in COLUMNS:
+                with open(os.path.join(symbol_dir, filename), 'ab') as f:
+                    values[name].astype(dtype).tofile(f)
+            with open(os.path.join(symbol_dir, DATE_FILE), 'ab') as f:
+                days.astype(np.int64).tofile(f)
+            written += len(days)
+
+        return written
+
+    def _truncate(self, symbol, rows):
+        """Cut value columns back to the committed row count
+
+        An append interrupted between the value columns and the date column
+        leaves orphaned values; later appends would land after them and
+        shift every new bar against its date.
+        """
+        symbol_dir = self._symbol_dir(symbol)
+        for _, filename, dtype in COLUMNS:
+            path = os.path.join(symbol_dir, filename)
+            size = rows * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def _rewrite(self, symbol, hist):
+        """Replace a symbol's whole history
+
+        Columns are written to new files and swapped in, so memmaps already
+        handed to readers keep the old data. The date column is emptied
+        first and swapped last, so no reader pairs old dates with new values.
+        """
+        if hist is None or hist.empty:
+            return 0
+        days = np.array(hist.index.strftime('%Y-%m-%d'), dtype='datetime64[D]').astype(np.int64)
+        symbol_dir = self._symbol_dir(symbol)
+        date_path = os.path.join(symbol_dir, DATE_FILE)
+
+        def replace(path, array):
+            with open(path + '.tmp', 'wb') as f:
+                array.tofile(f)
+            os.replace(path + '.tmp', path)
+
+        self._close(symbol)
+        replace(date_path, np.array([], dtype=np.int64))
+        for name, filename, dtype in COLUMNS:
+            replace(os.path.join(symbol_dir, filename), hist[name].to_numpy(dtype=dtype, na_value=0))
+        replace(date_path, days)
+        return len(days)
+
+    def update(self, symbol, force=False):
+        """Download only the bars missing since the last update"""
+        symbol = symbol.upper()
+        with self._symbol_lock(symbol):
+            meta = self._read_meta(symbol)
+            if not force and meta.get('checked_at') and time.time() - meta['checked_at'] < self.max_age_minutes * 60:
+                return 0
+
+            try:
+                columns = self._open(symbol)
+                if columns is None:
+                    hist = ticker_history(symbol, period=self.initial_period)
+                else:
+                    # Start one completed bar back, so _write can detect re-adjusted history
+                    last_day = np.datetime64(int(columns['date'][-min(2, len(columns['date']))]), 'D')
+                    hist = ticker_history(symbol, start=str(last_day))
+
+                written = self._write(symbol, hist)
+                meta['checked_at'] = time.time()
+                self._write_meta(symbol, meta)
+                return written
+            except Exception as e:
+                print(f"Error updating price archive for {symbol}: {e}")
+                return 0
+
+    def update_many(self, symbols, chunk_size=100):
+        """Bring many symbols up to date with batched yfinance downloads
+
+        Symbols archived within the last few weeks share one '1mo' download
+        per chunk, new symbols share an initial_period download, and only
+        long-idle archives fall back to per-symbol updates.
+        """
+        now = time.time()
+        recent, new = [], []
+        written = {}
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            meta = self._read_meta(symbol)
+            if meta.get('checked_at') and now - meta['checked_at'] < self.max_age_minutes * 60:
+                continue
+            columns = self._open(symbol)
+            if columns is None:
+                new.append(symbol)
+            elif np.datetime64('today', 'D').astype(np.int64) - columns['date'][-1] <= 25:
+                recent.append(symbol)
+            else:
+                written[symbol] = self.update(symbol, force=True)
+
+        for group, period in ((recent, '1mo'), (new, self.initial_period)):
+            for i in range(0, len(group), chunk_size):
+                chunk = group[i:i + chunk_size]
+                try:
+                    data = download_history(chunk, period=period, interval='1d', group_by='ticker',
+                                            auto_adjust=True, threads=True, progress=False)
+                except Exception as e:
+                    print(f"Error downloading history for {len(chunk)} symbols: {e}")
+                    continue
+                if data.empty:
+                    continue
+
+                for symbol in chunk:
+                    try:
+                        if isinstance(data.columns, pd.MultiIndex):
+                            if symbol not in data.columns.get_level_values(0):
+                                continue
+                            hist = data[symbol]
+                        else:
+                            hist = data
+                        hist = hist.dropna(subset=['Close'])
+
+                        with self._symbol_lock(symbol):
+                            written[symbol] = self._write(symbol, hist)
+                            meta = self._read_meta(symbol)
+                            meta['checked_at'] = time.time()
+                            self._write_meta(symbol, meta)
+                    except Exception as e:
+                        print(f"Error updating price archive for {symbol}: {e}")
+
+        return written
+
+    def get_columns(self, symbol, period='3mo', refresh=True):
+        """Get zero-copy numpy slices of the archived columns for a period"""
+        if refresh:
+            self.update(symbol)
+
+        columns = self._open(symbol)
+        if columns is None:
+            return None
+
+        dates = columns['date']
+        days = PERIOD_DAYS.get(period)
+        start = 0
+        if days is not None and len(dates):
+            start = int(np.searchsorted(dates, dates[-1] - days + 1))
+
+        return {name: column[start:] for name, column in columns.items()}
+
+    def get_history(self, symbol, period='3mo', refresh=True):
+        """Get a period of daily OHLCV as a DataFrame backed by the archive"""
+        columns = self.get_columns(symbol, period, refresh)
+        if columns is None:
+            return pd.DataFrame(columns=[name for name, _, _ in COLUMNS], index=pd.DatetimeIndex([]))
+
+        index = pd.DatetimeIndex(columns['date'].view('datetime64[D]').astype('datetime64[s]'))
+        return pd.DataFrame({name: columns[name] for name, _, _ in COLUMNS}, index=index, copy=False)
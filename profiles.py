@@ -0,0 +1,32 @@
+import os
+
+# Subsystems enabled by each deployment profile (STRO_PROFILE)
+#   news     NewsAPI headlines and news-driven sentiment (imports newsapi)
+#   finbert  FinBERT sentiment and its CPU worker pool (imports transformers and torch)
+PROFILES = {
+    'lite': {'news': False, 'finbert': False},
+    'standard': {'news': True, 'finbert': False},
+    'full': {'news': True, 'finbert': True}
+}
+DEFAULT_PROFILE = 'full'
+
+class Profile:
+    """A named set of enabled subsystems; FEATURE_<NAME>=0/1 overrides one of them"""
+
+    def __init__(self, name=None):
+        self.name = (name or os.environ.get('STRO_PROFILE') or DEFAULT_PROFILE).lower()
+        if self.name not in PROFILES:
+            raise ValueError(f"STRO_PROFILE must be one of: {', '.join(PROFILES)}")
+
+        self.features = dict(PROFILES[self.name])
+        for feature in self.features:
+            override = os.environ.get(f"FEATURE_{feature.upper()}")
+            if override is not None:
+                self.features[feature] = override.lower() in ('1', 'true', 'yes', 'on')
+
+    def enabled(self, feature):
+        return self.features[feature]
+
+    def __repr__(self):
+        enabled = [feature for feature, on in self.features.items() if on]
+        return f"{self.name} ({', '.join(enabled) or 'no optional subsystems'})"
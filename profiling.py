@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import hmac
+import time
+import random
+import threading
+from functools import wraps
+from collections import Counter, defaultdict
+
+# Metric timers that map onto a breakdown category
+TIMER_CATEGORIES = {
+    'upstream_request_seconds': 'upstream',
+    'db_query_seconds': 'db',
+    'finbert_batch_seconds': 'model'
+}
+
+def green_threads():
+    """Whether gevent or eventlet has patched threading, making thread idents greenlet ids"""
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        return True
+    eventlet_patcher = sys.modules.get('eventlet.patcher')
+    return eventlet_patcher is not None and eventlet_patcher.is_monkey_patched('thread')
+
+class Profile:
+    """Timing breakdown and sampled stacks for one request or job"""
+
+    def __init__(self, name):
+        self.name = name
+        self.thread_id = threading.get_ident()
+        self.started_at = time.time()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.categories = defaultdict(float)
+        self.stacks = Counter()
+        self.breakdown = None
+
+class Profiler:
+    """Opt-in sampling profiler for requests and scheduler jobs
+
+    A profile is taken for a random PROFILE_SAMPLE_RATE fraction of requests,
+    or when the X-Profile header matches PROFILE_TOKEN. While a profile is
+    active, one shared thread samples its stack every `interval` seconds and
+    metric timers add their durations to the breakdown, so unprofiled
+    requests only pay for a thread-local lookup.
+
+    Under gevent/eventlet workers thread idents are greenlet ids that
+    sys._current_frames() doesn't know, and the sampler would only run when
+    the profiled greenlet yields, so stack sampling is off there and
+    profiles carry the timing breakdown only. The newest max_profiles
+    profiles younger than max_age_hours are kept in output_dir.
+    """
+
+    def __init__(self, sample_rate=0.0, token=None, interval=0.005, output_dir='profiles',
+                 max_profiles=200, max_age_hours=24):
+        self.sample_rate = sample_rate
+        self.token = token
+        self.interval = interval
+        self.output_dir = output_dir
+        self.max_profiles = max_profiles
+        self.max_age = max_age_hours * 3600
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.active = {}
+        self.wakeup = threading.Event()
+        self.sampler = None
+
+    def authorized(self, header_value=None):
+        """Whether a request carried the profiling token"""
+        return bool(self.token and header_value) and hmac.compare_digest(header_value, self.token)
+
+    def should_profile(self, header_value=None):
+        """Decide whether to profile a request"""
+        if self.authorized(header_value):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def record(self, category, seconds):
+        """Add time to a category of the current thread's profile, if any"""
+        profile = getattr(self.local, 'profile', None)
+        if profile is not None:
+            profile.categories[category] += seconds
+
+    def on_timer(self, name, seconds):
+        """Metrics hook: attribute timed upstream/db/model calls to the profile"""
+        category = TIMER_CATEGORIES.get(name)
+        if category:
+            self.record(category, seconds)
+
+    def start(self, name):
+        """Start profiling the current thread"""
+        profile = Profile(name)
+        self.local.profile = profile
+        if green_threads():
+            return profile
+        with self.lock:
+            self.active[profile.thread_id] = profile
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+                self.sampler.start()
+        self.wakeup.set()
+        return profile
+
+    def stop(self, profile):
+        """Finish a profile, write its flame graph file and return the breakdown"""
+        wall = time.perf_counter() - profile.wall_start
+        cpu = time.thread_time() - profile.cpu_start
+        self.local.profile = None
+        with self.lock:
+            self.active.pop(profile.thread_id, None)
+            if not self.active:
+                self.wakeup.clear()
+
+        breakdown = {'wall': wall, 'cpu': cpu}
+        breakdown.update(profile.categories)
+        breakdown['other'] = max(0.0, wall - sum(profile.categories.values()))
+        profile.breakdown = breakdown
+
+        self._write(profile)
+        return breakdown
+
+    def format_breakdown(self, breakdown):
+        """Render a breakdown as a compact header value"""
+        return ';'.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in breakdown.items())
+
+    def profile_job(self, name):
+        """Decorator that profiles sampled runs of a background job"""
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.should_profile():
+                    return f(*args, **kwargs)
+                profile = self.start(f"job {name}")
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    print(f"Profiled job {name}: {self.format_breakdown(self.stop(profile))}")
+            return wrapper
+        return decorator
+
+    def _sample_loop(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(self.interval)
+
+            with self.lock:
+                active = list(self.active.values())
+            if not active:
+                continue
+
+            frames = sys._current_frames()
+            for profile in active:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        """Collapse a stack into 'module:function;...' from root to leaf"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            names.append(f"{module}:{code.co_name}")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _write(self, profile):
+        """Write collapsed stacks (flamegraph.pl / speedscope format) and the breakdown"""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            safe_name = ''.join(c if c.isalnum() else '_' for c in profile.name).strip('_')
+            path = os.path.join(self.output_dir, f"{int(profile.started_at * 1000)}_{safe_name}")
+
+            with open(path + '.json', 'w') as f:
+                json.dump({'name': profile.name, 'started_at': profile.started_at,
+                           'breakdown': profile.breakdown}, f)
+            if profile.stacks:
+                with open(path + '.folded', 'w') as f:
+                    for stack, count in profile.stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+            self._prune()
+            return path
+        except Exception as e:
+            print(f"Error writing profile for {profile.name}: {e}")
+            return None
+
+    def _prune(self):
+        """Delete profiles beyond max_profiles or older than max_age (names start with the start time in ms)"""
+        names = [name for name in os.listdir(self.output_dir) if name.split('_', 1)[0].isdigit()]
+        stems = sorted({os.path.splitext(name)[0] for name in names},
+                       key=lambda stem: int(stem.split('_', 1)[0]), reverse=True)
+        cutoff = (time.time() - self.max_age) * 1000
+        expired = {stem for i, stem in enumerate(stems)
+                   if i >= self.max_profiles or int(stem.split('_', 1)[0]) < cutoff}
+        for name in names:
+            if os.path.splitext(name)[0] in expired:
+                os.remove(os.path.join(self.output_dir, name))
@@ -0,0 +1,70 @@
+import time
+import threading
+
+class SymbolQuarantine:
+    """Benches symbols that keep failing upstream so they stop costing calls
+
+    After max_failures consecutive failures a symbol is skipped for
+    base_hours, doubling on every failed probe after release up to
+    max_hours. One success clears it. Quarantines persist in the database.
+    """
+
+    def __init__(self, db, max_failures=3, base_hours=24, max_hours=24 * 30):
+        self.db = db
+        self.max_failures = max_failures
+        self.base_hours = base_hours
+        self.max_hours = max_hours
+        self.lock = threading.Lock()
+        self.failures = {}
+        self.quarantined = {}
+
+    def load(self):
+        for row in self.db.get_quarantined_symbols():
+            self.failures[row['symbol']] = row['failures']
+            self.quarantined[row['symbol']] = row
+
+    def is_quarantined(self, symbol, now=None):
+        now = time.time() if now is None else now
+        row = self.quarantined.get(symbol.upper())
+        return row is not None and row['quarantined_until'] > now
+
+    def filter(self, symbols):
+        """Drop currently quarantined symbols"""
+        now = time.time()
+        return [s for s in symbols if not self.is_quarantined(s, now)]
+
+    def record_failure(self, symbol, reason):
+        symbol = symbol.upper()
+        with self.lock:
+            failures = self.failures.get(symbol, 0) + 1
+            self.failures[symbol] = failures
+            if failures < self.max_failures:
+                return False
+
+            hours = min(self.max_hours, self.base_hours * 2 ** (failures - self.max_failures))
+            row = {
+                'symbol': symbol,
+                'reason': reason,
+                'failures': failures,
+                'quarantined_until': time.time() + hours * 3600
+            }
+            self.quarantined[symbol] = row
+
+        self.db.save_quarantine(symbol, reason, failures, row['quarantined_until'])
+        print(f"Quarantined {symbol} for {hours:g}h after {failures} failures: {reason}")
+        return True
+
+    def record_success(self, symbol):
+        symbol = symbol.upper()
+        with self.lock:
+            if not self.failures.pop(symbol, None):
+                return
+            released = self.quarantined.pop(symbol, None)
+        if released:
+            self.db.clear_quarantine(symbol)
+
+    def list(self):
+        now = time.time()
+        with self.lock:
+            return sorted((row for row in self.quarantined.values() if row['quarantined_until'] > now),
+                          key=lambda row: row['symbol'])
@@ -0,0 +1,97 @@
+import time
+import threading
+import pandas as pd
+from metrics import metrics
+from upstream import download_history
+
+class QuoteSnapshot:
+    """Batched last price, daily change and 1-month return for many symbols
+
+    One yfinance download covers every stale symbol in a request, and results
+    are shared by the watchlist and alert paths within the freshness window.
+    """
+
+    def __init__(self, max_age_seconds=60, calendar=None, on_refresh=None):
+        self.max_age_seconds = max_age_seconds
+        # Optional MarketCalendar; quotes then stay fresh while the market is closed
+        self.calendar = calendar
+        # Optional callback receiving the symbols of every refreshed batch
+        self.on_refresh = on_refresh
+        self.quotes = {}
+        self.lock = threading.Lock()
+
+        # Serializes downloads so concurrent callers reuse each other's refresh
+        self.refresh_lock = threading.Lock()
+
+    def _fresh(self, fetched_at, now):
+        if self.calendar is not None:
+            return self.calendar.is_fresh(fetched_at, self.max_age_seconds, now)
+        return now - fetched_at < self.max_age_seconds
+
+    def _stale(self, symbols):
+        now = time.time()
+        with self.lock:
+            return [s for s in symbols
+                    if s not in self.quotes or not self._fresh(self.quotes[s]['timestamp'], now)]
+
+    def get(self, symbols):
+        """Get quotes for symbols, downloading only the stale ones in one batch"""
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        if not symbols:
+            return {}
+
+        stale = self._stale(symbols)
+        metrics.inc('cache_requests_total', len(symbols) - len(stale), cache='quote_snapshot', result='hit')
+        metrics.inc('cache_requests_total', len(stale), cache='quote_snapshot', result='miss')
+
+        if stale:
+            with self.refresh_lock:
+                # Another request may have refreshed these while we waited
+                stale = self._stale(stale)
+                if stale:
+                    self._refresh(stale)
+
+        with self.lock:
+            return {s: self.quotes[s] for s in symbols if s in self.quotes}
+
+    def _refresh(self, symbols):
+        try:
+            data = download_history(symbols, period='1mo', interval='1d', group_by='ticker',
+                                    auto_adjust=True, threads=True, progress=False)
+        except Exception as e:
+            print(f"Error downloading quotes for {len(symbols)} symbols: {e}")
+            return
+
+        now = time.time()
+        fresh = {}
+        for symbol in symbols:
+            try:
+                # Single-ticker downloads may come back without the ticker column level
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    closes = data[symbol]['Close'].dropna()
+                else:
+                    closes = data['Close'].dropna()
+
+                if closes.empty:
+                    continue
+
+                price = float(closes.iloc[-1])
+                previous_close = float(closes.iloc[-2]) if len(closes) > 1 else price
+                first_close = float(closes.iloc[0])
+                fresh[symbol] = {
+                    'symbol': symbol,
+                    'price': price,
+                    'previous_close': previous_close,
+                    'change_pct': ((price - previous_close) / previous_close) * 100 if previous_close else 0,
+                    'month_change_pct': ((price - first_close) / first_close) * 100 if first_close else 0,
+                    'timestamp': now
+                }
+            except Exception as e:
+                print(f"Error reading quote for {symbol}: {e}")
+
+        with self.lock:
+            self.quotes.update(fresh)
+        if self.on_refresh is not None and fresh:
+            self.on_refresh(list(fresh))
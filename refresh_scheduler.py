@@ -0,0 +1,136 @@
+import math
+import time
+import threading
+from collections import OrderedDict, defaultdict
+
+# Base quote refresh interval in seconds per market session; 'closed' never polls
+SESSION_INTERVALS = {'regular': 5, 'pre': 30, 'post': 30}
+
+class RefreshScheduler:
+    """Per-symbol quote refresh intervals from market session and symbol interest
+
+    Interest is the number of socket clients subscribed to a symbol, users
+    watching it (watchlists and alert rules), recently decayed page views,
+    and every connected client for symbols broadcast to all of them. Symbols
+    at popular_interest or above refresh at the session's base interval;
+    less watched ones stretch towards max_multiplier times that. View
+    counts are kept for the max_viewed_symbols most recently viewed symbols.
+    """
+
+    def __init__(self, calendar, session_intervals=None, popular_interest=10,
+                 max_multiplier=12, view_half_life_seconds=600, max_viewed_symbols=5000):
+        self.calendar = calendar
+        self.session_intervals = session_intervals or SESSION_INTERVALS
+        self.popular_interest = popular_interest
+        self.max_multiplier = max_multiplier
+        self.view_decay = math.log(2) / view_half_life_seconds
+        self.max_viewed_symbols = max_viewed_symbols
+
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.subscriptions = defaultdict(set)
+        self.subscribers = defaultdict(int)
+        self.watchers = {}
+        self.broadcast = set()
+        self.views = OrderedDict()
+
+        # Client and subscriber counts published by other nodes
+        self.remote_clients = 0
+        self.remote_subscribers = {}
+
+    def connect(self, sid):
+        with self.lock:
+            self.clients.add(sid)
+
+    def disconnect(self, sid):
+        with self.lock:
+            self.clients.discard(sid)
+            for symbol in self.subscriptions.pop(sid, ()):
+                self.subscribers[symbol] -= 1
+                if self.subscribers[symbol] <= 0:
+                    del self.subscribers[symbol]
+
+    def subscribe(self, sid, symbol):
+        with self.lock:
+            if symbol not in self.subscriptions[sid]:
+                self.subscriptions[sid].add(symbol)
+                self.subscribers[symbol] += 1
+
+    def subscribed(self):
+        """Symbols with socket subscribers on any node"""
+        with self.lock:
+            return set(self.subscribers) | set(self.remote_subscribers)
+
+    def set_watchers(self, counts):
+        """Replace the {symbol: watching users} counts"""
+        with self.lock:
+            self.watchers = dict(counts)
+
+    def snapshot(self):
+        """This node's client and subscriber counts, for the fetch leader"""
+        with self.lock:
+            return {'clients': len(self.clients), 'subscribers': dict(self.subscribers)}
+
+    def set_remote(self, snapshots):
+        """Merge snapshot() results from the other nodes"""
+        subscribers = defaultdict(int)
+        for snapshot in snapshots:
+            for symbol, count in snapshot['subscribers'].items():
+                subscribers[symbol] += count
+        with self.lock:
+            self.remote_clients = sum(snapshot['clients'] for snapshot in snapshots)
+            self.remote_subscribers = dict(subscribers)
+
+    def set_broadcast(self, symbols):
+        """Symbols pushed to every connected client"""
+        with self.lock:
+            self.broadcast = set(symbols)
+
+    def record_view(self, symbol, now=None):
+        """Count a page view with exponential decay"""
+        now = time.time() if now is None else now
+        with self.lock:
+            score, at = self.views.get(symbol, (0.0, now))
+            self.views[symbol] = (score * math.exp(-self.view_decay * (now - at)) + 1, now)
+            self.views.move_to_end(symbol)
+            # Forget the least recently viewed symbols
+            while len(self.views) > self.max_viewed_symbols:
+                self.views.popitem(last=False)
+
+    def interest(self, symbol, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            score, at = self.views.get(symbol, (0.0, now))
+            interest = self.subscribers.get(symbol, 0) + self.remote_subscribers.get(symbol, 0)
+            interest += self.watchers.get(symbol, 0)
+            interest += score * math.exp(-self.view_decay * (now - at))
+            if symbol in self.broadcast:
+                interest += len(self.clients) + self.remote_clients
+            return interest
+
+    def interval(self, symbol, now=None):
+        """Seconds between refreshes for a symbol, or None while the market is closed"""
+        now = time.time() if now is None else now
+        base = self.session_intervals.get(self.calendar.session_at(now))
+        if base is None:
+            return None
+        interest = self.interest(symbol, now)
+        multiplier = self.popular_interest / interest if interest > 0 else self.max_multiplier
+        return base * min(self.max_multiplier, max(1.0, multiplier))
+
+    def is_fresh(self, symbol, fetched_at, now=None):
+        """Whether a quote fetched at fetched_at needs no refresh yet"""
+        now = time.time() if now is None else now
+        interval = self.interval(symbol, now)
+        if interval is None:
+            return self.calendar.is_fresh(fetched_at, 0, now)
+        return bool(fetched_at) and now - fetched_at < interval
+
+    def poll_seconds(self, now=None):
+        """How long the refresh loop should sleep between passes"""
+        now = time.time() if now is None else now
+        base = self.session_intervals.get(self.calendar.session_at(now))
+        if base is None:
+            # Nothing to poll; wake at the next open or to serve new subscribers
+            return max(1.0, min(60.0, self.calendar.next_open(now) - now))
+        return base
@@ -0,0 +1,218 @@
+import time
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict, defaultdict
+from flask import request, session, g, make_response
+from metrics import metrics
+from compression import MIN_COMPRESS_SIZE, COMPRESSIBLE_TYPES, choose_encoding, compress
+
+class ResponseCache:
+    """Cached GET responses for Flask routes, invalidated by TTL or by tag
+
+    Entries are keyed by endpoint, path and query string (and the session
+    user for per-user routes) and hold the serialized body plus its
+    compressed variants, so a hit costs no JSON encoding or compression.
+    Views and their callers attach tags such as 'quote:AAPL' or
+    'watchlist:7'; invalidate(tag) drops every entry carrying it. Every
+    cached response has an ETag, and matching If-None-Match requests get a
+    304. Concurrent misses for one key wait for a single computation, and a
+    miss whose tags were invalidated while it was computing is served but
+    not stored.
+
+    With a shared message bus (several nodes), invalidate() also bumps a
+    per-tag version on the bus. Entries remember their tags' versions and
+    a hit whose versions moved is treated as a miss, so an invalidation on
+    one node reaches every node's cache.
+    """
+
+    def __init__(self, max_entries=2048, bus=None):
+        self.max_entries = max_entries
+        self.bus = bus
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.tags = defaultdict(set)
+        self.key_locks = {}
+
+        # Invalidation clock: tag -> tick it was last invalidated at
+        self.generation = 0
+        self.invalidated_at = {}
+        self.cleared_at = 0
+
+    def _key_lock(self, key):
+        with self.lock:
+            lock = self.key_locks.get(key)
+            if lock is None:
+                lock = self.key_locks[key] = [threading.Lock(), 0]
+            lock[1] += 1
+            return lock
+
+    def _release_key_lock(self, key, lock):
+        with self.lock:
+            lock[1] -= 1
+            if not lock[1]:
+                del self.key_locks[key]
+
+    def _key(self, per_user):
+        user = session.get('user', {}).get('id') if per_user else None
+        return (request.endpoint, request.path, tuple(sorted(request.args.items(multi=True))), user)
+
+    def _get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.time():
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+        if entry['versions'] and self._versions(entry['versions']) != entry['versions']:
+            # Invalidated on another node
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    self._drop(key)
+            return None
+        return entry
+
+    def _versions(self, tags):
+        """{tag: version on the bus} for the tags, or {} without a bus"""
+        if self.bus is None or not tags:
+            return {}
+        tags = sorted(tags)
+        try:
+            return dict(zip(tags, self.bus.hmget('response_cache_tags', tags)))
+        except Exception as e:
+            print(f"Error reading response cache tag versions: {e}")
+            return {}
+
+    def _put(self, key, entry, started_at):
+        """Store an entry computed since tick started_at; False if one of its tags was invalidated since"""
+        with self.lock:
+            if self.cleared_at > started_at or any(self.invalidated_at.get(tag, 0) > started_at
+                                                   for tag in entry['tags']):
+                return False
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = entry
+            for tag in entry['tags']:
+                self.tags[tag].add(key)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+            return True
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        for tag in entry['tags']:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the tags"""
+        with self.lock:
+            self.generation += 1
+            for tag in tags:
+                self.invalidated_at[tag] = self.generation
+                for key in list(self.tags.get(tag, ())):
+                    self._drop(key)
+        if self.bus is not None and tags:
+            try:
+                self.bus.hincr('response_cache_tags', *tags)
+            except Exception as e:
+                print(f"Error publishing response cache invalidations: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.cleared_at = self.generation
+            self.invalidated_at.clear()
+            self.entries.clear()
+            self.tags.clear()
+
+    def tag(self, *tags):
+        """Tag the response the current view is producing"""
+        g.setdefault('response_cache_tags', set()).update(tags)
+
+    def cached(self, ttl, tags=None, per_user=False):
+        """Cache a route's 200 GET responses for ttl seconds
+
+        tags is an optional callable receiving the view's arguments and
+        returning the entry's tags; views can add more with tag().
+        """
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET':
+                    return f(*args, **kwargs)
+
+                key = self._key(per_user)
+                entry = self._get(key)
+                metrics.cache_result('response_cache', entry is not None, route=request.endpoint)
+                if entry is None:
+                    lock = self._key_lock(key)
+                    try:
+                        with lock[0]:
+                            # Another request may have filled the entry while we waited
+                            entry = self._get(key)
+                            if entry is None:
+                                entry_tags = set(tags(*args, **kwargs)) if tags else set()
+                                with self.lock:
+                                    started_at = self.generation
+                                versions = self._versions(entry_tags)
+                                response = make_response(f(*args, **kwargs))
+                                entry = self._store(key, response, ttl, per_user, entry_tags,
+                                                    started_at, versions)
+                                if entry is None:
+                                    return response
+                    finally:
+                        self._release_key_lock(key, lock)
+                return self._respond(entry)
+            return wrapper
+        return decorator
+
+    def _store(self, key, response, ttl, per_user, tags, started_at, versions):
+        """Cache a view's response, or return None when it isn't cacheable or already stale"""
+        if response.status_code != 200 or response.direct_passthrough:
+            return None
+        body = response.get_data()
+        entry = {
+            'body': body,
+            'mimetype': response.mimetype,
+            'etag': hashlib.sha1(body).hexdigest()[:20],
+            'encoded': {},
+            'cache_control': 'private, no-cache' if per_user else 'no-cache',
+            'tags': set(tags) | g.get('response_cache_tags', set()),
+            'expires_at': time.time() + ttl
+        }
+        # Tags the view added itself are versioned as of now
+        entry['versions'] = {**self._versions(entry['tags'] - set(versions)), **versions}
+        if not self._put(key, entry, started_at):
+            return None
+        return entry
+
+    def _respond(self, entry):
+        if request.if_none_match.contains_weak(entry['etag']):
+            response = make_response('', 304)
+        else:
+            body = entry['body']
+            encoding = None
+            if len(body) >= MIN_COMPRESS_SIZE and entry['mimetype'] in COMPRESSIBLE_TYPES:
+                encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+            if encoding is not None:
+                encoded = entry['encoded'].get(encoding)
+                if encoded is None:
+                    encoded = entry['encoded'][encoding] = compress(body, encoding)
+                body = encoded
+
+            response = make_response(body)
+            response.mimetype = entry['mimetype']
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+
+        # Weak, since one ETag covers every encoding of the body
+        response.set_etag(entry['etag'], weak=True)
+        response.headers['Cache-Control'] = entry['cache_control']
+        return response
@@ -0,0 +1,70 @@
+import math
+import time
+import threading
+
+class ScoreHistory:
+    """Persisted per-run universe scores with exponential smoothing and rank deltas
+
+    Every scoring run appends one row per symbol to the score_history table,
+    including a time-aware EWMA of the overall score (half_life_hours) and
+    the symbol's rank. Rankings are then annotated with the rank change
+    since the previous run and the smoothed-score change over
+    lookback_hours, so "rising fastest" needs no recomputation.
+    """
+
+    def __init__(self, db, half_life_hours=12, lookback_hours=24, retention_days=365):
+        self.db = db
+        self.decay = math.log(2) / (half_life_hours * 3600)
+        self.lookback = lookback_hours * 3600
+        self.retention = retention_days * 86400
+        self.lock = threading.Lock()
+
+        # universe -> {symbol: (scored_at, smoothed, rank)} for the latest run
+        self.latest = {}
+
+    def _latest(self, universe, now):
+        if universe not in self.latest:
+            self.latest[universe] = self.db.get_scores_as_of(universe, now, now - self.retention)
+        return self.latest[universe]
+
+    def record(self, ranking):
+        """Persist a ranking from UniverseScorer.score() and annotate its stocks in place"""
+        universe = ranking['name']
+        now = int(ranking['scored_at'])
+        past = self.db.get_scores_as_of(universe, now - self.lookback, now - self.lookback - 7 * 86400)
+
+        with self.lock:
+            previous = self._latest(universe, now)
+            latest = {}
+            rows = []
+            for rank, stock in enumerate(ranking['stocks'], 1):
+                symbol = stock['symbol']
+                last = previous.get(symbol)
+                if last is None:
+                    smoothed = stock['score']
+                else:
+                    alpha = 1 - math.exp(-self.decay * max(0, now - last[0]))
+                    smoothed = last[1] + alpha * (stock['score'] - last[1])
+
+                then = past.get(symbol)
+                stock['smoothed_score'] = smoothed
+                stock['rank'] = rank
+                stock['rank_change'] = last[2] - rank if last else None
+                stock['score_delta'] = smoothed - then[1] if then else None
+
+                latest[symbol] = (now, smoothed, rank)
+                rows.append((universe, symbol, now, stock['sentiment'], stock['trend'],
+                             stock['score'], smoothed, rank))
+            self.latest[universe] = latest
+
+        if rows:
+            self.db.add_score_history(rows)
+        return ranking
+
+    def series(self, universe, symbol, days=30):
+        """A symbol's score rows over the last `days` days"""
+        now = int(time.time())
+        return self.db.get_score_history(universe, symbol.upper(), now - days * 86400, now)
+
+    def prune(self):
+        self.db.prune_score_history(int(time.time()) - self.retention)
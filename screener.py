@@ -0,0 +1,284 @@
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from portfolio_analytics import aligned_closes
+from upstream import ticker_info
+
+# Screenable columns: indicators from archived daily closes, fundamentals from .info, listing text
+INDICATOR_FIELDS = ('price', 'change_pct', 'return_1mo', 'rsi', 'ma20', 'ma50')
+FUNDAMENTAL_FIELDS = {'market_cap': 'marketCap', 'pe': 'trailingPE', 'dividend_yield': 'dividendYield'}
+TEXT_FIELDS = ('sector', 'exchange')
+NUMERIC_FIELDS = INDICATOR_FIELDS + tuple(FUNDAMENTAL_FIELDS)
+
+# Quoted strings stay whole so 'and'/'or' inside them don't split clauses; a lone quote is unterminated
+_TOKEN = re.compile(r'"[^"]*"|\'[^\']*\'|[^\s"\']+|["\']')
+_CLAUSE = re.compile(r'^\s*([a-z_0-9]+)\s*(<=|>=|==|!=|=|<|>)\s*(.+?)\s*$', re.IGNORECASE)
+_NUMBER = re.compile(r'^(-?\d+(?:\.\d+)?)([kmbt]?)$', re.IGNORECASE)
+_SUFFIXES = {'': 1, 'k': 1e3, 'm': 1e6, 'b': 1e9, 't': 1e12}
+_OPS = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+        '=': np.equal, '==': np.equal, '!=': np.not_equal}
+
+class ScreenerError(ValueError):
+    """An invalid screener expression"""
+
+def _split_clauses(text):
+    """Clause strings as OR-ed groups of AND-ed clauses, keeping quoted text whole"""
+    groups = [[[]]]
+    for token in _TOKEN.findall(text):
+        if token in ('"', "'"):
+            raise ScreenerError(f"Unterminated quote in '{text.strip()}'")
+        if token.lower() == 'or':
+            groups.append([[]])
+        elif token.lower() == 'and':
+            groups[-1].append([])
+        else:
+            groups[-1][-1].append(token)
+    return [[' '.join(tokens) for tokens in group] for group in groups]
+
+def parse_query(text):
+    """Parse 'rsi < 30 and price > ma50 or pe <= 15' into OR-ed groups of AND-ed clauses
+
+    A clause compares a field with a number (10B, 500M, 2.5k suffixes
+    allowed), another numeric field, or a text value for sector/exchange.
+    Quote text values that contain spaces, 'and' or 'or' (sector = "Oil and Gas").
+    """
+    groups = []
+    for group in _split_clauses(text):
+        clauses = []
+        for clause in group:
+            match = _CLAUSE.match(clause)
+            if not match:
+                raise ScreenerError(f"Cannot parse '{clause.strip()}', expected <field> <op> <value>")
+            field, op, value = match.group(1).lower(), match.group(2), match.group(3).strip('\'"')
+            if field in TEXT_FIELDS:
+                if op not in ('=', '==', '!='):
+                    raise ScreenerError(f"{field} only supports = and !=")
+                clauses.append((field, op, value.lower()))
+                continue
+            if field not in NUMERIC_FIELDS:
+                raise ScreenerError(f"Unknown field '{field}', expected one of {', '.join(NUMERIC_FIELDS + TEXT_FIELDS)}")
+            number = _NUMBER.match(value)
+            if number:
+                clauses.append((field, op, float(number.group(1)) * _SUFFIXES[number.group(2).lower()]))
+            elif value.lower() in NUMERIC_FIELDS:
+                clauses.append((field, op, value.lower()))
+            else:
+                raise ScreenerError(f"Expected a number or numeric field after '{field} {op}', got '{value}'")
+        groups.append(clauses)
+    return groups
+
+def compute_indicators(closes):
+    """Latest indicator values per column of a (days x symbols) close matrix
+
+    Windows with a missing close give NaN, like a pandas rolling mean.
+    RSI uses the same simple-average form as stock_analyzer.calculate_rsi.
+    """
+    def back(rows):
+        return closes[-rows] if len(closes) >= rows else np.full(closes.shape[1], np.nan)
+
+    def mean_of_last(rows):
+        return closes[-rows:].mean(axis=0) if len(closes) >= rows else np.full(closes.shape[1], np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        price = back(1)
+        deltas = np.diff(closes[-15:], axis=0)
+        gain = np.where(deltas > 0, deltas, 0).mean(axis=0)
+        loss = np.where(deltas < 0, -deltas, 0).mean(axis=0)
+        rsi = 100 - 100 / (1 + gain / loss)
+        rsi[np.isnan(deltas).any(axis=0) | (len(deltas) < 14)] = np.nan
+        return {
+            'price': price,
+            'change_pct': (price / back(2) - 1) * 100,
+            'return_1mo': (price / back(22) - 1) * 100,
+            'rsi': rsi,
+            'ma20': mean_of_last(20),
+            'ma50': mean_of_last(50)
+        }
+
+class ScreenerSnapshot:
+    """Columnar arrays for a universe plus a sorted index per numeric column
+
+    Range predicates against a constant are two binary searches on the
+    sorted column; field-to-field comparisons are elementwise over the
+    columns. NaN (missing data) never matches.
+    """
+
+    def __init__(self, symbols, numeric, text, built_at=None):
+        self.symbols = np.asarray(symbols)
+        self.positions = {symbol: i for i, symbol in enumerate(symbols)}
+        self.numeric = numeric
+        self.text = text
+        self.text_keys = {field: np.array([value.lower() for value in values], dtype=object)
+                          for field, values in text.items()}
+        self.built_at = time.time() if built_at is None else built_at
+
+        # argsort puts NaN last; `valid` counts the sortable prefix
+        self.order = {}
+        self.sorted = {}
+        self.valid = {}
+        for field, values in numeric.items():
+            order = np.argsort(values, kind='stable')
+            self.order[field] = order
+            self.sorted[field] = values[order]
+            self.valid[field] = int(np.count_nonzero(~np.isnan(values)))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def range_mask(self, field, op, value):
+        """Boolean mask of `field op value` from the sorted index"""
+        values = self.sorted[field][:self.valid[field]]
+        left = int(np.searchsorted(values, value, side='left'))
+        right = int(np.searchsorted(values, value, side='right'))
+        bounds = {'<': (0, left), '<=': (0, right), '>': (right, len(values)), '>=': (left, len(values)),
+                  '=': (left, right), '==': (left, right)}
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        if op == '!=':
+            mask[self.order[field][:left]] = True
+            mask[self.order[field][right:len(values)]] = True
+        else:
+            start, end = bounds[op]
+            mask[self.order[field][start:end]] = True
+        return mask
+
+    def clause_mask(self, field, op, value):
+        if field in TEXT_FIELDS:
+            mask = self.text_keys[field] == value
+            return ~mask if op == '!=' else mask
+        if isinstance(value, str):
+            with np.errstate(invalid='ignore'):
+                return _OPS[op](self.numeric[field], self.numeric[value]) \
+                    & ~np.isnan(self.numeric[field]) & ~np.isnan(self.numeric[value])
+        return self.range_mask(field, op, value)
+
+    def mask(self, groups):
+        result = np.zeros(len(self.symbols), dtype=bool)
+        for clauses in groups:
+            group = np.ones(len(self.symbols), dtype=bool)
+            for clause in clauses:
+                group &= self.clause_mask(*clause)
+            result |= group
+        return result
+
+    def rows(self, indices):
+        return [{
+            'symbol': str(self.symbols[i]),
+            **{field: (None if np.isnan(values[i]) else round(float(values[i]), 4))
+               for field, values in self.numeric.items()},
+            **{field: values[i] or None for field, values in self.text.items()}
+        } for i in indices]
+
+class Screener:
+    """Filter-expression screening over a columnar snapshot of a universe
+
+    The snapshot is rebuilt in the background when older than
+    max_age_minutes: one batched archive update and one aligned close
+    matrix for the indicators, and .info fundamentals refreshed for at
+    most max_info_calls symbols per build (older than
+    fundamentals_max_age_hours first), so a large universe fills in over
+    a few builds without flooding yfinance.
+    """
+
+    def __init__(self, registry, price_archive, symbol_index, quarantine=None, universe='listed',
+                 max_age_minutes=60, fundamentals_max_age_hours=24, max_info_calls=500, info_workers=8):
+        self.registry = registry
+        self.price_archive = price_archive
+        self.symbol_index = symbol_index
+        self.quarantine = quarantine
+        self.universe = universe
+        self.max_age = max_age_minutes * 60
+        self.fundamentals_max_age = fundamentals_max_age_hours * 3600
+        self.max_info_calls = max_info_calls
+        self.info_workers = info_workers
+
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.building = False
+        self.fundamentals = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screener')
+
+    def _fetch_fundamentals(self, symbol):
+        try:
+            info = ticker_info(symbol)
+        except Exception as e:
+            print(f"Error fetching fundamentals for {symbol}: {e}")
+            return symbol, None
+        return symbol, (time.time(), {field: info.get(key) for field, key in FUNDAMENTAL_FIELDS.items()})
+
+    def _refresh_fundamentals(self, symbols):
+        now = time.time()
+        stale = sorted((s for s in symbols if now - self.fundamentals.get(s, (0, None))[0] > self.fundamentals_max_age),
+                       key=lambda s: self.fundamentals.get(s, (0, None))[0])[:self.max_info_calls]
+        if not stale:
+            return
+        with ThreadPoolExecutor(max_workers=self.info_workers, thread_name_prefix='screener-info') as pool:
+            for symbol, entry in pool.map(self._fetch_fundamentals, stale):
+                if entry is not None:
+                    self.fundamentals[symbol] = entry
+
+    def build(self):
+        """Build a new snapshot now and swap it in"""
+        symbols = self.registry.symbols(self.universe)
+        if self.quarantine is not None:
+            symbols = self.quarantine.filter(symbols)
+        self.price_archive.update_many(symbols)
+        _, closes = aligned_closes(self.price_archive, symbols, '3mo')
+        numeric = compute_indicators(closes)
+        self._refresh_fundamentals(symbols)
+
+        for field in FUNDAMENTAL_FIELDS:
+            numeric[field] = np.array([
+                np.nan if value is None else value
+                for value in ((self.fundamentals.get(s, (0, {}))[1] or {}).get(field) for s in symbols)
+            ], dtype=np.float64)
+        listings = [self.symbol_index.get(s) or {} for s in symbols]
+        text = {field: np.array([listing.get(field) or '' for listing in listings], dtype=object)
+                for field in TEXT_FIELDS}
+
+        snapshot = ScreenerSnapshot(symbols, numeric, text)
+        with self.lock:
+            self.snapshot = snapshot
+        print(f"Built screener snapshot of {len(snapshot)} symbols")
+        return snapshot
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception as e:
+            print(f"Error building screener snapshot: {e}")
+        finally:
+            with self.lock:
+                self.building = False
+
+    def current(self):
+        """(snapshot or None, whether a rebuild is running), scheduling one when missing or stale"""
+        with self.lock:
+            snapshot = self.snapshot
+            stale = snapshot is None or time.time() - snapshot.built_at > self.max_age
+            if stale and not self.building:
+                self.building = True
+                self.executor.submit(self._build_in_background)
+            return snapshot, self.building
+
+    def query(self, snapshot, text, sort=None, descending=False, limit=50, symbols=None):
+        """Matching rows of a snapshot, optionally within symbols and sorted by a numeric field"""
+        mask = snapshot.mask(parse_query(text)) if text and text.strip() else np.ones(len(snapshot), dtype=bool)
+        if symbols is not None:
+            within = np.zeros(len(snapshot), dtype=bool)
+            within[[snapshot.positions[s] for s in symbols if s in snapshot.positions]] = True
+            mask &= within
+
+        if sort is None:
+            indices = np.flatnonzero(mask)
+        else:
+            if sort not in NUMERIC_FIELDS:
+                raise ScreenerError(f"Cannot sort by '{sort}', expected one of {', '.join(NUMERIC_FIELDS)}")
+            # Walk the presorted index instead of sorting the matches; NaN stays last
+            order = snapshot.order[sort][:snapshot.valid[sort]]
+            if descending:
+                order = order[::-1]
+            order = np.concatenate([order, snapshot.order[sort][snapshot.valid[sort]:]])
+            indices = order[mask[order]]
+        return int(np.count_nonzero(mask)), snapshot.rows(indices[:limit])
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import math
+import numpy as np
+
+# Financial-news cue words and their weights (strong moves count 1.5)
+POSITIVE = {
+    **dict.fromkeys(('beat', 'beats', 'tops', 'topped', 'exceed', 'exceeds', 'exceeded', 'gain', 'gains',
+                     'gained', 'jump', 'jumps', 'jumped', 'climb', 'climbs', 'climbed', 'rise', 'rises',
+                     'rose', 'rally', 'rallies', 'rallied', 'rebound', 'rebounds', 'rebounded', 'strong',
+                     'stronger', 'growth', 'grows', 'profit', 'profits', 'profitable', 'upgrade', 'upgrades',
+                     'upgraded', 'outperform', 'outperforms', 'bullish', 'boost', 'boosts', 'boosted',
+                     'raises', 'expands', 'expansion', 'wins', 'approval', 'approved', 'optimistic', 'upbeat',
+                     'buyback', 'buybacks', 'higher', 'momentum', 'accelerates', 'tailwind', 'tailwinds'), 1.0),
+    **dict.fromkeys(('surge', 'surges', 'surged', 'soar', 'soars', 'soared', 'record', 'breakthrough',
+                     'blowout'), 1.5)
+}
+NEGATIVE = {
+    **dict.fromkeys(('miss', 'misses', 'missed', 'fall', 'falls', 'fell', 'drop', 'drops', 'dropped',
+                     'decline', 'declines', 'declined', 'slip', 'slips', 'slipped', 'loss', 'losses',
+                     'weak', 'weaker', 'weakness', 'downgrade', 'downgrades', 'downgraded', 'underperform',
+                     'underperforms', 'bearish', 'cuts', 'lawsuit', 'lawsuits', 'sued', 'probe',
+                     'investigation', 'recall', 'recalls', 'layoff', 'layoffs', 'warning', 'warns',
+                     'warned', 'concern', 'concerns', 'slowdown', 'lower', 'fined', 'penalty', 'delay',
+                     'delays', 'delayed', 'halt', 'halted', 'headwind', 'headwinds', 'selloff'), 1.0),
+    **dict.fromkeys(('plunge', 'plunges', 'plunged', 'tumble', 'tumbles', 'tumbled', 'slump', 'slumps',
+                     'slumped', 'crash', 'crashes', 'crashed', 'fraud', 'bankruptcy', 'bankrupt',
+                     'default'), 1.5)
+}
+# A negation flips the next cue word within NEGATION_WINDOW tokens
+NEGATIONS = {'not', 'no', 'never', 'without', 'fails', 'failed'}
+NEGATION_WINDOW = 3
+
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# Per-token weights fitted to FinBERT scores by fit_weights(); used instead of the word lists when present
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sentiment_weights.json')
+
+def _cues(text, known):
+    """(token, +1/-1) for each token in `known`; a negation flips the next one within NEGATION_WINDOW"""
+    cues = []
+    last_negation = -NEGATION_WINDOW - 1
+    for i, token in enumerate(_TOKEN.findall((text or '').lower())):
+        if token in NEGATIONS or token.endswith("n't"):
+            last_negation = i
+            continue
+        if token not in known:
+            continue
+        if i - last_negation <= NEGATION_WINDOW:
+            cues.append((token, -1.0))
+            last_negation = -NEGATION_WINDOW - 1
+        else:
+            cues.append((token, 1.0))
+    return cues
+
+def fit_weights(texts, scores, prior=None, min_count=3, l2=0.01, steps=2000, learning_rate=2.0, min_weight=0.05):
+    """Learn {token: weight} so that sigmoid(sum of weights) matches FinBERT bullishness scores
+
+    A logistic regression without intercept over token counts (negated
+    tokens count -1), fitted by gradient descent on cross-entropy with the
+    0..1 scores as soft labels. The L2 penalty pulls weights towards
+    `prior` (e.g. the hand-picked lexicon), so rare tokens stay close to
+    it and prior tokens absent from the texts keep their prior weight.
+    Tokens seen in fewer than min_count texts (and not in the prior) are
+    left out, as are weights smaller than min_weight.
+    """
+    prior = prior or {}
+    counts = {}
+    for text in texts:
+        for token in set(_TOKEN.findall((text or '').lower())) - NEGATIONS:
+            counts[token] = counts.get(token, 0) + 1
+    vocabulary = sorted({token for token, count in counts.items()
+                         if count >= min_count and not token.endswith("n't")} | set(prior))
+    columns = {token: j for j, token in enumerate(vocabulary)}
+    documents = [_cues(text, columns) for text in texts]
+
+    rows, cols, values = [], [], []
+    for i, document in enumerate(documents):
+        for token, sign in document:
+            j = columns.get(token)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+                values.append(sign)
+    rows, cols, values = np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(values)
+    targets = np.clip(np.asarray(scores, dtype=np.float64), 0, 1)
+    anchor = np.array([prior.get(token, 0.0) for token in vocabulary])
+
+    weights = anchor.copy()
+    n = len(documents)
+    for _ in range(steps):
+        logits = np.bincount(rows, weights=weights[cols] * values, minlength=n)
+        errors = 1 / (1 + np.exp(-logits)) - targets
+        gradient = np.bincount(cols, weights=errors[rows] * values, minlength=len(vocabulary)) / n
+        weights -= learning_rate * (gradient + l2 * (weights - anchor))
+
+    return {token: round(float(weight), 4) for token, weight in zip(vocabulary, weights)
+            if abs(weight) >= min_weight}
+
+class LexiconSentiment:
+    """Cheap first-stage sentiment from weighted cue words, for the FinBERT cascade
+
+    score() returns (bullishness 0..1, confidence 0..1). Confidence grows
+    with the amount of evidence and with how much the cues agree, so mixed
+    or single weak cues come back unsure and get escalated to FinBERT.
+    Texts without any cue are neutral with neutral_confidence, 0 by
+    default: the lexicon knows nothing about them, so they always escalate.
+
+    Weights come from `weights` ({token: weight}), else from the file
+    fit_weights() results are saved to (benchmarks/sentiment_cascade.py
+    --fit), else from the hand-picked POSITIVE/NEGATIVE word lists.
+    """
+
+    def __init__(self, positive=None, negative=None, neutral_confidence=0.0, weights=None,
+                 weights_path=DEFAULT_WEIGHTS_PATH):
+        if weights is None and positive is None and negative is None:
+            weights = self.load_weights(weights_path)
+        if weights is not None:
+            self.weights = dict(weights)
+        else:
+            self.weights = {word: weight for word, weight in (positive or POSITIVE).items()}
+            self.weights.update({word: -weight for word, weight in (negative or NEGATIVE).items()})
+        self.neutral_confidence = neutral_confidence
+
+    @staticmethod
+    def hand_weights():
+        """The hand-picked word lists as {token: signed weight}, the prior for fit_weights()"""
+        return {**POSITIVE, **{word: -weight for word, weight in NEGATIVE.items()}}
+
+    @staticmethod
+    def load_weights(path):
+        """Fitted weights saved at path, or None when there are none"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)['weights']
+        except Exception as e:
+            print(f"Error loading sentiment weights from {path}: {e}")
+            return None
+
+    def score(self, text):
+        net = 0.0
+        total = 0.0
+        for token, sign in _cues(text, self.weights):
+            weight = self.weights[token]
+            net += sign * weight
+            total += abs(weight)
+
+        if not total:
+            return 0.5, self.neutral_confidence
+        agreement = abs(net) / total
+        evidence = min(1.0, total / 2)
+        return 1 / (1 + math.exp(-net)), agreement * evidence
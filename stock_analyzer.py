@@ -1,65 +1,136 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from transformers import pipeline
+from cpu_pool import score_sentiment
+from metrics import metrics
+from upstream import ticker_info, ticker_history
+from sentiment_lexicon import LexiconSentiment
+import random
 import warnings
 warnings.filterwarnings('ignore')
 
+def calculate_rsi(prices, period=14):
+    """Calculate Relative Strength Index"""
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    
+    rs = gain / loss
+    rsi = 100 - (100 / (1 + rs))
+    
+    return rsi.iloc[-1]
+
+# Indicator windows, thresholds and weights used by score_trend (tuned with backtest.py)
+TREND_PARAMS = {
+    'ma_short': 20,
+    'ma_long': 50,
+    'rsi_period': 14,
+    'above_short_weight': 0.3,
+    'above_long_weight': 0.2,
+    'crossover_weight': 0.2,
+    'rsi_low': 40,
+    'rsi_high': 70,
+    'rsi_band_weight': 0.2,
+    'rsi_oversold': 30,
+    'oversold_weight': 0.1,
+    'volume_ratio': 1.2,
+    'volume_weight': 0.1
+}
+
+def score_trend(closes, volumes, params=None):
+    """Score a price/volume history on technical indicators (picklable for the CPU pool)"""
+    p = {**TREND_PARAMS, **(params or {})}
+    close = pd.Series(closes, dtype='float64')
+    volume = pd.Series(volumes, dtype='float64')
+    
+    # Calculate moving averages
+    ma_20 = close.rolling(window=p['ma_short']).mean()
+    ma_50 = close.rolling(window=p['ma_long']).mean()
+    
+    # Calculate RSI
+    rsi = calculate_rsi(close, p['rsi_period'])
+    
+    # Calculate trend score
+    trend_score = 0.0
+    
+    # Price above moving averages (bullish)
+    current_price = close.iloc[-1]
+    if current_price > ma_20.iloc[-1]:
+        trend_score += p['above_short_weight']
+    if current_price > ma_50.iloc[-1]:
+        trend_score += p['above_long_weight']
+        
+    # Moving average crossover
+    if ma_20.iloc[-1] > ma_50.iloc[-1]:
+        trend_score += p['crossover_weight']
+        
+    # RSI analysis
+    if p['rsi_low'] < rsi < p['rsi_high']:  # Not oversold or overbought
+        trend_score += p['rsi_band_weight']
+    elif rsi < p['rsi_oversold']:  # Oversold (potential bounce)
+        trend_score += p['oversold_weight']
+        
+    # Volume trend
+    recent_volume = volume.iloc[-5:].mean()
+    avg_volume = volume.mean()
+    if recent_volume > avg_volume * p['volume_ratio']:
+        trend_score += p['volume_weight']
+        
+    return min(trend_score, 1.0)
+
+def sentiment_label(score, band=0.05):
+    """'positive', 'negative' or 'neutral' for a 0..1 bullishness score"""
+    if score > 0.5 + band:
+        return 'positive'
+    if score < 0.5 - band:
+        return 'negative'
+    return 'neutral'
+
 class StockAnalyzer:
-    def __init__(self):
-        # Initialize sentiment analysis pipeline
-        self.sentiment_analyzer = pipeline(
-            "sentiment-analysis",
-            model="ProsusAI/finbert",  # Financial sentiment analysis model
-            device=-1  # Use CPU, set to 0 for GPU
-        )
+    def __init__(self, price_archive=None, cpu_pool=None, sentiment_model=True,
+                 escalate_below=0.6, bulk_escalate_below=0.3, audit_rate=0.05, pool_timeout=60):
+        # Shared on-disk price history (falls back to yfinance when not provided)
+        self.price_archive = price_archive
+        
+        # Process pool for FinBERT and indicator math (runs in-thread when not provided)
+        self.cpu_pool = cpu_pool
+        self.pool_timeout = pool_timeout
+        
+        # Cheap lexicon stage; texts it scores with confidence below escalate_below go to FinBERT
+        self.lexicon = LexiconSentiment()
+        self.escalate_below = escalate_below
+        self.bulk_escalate_below = bulk_escalate_below
+        self.audit_rate = audit_rate
+        
+        # Initialize sentiment analysis pipeline, unless the pool workers own the model
+        # (without sentiment_model, the lexicon scores everything and transformers is never imported)
+        self.sentiment_model = sentiment_model
+        self.sentiment_analyzer = None
+        if sentiment_model and cpu_pool is None:
+            from transformers import pipeline
+            self.sentiment_analyzer = pipeline(
+                "sentiment-analysis",
+                model="ProsusAI/finbert",  # Financial sentiment analysis model
+                device=-1  # Use CPU, set to 0 for GPU
+            )
         
     def analyze_trend(self, symbol):
         """Analyze stock trend based on technical indicators"""
         try:
-            ticker = yf.Ticker(symbol)
-            
             # Get historical data
-            hist = ticker.history(period="3mo")
+            if self.price_archive is not None:
+                hist = self.price_archive.get_history(symbol, '3mo')
+            else:
+                hist = ticker_history(symbol, period="3mo")
             
             if hist.empty:
                 return 0.5
             
-            # Calculate moving averages
-            hist['MA_20'] = hist['Close'].rolling(window=20).mean()
-            hist['MA_50'] = hist['Close'].rolling(window=50).mean()
-            
-            # Calculate RSI
-            rsi = self.calculate_rsi(hist['Close'])
-            
-            # Calculate trend score
-            trend_score = 0.0
-            
-            # Price above moving averages (bullish)
-            current_price = hist['Close'].iloc[-1]
-            if current_price > hist['MA_20'].iloc[-1]:
-                trend_score += 0.3
-            if current_price > hist['MA_50'].iloc[-1]:
-                trend_score += 0.2
-                
-            # Moving average crossover
-            if hist['MA_20'].iloc[-1] > hist['MA_50'].iloc[-1]:
-                trend_score += 0.2
-                
-            # RSI analysis
-            if 40 < rsi < 70:  # Not oversold or overbought
-                trend_score += 0.2
-            elif rsi < 30:  # Oversold (potential bounce)
-                trend_score += 0.1
-                
-            # Volume trend
-            recent_volume = hist['Volume'].iloc[-5:].mean()
-            avg_volume = hist['Volume'].mean()
-            if recent_volume > avg_volume * 1.2:
-                trend_score += 0.1
-                
-            return min(trend_score, 1.0)
+            closes = hist['Close'].to_numpy()
+            volumes = hist['Volume'].to_numpy()
+            if self.cpu_pool is not None:
+                return self.cpu_pool.run(score_trend, closes, volumes, timeout=self.pool_timeout)
+            return score_trend(closes, volumes)
             
         except Exception as e:
             print(f"Error analyzing trend for {symbol}: {e}")
@@ -67,20 +138,12 @@ class StockAnalyzer:
     
     def calculate_rsi(self, prices, period=14):
         """Calculate Relative Strength Index"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return rsi.iloc[-1]
+        return calculate_rsi(prices, period)
     
     def get_company_summary(self, symbol):
         """Get a comprehensive summary of the company"""
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = ticker_info(symbol)
             
             # Get company description
             description = info.get('longBusinessSummary', '')
@@ -139,28 +202,73 @@ class StockAnalyzer:
         except Exception as e:
             return f"Unable to retrieve detailed information for {symbol}."
     
-    def analyze_news_sentiment(self, news_texts):
-        """Analyze sentiment of news articles using FinBERT"""
+    def analyze_news_sentiment(self, news_texts, weights=None, bulk=False):
+        """Analyze sentiment of news articles, optionally weighting each text"""
         if not news_texts:
             return 0.5
         
         try:
-            # Analyze each text
-            sentiments = []
-            for text in news_texts[:5]:  # Limit to 5 articles for performance
-                if text:
-                    result = self.sentiment_analyzer(text[:512])[0]  # Limit text length
-                    
-                    # Convert to score
-                    if result['label'] == 'positive':
-                        sentiments.append(result['score'])
-                    elif result['label'] == 'negative':
-                        sentiments.append(1 - result['score'])
-                    else:  # neutral
-                        sentiments.append(0.5)
-            
-            return np.mean(sentiments) if sentiments else 0.5
+            # Limit to 5 articles for performance
+            pairs = list(zip(news_texts, weights or [1] * len(news_texts)))[:5]
+            texts = [text for text, _ in pairs if text]
+            weights = [weight for text, weight in pairs if text]
+            
+            sentiments = self.score_texts(texts, bulk=bulk)
+            return np.average(sentiments, weights=weights) if sentiments else 0.5
             
         except Exception as e:
             print(f"Error analyzing sentiment: {e}")
             return 0.5
+    
+    def score_texts(self, texts, bulk=False, escalate_below=None):
+        """Cascade scoring: the lexicon scores every text, FinBERT only those it is unsure of
+
+        Bulk refreshes escalate below bulk_escalate_below instead of
+        escalate_below. A sample of confident texts (audit_rate) is scored
+        by FinBERT too, to track how often the lexicon agrees with it.
+        """
+        cheap = [self.lexicon.score(text) for text in texts]
+        if not self.sentiment_model:
+            metrics.inc('sentiment_texts_total', len(texts), stage='lexicon')
+            return [score for score, _ in cheap]
+        
+        if escalate_below is None:
+            escalate_below = self.bulk_escalate_below if bulk else self.escalate_below
+        escalate = [i for i, (_, confidence) in enumerate(cheap) if confidence < escalate_below]
+        audit = [i for i, (_, confidence) in enumerate(cheap)
+                 if confidence >= escalate_below and random.random() < self.audit_rate]
+        finbert = dict(zip(escalate + audit, self._finbert_scores([texts[i] for i in escalate + audit])))
+        
+        for i in audit:
+            agree = sentiment_label(cheap[i][0]) == sentiment_label(finbert[i])
+            metrics.inc('sentiment_audit_total', result='agree' if agree else 'disagree')
+        metrics.inc('sentiment_texts_total', len(texts) - len(escalate), stage='lexicon')
+        metrics.inc('sentiment_texts_total', len(escalate), stage='finbert')
+        
+        escalated = set(escalate)
+        return [finbert[i] if i in escalated else score for i, (score, _) in enumerate(cheap)]
+    
+    def _finbert_scores(self, texts):
+        """FinBERT bullishness per text, batched on a pool worker when there is one"""
+        if not texts:
+            return []
+        
+        # Score the whole batch in one call on a pool worker
+        if self.cpu_pool is not None:
+            with metrics.timer('finbert_batch_seconds', mode='pool'):
+                return self.cpu_pool.run(score_sentiment, texts, timeout=self.pool_timeout)
+        
+        # Analyze each text
+        sentiments = []
+        with metrics.timer('finbert_batch_seconds', mode='inline'):
+            for text in texts:
+                result = self.sentiment_analyzer(text[:512])[0]  # Limit text length
+                
+                # Convert to score
+                if result['label'] == 'positive':
+                    sentiments.append(result['score'])
+                elif result['label'] == 'negative':
+                    sentiments.append(1 - result['score'])
+                else:  # neutral
+                    sentiments.append(0.5)
+        return sentiments
@@ -0,0 +1,164 @@
+import csv
+import os
+import re
+import threading
+import difflib
+from bisect import bisect_left
+
+DEFAULT_LISTING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'symbols.csv')
+
+class SymbolIndex:
+    """In-memory ticker universe (symbol, name, exchange, sector) for offline lookups"""
+
+    def __init__(self, listing_path=DEFAULT_LISTING_PATH, refresh_url=None, cache_dir='cache'):
+        self.listing_path = listing_path
+        self.refresh_url = refresh_url or os.getenv('SYMBOL_LISTING_URL')
+        self.cache_path = os.path.join(cache_dir, 'symbols.csv')
+        self.lock = threading.Lock()
+        self.loaded_mtime = None
+
+        # Index structures are swapped in as one tuple so readers never see a half-built index
+        self._index = ({}, [], [], {})
+
+        # Prefer a previously refreshed listing over the bundled one
+        if os.path.exists(self.cache_path):
+            self.load(self.cache_path)
+        else:
+            self.load(self.listing_path)
+
+    @staticmethod
+    def _normalize(text):
+        """Uppercase and strip punctuation so 'Coca-Cola' matches 'COCA COLA'"""
+        return ' '.join(re.sub(r'[^A-Z0-9]+', ' ', text.upper()).split())
+
+    def load(self, path):
+        """Load a listing file and rebuild the index"""
+        records = {}
+        try:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    symbol = (row.get('symbol') or '').strip().upper()
+                    if not symbol:
+                        continue
+                    records[symbol] = {
+                        'symbol': symbol,
+                        'name': (row.get('name') or symbol).strip(),
+                        'exchange': (row.get('exchange') or '').strip(),
+                        'sector': (row.get('sector') or '').strip()
+                    }
+        except Exception as e:
+            print(f"Error loading symbol listing {path}: {e}")
+            return False
+
+        # Sorted symbols for prefix range scans
+        symbols = sorted(records)
+
+        # Every word-start suffix of the name, so 'DISNEY' and 'WALT DISNEY' both hit
+        name_keys = []
+        words = {}
+        for symbol, record in records.items():
+            tokens = self._normalize(record['name']).split()
+            for i, token in enumerate(tokens):
+                name_keys.append((' '.join(tokens[i:]), symbol))
+                words.setdefault(token, set()).add(symbol)
+        name_keys.sort()
+
+        with self.lock:
+            self._index = (records, symbols, name_keys, words)
+            self.loaded_mtime = os.path.getmtime(path)
+
+        print(f"Loaded {len(records)} symbols from {path}")
+        return True
+
+    def refresh(self):
+        """Refresh the listing from SYMBOL_LISTING_URL, or reload the local file if it changed"""
+        if self.refresh_url:
+            try:
+                import requests
+                response = requests.get(self.refresh_url, timeout=30)
+                response.raise_for_status()
+
+                os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                tmp_path = self.cache_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+                os.replace(tmp_path, self.cache_path)
+
+                return self.load(self.cache_path)
+            except Exception as e:
+                print(f"Error refreshing symbol listing: {e}")
+                return False
+
+        path = self.cache_path if os.path.exists(self.cache_path) else self.listing_path
+        if os.path.getmtime(path) != self.loaded_mtime:
+            return self.load(path)
+        return True
+
+    def __len__(self):
+        return len(self._index[0])
+
+    def get(self, symbol):
+        """Get the listing record for an exact symbol"""
+        return self._index[0].get(symbol.upper())
+
+    def symbols(self, sector=None, exchange=None):
+        """Listed symbols, optionally filtered by sector and/or exchange"""
+        return sorted(symbol for symbol, record in self._index[0].items()
+                      if (sector is None or record.get('sector', '').lower() == sector.lower())
+                      and (exchange is None or record.get('exchange', '').lower() == exchange.lower()))
+
+    def contains(self, symbol):
+        """Check whether a symbol is part of the known universe"""
+        return symbol.upper() in self._index[0]
+
+    def _prefix_range(self, keys, prefix, text_of=lambda key: key, start=None):
+        """Yield entries of a sorted list whose text starts with prefix"""
+        i = bisect_left(keys, start if start is not None else prefix)
+        while i < len(keys) and text_of(keys[i]).startswith(prefix):
+            yield keys[i]
+            i += 1
+
+    def search(self, query, limit=5):
+        """Search by symbol prefix, then company name prefix, then fuzzy match"""
+        records, symbols, name_keys, words = self._index
+        query = self._normalize(query)
+        if not query:
+            return []
+
+        matches = []
+        seen = set()
+
+        def add(symbol):
+            if symbol not in seen:
+                seen.add(symbol)
+                matches.append(records[symbol])
+            return len(matches) >= limit
+
+        # Exact symbol first, then symbol prefix (symbols keep '-' so match on the raw query too)
+        raw = query.replace(' ', '-')
+        if raw in records and add(raw):
+            return matches
+        for symbol in self._prefix_range(symbols, raw):
+            if add(symbol):
+                return matches
+
+        # Company name prefix at any word boundary
+        for _, symbol in self._prefix_range(name_keys, query, text_of=lambda key: key[0], start=(query,)):
+            if add(symbol):
+                return matches
+
+        # Fuzzy fallback for typos, only scanning candidates that share the first letter
+        if not matches and len(query) >= 2:
+            first = query[0]
+            lo, hi = bisect_left(symbols, first), bisect_left(symbols, chr(ord(first) + 1))
+            for symbol in difflib.get_close_matches(raw, symbols[lo:hi], n=limit, cutoff=0.6):
+                if add(symbol):
+                    return matches
+
+            word_candidates = [w for w in words if w[0] == first]
+            for word in difflib.get_close_matches(query.split()[0], word_candidates, n=limit, cutoff=0.75):
+                for symbol in sorted(words[word]):
+                    if add(symbol):
+                        return matches
+
+        return matches
@@ -0,0 +1,15 @@
+"""Cold import time and RSS budgets of the lite and standard profiles (see benchmarks/import_budget.py)"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.import_budget import measure, violations
+
+@pytest.mark.parametrize('profile', ['lite', 'standard'])
+def test_import_budget(profile):
+    seconds, rss, running_rss, modules = measure(profile, runs=3)
+    assert violations(profile, seconds, rss, running_rss, modules) == [], \
+        f"{profile}: import {seconds:.2f}s, {rss:.0f} MB after import, {running_rss:.0f} MB running, " \
+        f"disallowed modules {modules}"
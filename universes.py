@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'universes.json')
+MAX_UNIVERSE_SYMBOLS = 5000
+
+# Overall score = SENTIMENT_WEIGHT * sentiment + (1 - SENTIMENT_WEIGHT) * trend (see backtest.py)
+SENTIMENT_WEIGHT = 0.4
+
+# Fields of a scored stock that are returned to clients
+PUBLIC_FIELDS = ('symbol', 'name', 'current_price', 'score', 'sentiment', 'trend')
+
+class UniverseRegistry:
+    """Named symbol universes from data/universes.json, overridable in the database
+
+    A definition either lists 'symbols' explicitly, selects from the symbol
+    index by 'sector' and/or 'exchange', or takes every listed symbol with
+    'all': true (built-in universes only). Built-in universes can't be
+    redefined through define(), and a stored universe only by its creator.
+    """
+
+    def __init__(self, symbol_index, db=None, config_path=DEFAULT_CONFIG_PATH):
+        self.symbol_index = symbol_index
+        self.db = db
+        self.config_path = config_path
+        self.definitions = {}
+        self.builtin = set()
+        self.owners = {}
+        self.load()
+
+    def load(self):
+        definitions = {}
+        try:
+            with open(self.config_path, 'r') as f:
+                definitions.update(json.load(f))
+        except Exception as e:
+            print(f"Error loading universes from {self.config_path}: {e}")
+        builtin = {name.lower() for name in definitions}
+
+        owners = {}
+        if self.db is not None:
+            for name, (definition, created_by) in self.db.get_universes().items():
+                if name.lower() in builtin:
+                    continue
+                try:
+                    definitions[name] = json.loads(definition)
+                    owners[name.lower()] = created_by
+                except ValueError as e:
+                    print(f"Error loading universe {name}: {e}")
+
+        self.definitions = {name.lower(): definition for name, definition in definitions.items()}
+        self.builtin = builtin
+        self.owners = owners
+
+    def names(self):
+        return sorted(self.definitions)
+
+    def get(self, name):
+        return self.definitions.get(name.lower())
+
+    def symbols(self, name):
+        """Resolve a universe to its symbols"""
+        definition = self.get(name)
+        if definition is None:
+            return []
+        if 'symbols' in definition:
+            return list(dict.fromkeys(s.upper() for s in definition['symbols']))
+        if definition.get('all'):
+            return self.symbol_index.symbols()
+        return self.symbol_index.symbols(sector=definition.get('sector'), exchange=definition.get('exchange'))
+
+    def permission_error(self, name, user_id):
+        """Return why user_id may not (re)define a universe, or None"""
+        name = name.lower()
+        if name in self.builtin:
+            return f"'{name}' is a built-in universe"
+        if name in self.owners and self.owners[name] != user_id:
+            return f"'{name}' belongs to another user"
+        return None
+
+    def validate(self, definition):
+        """Return an error message for an invalid definition, or None"""
+        if not isinstance(definition, dict):
+            return 'Universe definition must be an object'
+        if definition.get('all'):
+            return 'Only built-in universes can include every listed symbol'
+        if 'symbols' in definition:
+            symbols = definition['symbols']
+            if not isinstance(symbols, list) or not symbols:
+                return 'symbols must be a non-empty list'
+            if len(symbols) > MAX_UNIVERSE_SYMBOLS:
+                return f"Universes are limited to {MAX_UNIVERSE_SYMBOLS} symbols"
+            unknown = [s for s in symbols if not isinstance(s, str) or not self.symbol_index.contains(s)]
+            if unknown:
+                return f"Unknown symbols: {', '.join(map(str, unknown[:10]))}"
+        elif not (definition.get('sector') or definition.get('exchange')):
+            return 'A universe needs symbols, a sector or an exchange'
+        elif len(self.symbol_index.symbols(sector=definition.get('sector'),
+                                           exchange=definition.get('exchange'))) > MAX_UNIVERSE_SYMBOLS:
+            return f"Universes are limited to {MAX_UNIVERSE_SYMBOLS} symbols"
+        return None
+
+    def define(self, name, definition, user_id=None):
+        """Store a universe definition in the database"""
+        name = name.lower()
+        error = self.permission_error(name, user_id)
+        if error:
+            return {'success': False, 'error': error}
+        definition = {key: definition[key] for key in ('description', 'symbols', 'sector', 'exchange', 'all')
+                      if key in definition}
+        if 'symbols' in definition:
+            definition['symbols'] = [s.upper() for s in definition['symbols']]
+
+        result = self.db.save_universe(name, json.dumps(definition), user_id)
+        if result['success']:
+            self.definitions[name] = definition
+            self.owners[name] = user_id
+        return result
+
+class UniverseScorer:
+    """Scores universes in the background, re-scoring only symbols whose inputs changed
+
+    A symbol's trend score is recomputed only when its latest archived bar
+    changes, and its news sentiment only when its top headlines change, so
+    hourly passes over thousands of symbols mostly reuse earlier work. Price
+    history is refreshed with batched downloads, and symbols with no recent
+    data are reported to the quarantine.
+    """
+
+    def __init__(self, registry, price_archive, news_scraper, stock_analyzer, quarantine,
+                 symbol_index, score_history=None, stale_days=14, max_age_minutes=60):
+        self.registry = registry
+        self.price_archive = price_archive
+        self.news_scraper = news_scraper
+        self.stock_analyzer = stock_analyzer
+        self.quarantine = quarantine
+        self.symbol_index = symbol_index
+        self.score_history = score_history
+        self.stale_days = stale_days
+        self.max_age = max_age_minutes * 60
+
+        self.lock = threading.Lock()
+        self.scores = {}
+        self.rankings = {}
+        self.requested = {}
+        self.in_flight = set()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='universe')
+
+    def score(self, name):
+        """Score a universe now and return its ranking"""
+        name = name.lower()
+        symbols = self.quarantine.filter(self.registry.symbols(name))
+        self.price_archive.update_many(symbols)
+
+        stocks = []
+        rescored = 0
+        for symbol in symbols:
+            try:
+                entry, changed = self._score_symbol(symbol)
+            except Exception as e:
+                print(f"Error scoring {symbol}: {e}")
+                continue
+            if entry is not None:
+                stocks.append(entry)
+                rescored += changed
+
+        stocks.sort(key=lambda stock: stock['score'], reverse=True)
+        ranking = {
+            'name': name,
+            'scored_at': time.time(),
+            'size': len(symbols),
+            'rescored': rescored,
+            'stocks': [{key: stock[key] for key in PUBLIC_FIELDS} for stock in stocks]
+        }
+        if self.score_history is not None:
+            # Adds smoothed scores, rank changes and score deltas, and persists the run
+            self.score_history.record(ranking)
+        with self.lock:
+            self.rankings[name] = ranking
+        print(f"Scored universe {name}: {len(stocks)}/{len(symbols)} symbols, {rescored} re-scored")
+        return ranking
+
+    def _score_symbol(self, symbol):
+        """Return (entry, whether anything was recomputed)"""
+        columns = self.price_archive.get_columns(symbol, '3mo', refresh=False)
+        today = np.datetime64('today', 'D').astype(np.int64)
+        if columns is None or not len(columns['date']) or today - columns['date'][-1] > self.stale_days:
+            self.quarantine.record_failure(symbol, 'no recent price data')
+            return None, False
+        self.quarantine.record_success(symbol)
+
+        price_key = (int(columns['date'][-1]), float(columns['Close'][-1]), int(columns['Volume'][-1]))
+        articles = self.news_scraper.get_recent_news(symbol)
+        news_key = tuple(article.get('url') or article.get('title') for article in articles[:10])
+
+        with self.lock:
+            previous = self.scores.get(symbol)
+
+        changed = False
+        if previous is not None and previous['price_key'] == price_key:
+            trend = previous['trend']
+        else:
+            trend = self.stock_analyzer.analyze_trend(symbol)
+            changed = True
+        if previous is not None and previous['news_key'] == news_key:
+            sentiment = previous['sentiment']
+        else:
+            sentiment = self.news_scraper.score_articles(articles, bulk=True)
+            changed = True
+
+        listing = self.symbol_index.get(symbol)
+        entry = {
+            'symbol': symbol,
+            'name': listing['name'] if listing else symbol,
+            'current_price': price_key[1],
+            'score': (sentiment * SENTIMENT_WEIGHT) + (trend * (1 - SENTIMENT_WEIGHT)),
+            'sentiment': sentiment,
+            'trend': trend,
+            'price_key': price_key,
+            'news_key': news_key
+        }
+        with self.lock:
+            self.scores[symbol] = entry
+        return entry, changed
+
+    def score_async(self, name):
+        """Queue a background scoring pass unless one is already running"""
+        name = name.lower()
+        with self.lock:
+            if name in self.in_flight:
+                return
+            self.in_flight.add(name)
+        self.executor.submit(self._score_in_background, name)
+
+    def _score_in_background(self, name):
+        try:
+            self.score(name)
+        except Exception as e:
+            print(f"Error scoring universe {name}: {e}")
+        finally:
+            with self.lock:
+                self.in_flight.discard(name)
+
+    def ranking(self, name):
+        """Latest ranking for a universe, scheduling a re-score when missing or stale"""
+        name = name.lower()
+        with self.lock:
+            self.requested[name] = time.time()
+            ranking = self.rankings.get(name)
+            pending = name in self.in_flight
+        if ranking is None or time.time() - ranking['scored_at'] > self.max_age:
+            self.score_async(name)
+            pending = True
+        return ranking, pending
+
+    def rescore_requested(self, idle_hours=24):
+        """Re-score every universe someone asked for recently"""
+        cutoff = time.time() - idle_hours * 3600
+        with self.lock:
+            names = [name for name, at in self.requested.items() if at >= cutoff]
+        for name in names:
+            self.score(name)
@@ -0,0 +1,218 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import pandas as pd
+from metrics import metrics
+
+# Seconds a caller waits on each upstream call before giving up on it
+DEADLINES = {'info': 8, 'history': 10, 'download': 30, 'everything': 10, 'top_headlines': 10}
+
+def _yfinance():
+    """yfinance, imported on first use to keep it off the app's boot path"""
+    import yfinance
+    return yfinance
+
+class UpstreamError(Exception):
+    """An upstream call timed out or was refused by an open circuit"""
+
+def is_not_found(error):
+    """Whether an upstream exception means the symbol doesn't exist"""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) == 404
+
+def is_listed(info):
+    """Whether a yfinance .info payload describes a real, listed security
+
+    yfinance hides upstream 404s and answers an unknown symbol with a
+    partial dict such as {'trailingPegRatio': None}, or quoteType 'NONE'.
+    """
+    if not info or info.get('quoteType') == 'NONE':
+        return False
+    return any(info.get(key) for key in ('longName', 'shortName', 'quoteType'))
+
+class CircuitBreaker:
+    """Fails fast after consecutive failures of one upstream endpoint
+
+    After failure_threshold consecutive failures the circuit opens and
+    calls are refused; once reset_seconds have passed a single probe call
+    is let through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_seconds=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.probing = False
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+                self.probing = False
+            if self.state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != 'closed':
+                print(f"Circuit {self.name} closed")
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"Circuit {self.name} opened after {self.failures} failures")
+                    metrics.inc('upstream_circuit_opened_total', circuit=self.name)
+                self.state = 'open'
+                self.opened_at = time.time()
+
+class Upstream:
+    """Deadlines and circuit breakers for upstream calls, plus symbol fallbacks
+
+    Calls run on a bounded worker pool so a hung upstream ties up at most
+    `workers` threads while request threads give up at the call's deadline.
+    Each endpoint has its own circuit breaker. Symbols upstream reports as
+    unknown are remembered for unknown_ttl_hours, and the last good .info
+    per symbol is kept to serve while calls fail. A symbol that was listed
+    before is only marked unknown after max_unlisted_replies consecutive
+    not-listed replies, so one odd reply doesn't blank it out.
+    """
+
+    def __init__(self, workers=32, deadlines=None, unknown_ttl_hours=6, stale_entries=4096,
+                 max_unlisted_replies=3):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upstream')
+        self.deadlines = dict(DEADLINES, **(deadlines or {}))
+        self.unknown_ttl = unknown_ttl_hours * 3600
+        self.stale_entries = stale_entries
+        self.max_unlisted_replies = max_unlisted_replies
+        self.lock = threading.Lock()
+        self.breakers = {}
+        self.unknown = {}
+        self.stale_info = OrderedDict()
+        self.unlisted_replies = {}
+
+    def breaker(self, name):
+        with self.lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(name)
+            return self.breakers[name]
+
+    def call(self, source, call, func, *args, **kwargs):
+        """Run func under the endpoint's deadline and circuit breaker"""
+        breaker = self.breaker(f"{source}.{call}")
+        if not breaker.allow():
+            metrics.inc('upstream_rejected_total', source=source, call=call)
+            raise UpstreamError(f"{source} {call} circuit is open")
+
+        deadline = self.deadlines.get(call)
+        with metrics.timer('upstream_request_seconds', source=source, call=call):
+            future = self.executor.submit(func, *args, **kwargs)
+            try:
+                result = future.result(timeout=deadline)
+            except FutureTimeout:
+                future.cancel()
+                breaker.record_failure()
+                metrics.inc('upstream_timeouts_total', source=source, call=call)
+                raise UpstreamError(f"{source} {call} exceeded its {deadline}s deadline")
+            except Exception as e:
+                # A missing symbol is a healthy answer from upstream
+                if is_not_found(e):
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                raise
+        breaker.record_success()
+        return result
+
+    def is_unknown(self, symbol):
+        with self.lock:
+            expires_at = self.unknown.get(symbol.upper())
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self.unknown[symbol.upper()]
+                return False
+        metrics.inc('cache_requests_total', cache='unknown_symbols', result='hit')
+        return True
+
+    def mark_unknown(self, symbol):
+        with self.lock:
+            self.unknown[symbol.upper()] = time.time() + self.unknown_ttl
+            self.unlisted_replies.pop(symbol.upper(), None)
+
+    def unlisted_reply(self, symbol):
+        """Count a not-listed reply for a symbol with stale info; True once it should be marked unknown"""
+        with self.lock:
+            count = self.unlisted_replies.get(symbol.upper(), 0) + 1
+            self.unlisted_replies[symbol.upper()] = count
+            return count >= self.max_unlisted_replies
+
+    def remember_info(self, symbol, info):
+        with self.lock:
+            self.unlisted_replies.pop(symbol.upper(), None)
+            self.stale_info[symbol.upper()] = info
+            self.stale_info.move_to_end(symbol.upper())
+            while len(self.stale_info) > self.stale_entries:
+                evicted, _ = self.stale_info.popitem(last=False)
+                self.unlisted_replies.pop(evicted, None)
+
+    def last_info(self, symbol):
+        with self.lock:
+            return self.stale_info.get(symbol.upper())
+
+upstream = Upstream()
+
+def ticker_info(symbol):
+    """Fetch yfinance .info for a symbol; {} for symbols upstream reports as not found"""
+    if upstream.is_unknown(symbol):
+        return {}
+    try:
+        info = upstream.call('yfinance', 'info', lambda: _yfinance().Ticker(symbol).info)
+    except Exception as e:
+        if is_not_found(e):
+            upstream.mark_unknown(symbol)
+            return {}
+        stale = upstream.last_info(symbol)
+        if stale is None:
+            raise
+        metrics.inc('upstream_stale_served_total', source='yfinance', call='info')
+        return stale
+
+    if not is_listed(info):
+        # Throttling raises (and takes the stale path above); a not-listed reply is
+        # upstream's answer. A symbol that was listed before gets a few tries first.
+        stale = upstream.last_info(symbol)
+        if stale is None or upstream.unlisted_reply(symbol):
+            upstream.mark_unknown(symbol)
+            return {}
+        metrics.inc('upstream_stale_served_total', source='yfinance', call='info')
+        return stale
+    upstream.remember_info(symbol, info)
+    return info
+
+def ticker_history(symbol, **kwargs):
+    """Fetch yfinance .history for a symbol"""
+    if upstream.is_unknown(symbol):
+        return pd.DataFrame()
+    return upstream.call('yfinance', 'history', lambda: _yfinance().Ticker(symbol).history(**kwargs))
+
+def download_history(symbols, **kwargs):
+    """Fetch history for many symbols in one yfinance download"""
+    symbols = [symbol for symbol in symbols if not upstream.is_unknown(symbol)]
+    if not symbols:
+        return pd.DataFrame()
+    return upstream.call('yfinance', 'download', lambda: _yfinance().download(tickers=symbols, **kwargs))